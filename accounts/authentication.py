@@ -0,0 +1,189 @@
+"""
+JWT authentication with a cached user lookup.
+
+simplejwt's ``JWTAuthentication`` loads the user from the database on every
+request, and customer endpoints then load ``customer_profile`` separately.
+``CachedJWTAuthentication`` loads both in one query and caches the result
+per ``(user id, token version)``. The cache has two tiers: an in-process
+LRU (``AUTH_USER_CACHE_TTL`` seconds, ``AUTH_USER_CACHE_SIZE`` users) and,
+when ``AUTH_USER_CACHE_REDIS_URL`` is set, a Redis hash shared by all
+workers (``AUTH_USER_CACHE_REDIS_TTL``). A warm request needs no auth
+queries at all.
+
+Saving or deleting a ``User`` or ``Customer`` (including password changes)
+drops the user's entries from Redis and from this process. Other processes
+can serve their local copy for up to ``AUTH_USER_CACHE_TTL`` seconds.
+Queryset ``update()`` and ``bulk_create`` do not send signals; call
+``get_user_cache().invalidate(user_id)`` after those.
+
+Access tokens issued before the user's ``token_version`` was bumped
+("log out everywhere", see ``accounts.revocation``) are rejected, and so
+are the tokens of inactive users, on every request.
+"""
+
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from customers.models import Customer
+from .models import User
+from .tokens import TOKEN_VERSION_CLAIM
+
+
+class UserCache:
+    """
+    Two-tier cache of authenticated users keyed by ``(user_id, version)``.
+    Both tiers hold the pickled user, and ``get`` unpickles a new instance
+    (with its own ``customer_profile``), so requests never share state.
+    """
+
+    def __init__(self, ttl=30, max_size=10000, redis_client=None, redis_ttl=300, prefix='auth:user'):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.redis = redis_client
+        self.redis_ttl = redis_ttl
+        self.prefix = prefix
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, user_id):
+        return f'{self.prefix}:{user_id}'
+
+    def get(self, user_id, version):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._local.get((user_id, version))
+            if entry is not None:
+                if entry[0] > now:
+                    self._local.move_to_end((user_id, version))
+                    return pickle.loads(entry[1])
+                del self._local[(user_id, version)]
+
+        if self.redis is not None:
+            data = self.redis.hget(self.key(user_id), version)
+            if data is not None:
+                self._store(user_id, version, data)
+                return pickle.loads(data)
+        return None
+
+    def set(self, user_id, version, user):
+        data = pickle.dumps(user)
+        self._store(user_id, version, data)
+        if self.redis is not None:
+            key = self.key(user_id)
+            with self.redis.pipeline() as pipe:
+                pipe.hset(key, version, data)
+                pipe.expire(key, self.redis_ttl)
+                pipe.execute()
+
+    def _store(self, user_id, version, data):
+        with self._lock:
+            self._local[(user_id, version)] = (time.monotonic() + self.ttl, data)
+            self._local.move_to_end((user_id, version))
+            while len(self._local) > self.max_size:
+                self._local.popitem(last=False)
+
+    def invalidate(self, user_id):
+        """
+        Drop every cached version of ``user_id``.
+        """
+        with self._lock:
+            for key in [key for key in self._local if key[0] == user_id]:
+                del self._local[key]
+        if self.redis is not None:
+            self.redis.delete(self.key(user_id))
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_user_cache():
+    """
+    Return the process-wide user cache (created on first use).
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                redis_client = None
+                url = getattr(settings, 'AUTH_USER_CACHE_REDIS_URL', '')
+                if url:
+                    import redis
+
+                    redis_client = redis.Redis.from_url(url)
+                _cache = UserCache(
+                    ttl=getattr(settings, 'AUTH_USER_CACHE_TTL', 30),
+                    max_size=getattr(settings, 'AUTH_USER_CACHE_SIZE', 10000),
+                    redis_client=redis_client,
+                    redis_ttl=getattr(settings, 'AUTH_USER_CACHE_REDIS_TTL', 300),
+                )
+    return _cache
+
+
+@receiver(setting_changed)
+def reset_user_cache(setting, **kwargs):
+    global _cache
+    if setting.startswith('AUTH_USER_CACHE_'):
+        _cache = None
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user(sender, instance, **kwargs):
+    get_user_cache().invalidate(instance.pk)
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+def invalidate_customer(sender, instance, **kwargs):
+    get_user_cache().invalidate(instance.user_id)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    ``JWTAuthentication`` that resolves users through ``get_user_cache()``.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        version = validated_token.get(TOKEN_VERSION_CLAIM, 0)
+        cache = get_user_cache()
+        user = cache.get(user_id, version)
+        if user is None:
+            try:
+                user = (
+                    User.objects.select_related('customer_profile')
+                    .get(**{api_settings.USER_ID_FIELD: user_id})
+                )
+            except User.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            cache.set(user_id, version, user)
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if version < user.token_version:
+            raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
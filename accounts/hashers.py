@@ -0,0 +1,26 @@
+"""
+Password hashers with cost taken from settings.
+
+``Argon2PasswordHasher`` reads ``PASSWORD_ARGON2_TIME_COST``,
+``PASSWORD_ARGON2_MEMORY_COST`` (KiB) and ``PASSWORD_ARGON2_PARALLELISM``.
+Changing them makes Django report existing hashes as outdated, so they
+are re-hashed at the user's next login (see ``accounts.hashing``).
+"""
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+
+    @property
+    def time_cost(self):
+        return getattr(settings, 'PASSWORD_ARGON2_TIME_COST', hashers.Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return getattr(settings, 'PASSWORD_ARGON2_MEMORY_COST', hashers.Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return getattr(settings, 'PASSWORD_ARGON2_PARALLELISM', hashers.Argon2PasswordHasher.parallelism)
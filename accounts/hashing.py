@@ -0,0 +1,154 @@
+"""
+Password hashing off the request threads.
+
+Hashing a password costs tens of milliseconds of CPU, and done on a request
+thread it holds the GIL the whole time. ``hash_password`` and
+``verify_password`` run Django's hashers in a process pool of
+``PASSWORD_HASH_WORKERS`` processes instead. Request threads only wait, so
+they stay free to serve other requests. At most ``PASSWORD_HASH_QUEUE``
+jobs per worker may be waiting; callers past that block. That bounds the
+memory a login storm can take. With ``PASSWORD_HASH_WORKERS = 0`` hashing
+runs inline.
+
+``User.set_password`` and ``User.check_password`` use this module, so do
+``create_user``, ``authenticate`` and password changes. A successful login
+whose stored hash is outdated re-hashes the password with the current
+default hasher and cost.
+"""
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+
+def _init_worker(settings_module):
+    # Workers started with "spawn" (macOS, Windows) need their own setup
+    from django.conf import settings as worker_settings
+
+    if not worker_settings.configured:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+        import django
+
+        django.setup()
+
+
+def _hash(raw_password):
+    return hashers.make_password(raw_password)
+
+
+def _verify(raw_password, encoded):
+    """
+    ``(valid, must_update)`` for ``raw_password`` against ``encoded``.
+    """
+    outdated = []
+    valid = hashers.check_password(raw_password, encoded, setter=lambda raw: outdated.append(True))
+    return valid, bool(outdated)
+
+
+class HashingPool:
+    """
+    Bounded process pool for password hashing.
+    """
+
+    def __init__(self, workers, queue=4):
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(workers * (queue + 1))
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', ''),),
+        )
+
+    def run(self, func, *args):
+        with self._slots:
+            return self._executor.submit(func, *args).result()
+
+    def map(self, func, items):
+        """
+        ``[func(item) for item in items]`` in the pool. Each pending item holds
+        one slot, so a large batch waits for free slots like other callers
+        instead of filling the queue past its bound.
+        """
+        futures = []
+        try:
+            for item in items:
+                self._slots.acquire()
+                try:
+                    future = self._executor.submit(func, item)
+                except BaseException:
+                    self._slots.release()
+                    raise
+                future.add_done_callback(lambda done: self._slots.release())
+                futures.append(future)
+            return [future.result() for future in futures]
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_hashing_pool():
+    """
+    Return the process-wide hashing pool, or ``None`` to hash inline.
+    """
+    global _pool
+    workers = getattr(settings, 'PASSWORD_HASH_WORKERS', 0)
+    if workers and _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = HashingPool(workers, getattr(settings, 'PASSWORD_HASH_QUEUE', 4))
+    return _pool if workers else None
+
+
+@receiver(setting_changed)
+def reset_hashing_pool(setting, **kwargs):
+    global _pool
+    if setting.startswith('PASSWORD_'):
+        if _pool is not None:
+            _pool.shutdown()
+        _pool = None
+
+
+def hash_password(raw_password):
+    """
+    ``make_password`` in the hashing pool.
+    """
+    pool = get_hashing_pool()
+    if pool is None or raw_password is None:
+        return _hash(raw_password)
+    return pool.run(_hash, raw_password)
+
+
+def hash_passwords(raw_passwords, pool=None):
+    """
+    ``make_password`` for many passwords, spread across the processes of
+    ``pool`` (default: the shared pool, or inline without one). Returns the
+    hashes in input order.
+    """
+    pool = pool or get_hashing_pool()
+    if pool is None:
+        return [_hash(raw) for raw in raw_passwords]
+    return pool.map(_hash, raw_passwords)
+
+
+def verify_password(raw_password, encoded):
+    """
+    Check ``raw_password`` in the hashing pool. Returns ``(valid, must_update)``;
+    ``must_update`` means the hash should be replaced with a current one.
+    """
+    if raw_password is None or not hashers.is_password_usable(encoded):
+        # Nothing to compute; let Django apply its own rules inline
+        return _verify(raw_password, encoded)
+    pool = get_hashing_pool()
+    return pool.run(_verify, raw_password, encoded) if pool else _verify(raw_password, encoded)
@@ -5,6 +5,8 @@ Authentication models for the ecommerce application.
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.db import models
 
+from .hashing import hash_password, verify_password
+
 
 class UserManager(BaseUserManager):
     """
@@ -54,11 +56,35 @@ class User(AbstractUser):
     email = models.EmailField(unique=True)
     user_type = models.CharField(max_length=10, choices=USER_TYPE_CHOICES, default='customer')
     mobile = models.CharField(max_length=15, blank=True, null=True)
+    # Bumped to revoke every token issued so far (see accounts.revocation)
+    token_version = models.PositiveIntegerField(default=0)
     
     objects = UserManager()
     
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
+
+    class Meta(AbstractUser.Meta):
+        constraints = [
+            # Usernames are optional; those that are set are unique (see accounts.registration)
+            models.UniqueConstraint(
+                fields=['username'], condition=~models.Q(username=''), name='accounts_user_username_uniq',
+            ),
+        ]
     
     def __str__(self):
-        return f"{self.email} ({self.user_type})"
\ No newline at end of file
+        return f"{self.email} ({self.user_type})"
+
+    def set_password(self, raw_password):
+        # Hashed in the process pool (see accounts.hashing)
+        self.password = hash_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        valid, must_update = verify_password(raw_password, self.password)
+        if valid and must_update:
+            self.set_password(raw_password)
+            # Password hash upgrades shouldn't be considered password changes
+            self._password = None
+            self.save(update_fields=['password'])
+        return valid
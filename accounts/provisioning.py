@@ -0,0 +1,252 @@
+"""
+Bulk user and customer provisioning.
+
+Accounts are read from CSV or JSON lines. Each record has an ``email``, an
+optional ``password`` (accounts without one get an unusable password) and
+optional ``username``, ``first_name``, ``last_name``, ``mobile`` and
+``user_type`` (``customer`` by default). Customers also get a ``Customer``
+profile from ``name``, ``address``, ``city``, ``state``, ``zip``,
+``company`` and ``gstin``.
+
+Records are processed in chunks. Each chunk costs one lookup for emails
+and usernames that already exist; those rows are skipped. Its passwords are
+hashed in parallel across processes. Then the chunk's users and profiles
+are inserted with ``bulk_create`` in one transaction. If a concurrent
+sign-up takes an email or username in between, the chunk is checked and
+inserted once more, and rows that still conflict are reported as errors.
+"""
+
+import csv
+import io
+import json
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from customers.models import Customer
+from .hashing import HashingPool, hash_passwords
+from .models import User
+from .registration import UNIQUE_FIELDS, unique_violation
+
+DEFAULT_CHUNK_SIZE = 1000
+USER_FIELDS = ['username', 'first_name', 'last_name', 'mobile']
+CUSTOMER_FIELDS = ['address', 'city', 'state', 'zip', 'company', 'gstin']
+USER_TYPES = {choice for choice, label in User.USER_TYPE_CHOICES}
+# Errors kept in the returned stats
+MAX_REPORTED_ERRORS = 100
+
+
+class ProvisioningError(Exception):
+    """
+    The input could not be read.
+    """
+
+
+def read_records(stream, format=None, name=''):
+    """
+    Yield record dicts from a text stream of CSV (with a header row) or JSON
+    lines. ``format`` is ``csv`` or ``jsonl``; by default it is taken from
+    ``name``'s extension.
+    """
+    if format is None:
+        format = 'csv' if name.lower().endswith('.csv') else 'jsonl'
+    if format == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    if format != 'jsonl':
+        raise ProvisioningError(f"Unknown format {format!r}; use csv or jsonl.")
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            raise ProvisioningError(f"Line {line_number}: {e}")
+        if not isinstance(record, dict):
+            raise ProvisioningError(f"Line {line_number}: expected a JSON object.")
+        yield record
+
+
+def decode_upload(upload):
+    """
+    Text stream over an uploaded file.
+    """
+    return io.TextIOWrapper(upload.file, encoding='utf-8-sig')
+
+
+def clean_record(record):
+    """
+    Normalized ``record``. Raises ``ValueError`` with the reason it is invalid.
+    """
+    email = User.objects.normalize_email((record.get('email') or '').strip())
+    try:
+        validate_email(email)
+    except ValidationError:
+        raise ValueError('Invalid email.')
+    user_type = (record.get('user_type') or 'customer').strip()
+    if user_type not in USER_TYPES:
+        raise ValueError(f"Invalid user_type {user_type!r}.")
+    cleaned = {
+        'email': email,
+        'password': record.get('password') or None,
+        'user_type': user_type,
+        'name': (record.get('name') or '').strip(),
+    }
+    for field in USER_FIELDS + CUSTOMER_FIELDS:
+        value = record.get(field)
+        cleaned[field] = str(value).strip() if value not in (None, '') else None
+    return cleaned
+
+
+def chunked(records, size):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def provision_users(records, chunk_size=DEFAULT_CHUNK_SIZE, workers=None, dry_run=False):
+    """
+    Create users (and customer profiles) for ``records``, skipping emails
+    and usernames that already exist or repeat earlier in the input.
+
+    ``workers`` hashes passwords in a pool of that many processes for this
+    run; by default the shared hashing pool is used (see
+    ``accounts.hashing``). Returns ``{'created', 'skipped', 'invalid',
+    'errors', 'seconds'}``; ``errors`` lists up to 100 ``{'row', 'email',
+    'error'}`` entries.
+    """
+    started = time.monotonic()
+    stats = {'created': 0, 'skipped': 0, 'invalid': 0, 'errors': []}
+    seen_emails, seen_usernames = set(), set()
+    pool = HashingPool(workers) if workers and workers > 1 else None
+
+    def report(row, email, error):
+        if len(stats['errors']) < MAX_REPORTED_ERRORS:
+            stats['errors'].append({'row': row, 'email': email, 'error': error})
+
+    row = 0
+    try:
+        for chunk in chunked(records, chunk_size):
+            cleaned = []
+            for record in chunk:
+                row += 1
+                try:
+                    record = clean_record(record)
+                except ValueError as e:
+                    stats['invalid'] += 1
+                    report(row, record.get('email'), str(e))
+                    continue
+                if record['email'] in seen_emails or record['username'] in seen_usernames:
+                    stats['skipped'] += 1
+                    continue
+                seen_emails.add(record['email'])
+                if record['username']:
+                    seen_usernames.add(record['username'])
+                record['row'] = row
+                cleaned.append(record)
+            created, failed = create_chunk(cleaned, pool, dry_run)
+            for record, error in failed:
+                stats['invalid'] += 1
+                report(record['row'], record['email'], error)
+            stats['created'] += created
+            stats['skipped'] += len(cleaned) - created - len(failed)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    stats['seconds'] = round(time.monotonic() - started, 3)
+    return stats
+
+
+def without_conflicts(records):
+    """
+    The records whose email and username are not taken yet (one query).
+    """
+    emails = [record['email'] for record in records]
+    usernames = [record['username'] for record in records if record['username']]
+    taken = User.objects.filter(Q(email__in=emails) | Q(username__in=usernames)).values_list('email', 'username')
+    taken_emails, taken_usernames = set(), set()
+    for email, username in taken:
+        taken_emails.add(email)
+        # Users matched by email may have no username
+        if username:
+            taken_usernames.add(username)
+    return [
+        record for record in records
+        if record['email'] not in taken_emails
+        and not (record['username'] and record['username'] in taken_usernames)
+    ]
+
+
+def insert_records(records):
+    """
+    Insert users, and profiles for customers, in one transaction.
+    """
+    users = [
+        User(
+            email=record['email'],
+            user_type=record['user_type'],
+            password=record['hash'],
+            **{field: record[field] for field in USER_FIELDS if record[field] is not None},
+        )
+        for record in records
+    ]
+    with transaction.atomic():
+        User.objects.bulk_create(users)
+        Customer.objects.bulk_create([
+            Customer(
+                user=user,
+                name=record['name'] or record['username'] or record['email'].split('@')[0],
+                mobile=record['mobile'],
+                **{field: record[field] for field in CUSTOMER_FIELDS},
+            )
+            for user, record in zip(users, records)
+            if record['user_type'] == 'customer'
+        ])
+
+
+def create_chunk(records, pool=None, dry_run=False):
+    """
+    Insert the records whose email and username are not taken yet. Returns
+    ``(created, failed)``; ``failed`` holds ``(record, error)`` for rows
+    that still conflicted after the retry.
+    """
+    if not records:
+        return 0, []
+    records = without_conflicts(records)
+    if dry_run or not records:
+        return len(records), []
+
+    hashes = iter(hash_passwords([record['password'] for record in records if record['password']], pool))
+    for record in records:
+        record['hash'] = next(hashes) if record['password'] else make_password(None)
+    try:
+        insert_records(records)
+        return len(records), []
+    except IntegrityError:
+        # An email or username was taken after the lookup (a concurrent sign-up); look up once more
+        records = without_conflicts(records)
+    try:
+        insert_records(records)
+        return len(records), []
+    except IntegrityError:
+        pass
+
+    # Still conflicting: insert row by row and report the rows that fail
+    created, failed = 0, []
+    for record in records:
+        try:
+            insert_records([record])
+            created += 1
+        except IntegrityError as e:
+            field = unique_violation(e)
+            failed.append((record, UNIQUE_FIELDS[field][1] if field else str(e)))
+    return created, failed
@@ -0,0 +1,60 @@
+"""
+Atomic user registration.
+
+Registration used to check that the email and username were free, one
+query each, and then insert the user and the customer profile in separate
+transactions. Two sign-ups could both pass the checks, and a failed
+profile insert left a user without a profile. ``register_user`` instead
+inserts both in one transaction and lets the unique constraints on
+``email`` and ``username`` decide. A violation becomes a field error on the
+serializer. The password is hashed before the transaction starts, so the
+transaction never waits on the hash.
+"""
+
+from django.db import IntegrityError, transaction
+from rest_framework import serializers
+
+from customers.models import Customer
+from .models import User
+
+# Field -> (markers of its unique constraint in IntegrityError messages, error)
+UNIQUE_FIELDS = {
+    'email': (('accounts_user.email', 'accounts_user_email_'), 'Email already exists'),
+    'username': (('accounts_user.username', 'accounts_user_username_'), 'Username already exists'),
+}
+
+
+def unique_violation(error):
+    """
+    The ``User`` field whose unique constraint ``error`` violated, or ``None``.
+    """
+    # psycopg2 reports the constraint name; SQLite only has the message
+    diag = getattr(error.__cause__, 'diag', None)
+    message = getattr(diag, 'constraint_name', None) or str(error)
+    for field, (markers, _) in UNIQUE_FIELDS.items():
+        if any(marker in message for marker in markers):
+            return field
+    return None
+
+
+def register_user(password, customer=None, **fields):
+    """
+    Create a ``User`` from ``fields`` and, if ``customer`` (a dict of
+    ``Customer`` fields) is given, its customer profile, in one transaction.
+    Raises ``serializers.ValidationError`` on the taken field when the email
+    or username already exists.
+    """
+    user = User(**fields)
+    user.email = User.objects.normalize_email(user.email)
+    user.set_password(password)
+    try:
+        with transaction.atomic():
+            user.save()
+            if customer is not None:
+                Customer.objects.create(user=user, **customer)
+    except IntegrityError as e:
+        field = unique_violation(e)
+        if field is None:
+            raise
+        raise serializers.ValidationError({field: [UNIQUE_FIELDS[field][1]]})
+    return user
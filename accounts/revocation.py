@@ -0,0 +1,232 @@
+"""
+Refresh-token revocation store.
+
+A revoked refresh token's ``jti`` is written to Redis with a TTL equal to the
+token's remaining lifetime, so the store never grows past the live tokens.
+Each revocation is also appended to a Redis stream that every process reads
+into a local Bloom filter. Most tokens were never revoked, and for those the
+Bloom filter answers in memory without a Redis round trip. Only a "maybe"
+asks Redis.
+
+"Log out everywhere" bumps the user's ``token_version``. Tokens carry the
+version they were issued with (``ver`` claim), so older tokens stop working.
+``CachedJWTAuthentication`` compares access tokens with the user's
+version. Refresh tokens are compared with the versions read from the stream.
+
+Processes read the stream at most every ``TOKEN_REVOCATION_SYNC_INTERVAL``
+seconds. A revocation made in another process can therefore go unnoticed
+for up to that long. The stream is trimmed by age (``MINID``), never by
+length: it keeps every entry younger than the refresh-token lifetime, so a
+filter rebuilt from it still holds every token that can be presented, and
+entries are only dropped once their tokens have expired.
+
+Without ``TOKEN_REVOCATION_REDIS_URL`` revocations are kept in this process
+only and are lost on restart. That is enough for development and tests;
+production settings require the URL.
+"""
+
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db.models import F
+from django.dispatch import receiver
+from rest_framework_simplejwt.settings import api_settings
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter sized for ``capacity`` items at ``error_rate``
+    false positives. There are no false negatives.
+    """
+
+    def __init__(self, capacity=100000, error_rate=0.001):
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'big'), int.from_bytes(digest[8:], 'big') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationStore:
+    """
+    Revoked JTIs and per-user token versions, in Redis when ``redis_client``
+    is given and in this process otherwise.
+    """
+
+    def __init__(self, redis_client=None, prefix='jwt', sync_interval=1.0, capacity=100000, error_rate=0.001,
+                 retention=None):
+        self.redis = redis_client
+        self.prefix = prefix
+        self.sync_interval = sync_interval
+        self.capacity = capacity
+        self.error_rate = error_rate
+        # Seconds stream entries are kept: the longest a revoked token could still be presented
+        self.retention = retention if retention is not None else max(
+            api_settings.REFRESH_TOKEN_LIFETIME, api_settings.ACCESS_TOKEN_LIFETIME,
+        ).total_seconds()
+        self._lock = threading.Lock()
+        self._local = {}
+        self._reset()
+
+    def _reset(self, capacity=None):
+        self.bloom = BloomFilter(max(capacity or 0, self.capacity), self.error_rate)
+        self.versions = {}
+        self._cursor = '0-0'
+        self._synced_at = None
+
+    def _append(self, fields):
+        # Trim by age: entries go once every token they could concern has expired
+        min_id = f'{max(0, int((time.time() - self.retention) * 1000))}-0'
+        self.redis.xadd(self.stream, fields, minid=min_id, approximate=True)
+
+    @property
+    def stream(self):
+        return f'{self.prefix}:revocations'
+
+    def key(self, jti):
+        return f'{self.prefix}:revoked:{jti}'
+
+    def revoke(self, jti, exp):
+        """
+        Revoke ``jti`` until ``exp`` (epoch seconds). Returns False if it was
+        already revoked, so concurrent rotations of one token cannot both win.
+        """
+        ttl = math.ceil(exp - time.time())
+        if ttl <= 0:
+            return True
+        if self.redis is None:
+            with self._lock:
+                if self._local.get(jti, 0) > time.time():
+                    return False
+                if len(self._local) >= self.capacity:
+                    self._local = {key: until for key, until in self._local.items() if until > time.time()}
+                self._local[jti] = exp
+                self.bloom.add(jti)
+            return True
+
+        if not self.redis.set(self.key(jti), 1, ex=ttl, nx=True):
+            return False
+        self._append({'jti': jti})
+        with self._lock:
+            self.bloom.add(jti)
+        return True
+
+    def is_revoked(self, jti):
+        self.sync()
+        with self._lock:
+            if jti not in self.bloom:
+                return False
+            if self.redis is None:
+                return self._local.get(jti, 0) > time.time()
+        return bool(self.redis.exists(self.key(jti)))
+
+    def revoke_user(self, user_id, version):
+        """
+        Record that tokens of ``user_id`` older than ``version`` are revoked.
+        """
+        user_id = str(user_id)
+        if self.redis is not None:
+            self._append({'user': user_id, 'ver': version})
+        with self._lock:
+            self.versions[user_id] = max(version, self.versions.get(user_id, 0))
+
+    def token_version(self, user_id):
+        """
+        The lowest token version still accepted for ``user_id``.
+        """
+        self.sync()
+        with self._lock:
+            return self.versions.get(str(user_id), 0)
+
+    def sync(self, force=False):
+        """
+        Read revocations made since the last sync (any process) into the
+        Bloom filter and version map. Runs at most once per ``sync_interval``.
+        """
+        if self.redis is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if not force and self._synced_at is not None and now - self._synced_at < self.sync_interval:
+                return
+            if self.bloom.count > self.bloom.capacity:
+                # Past capacity the error rate climbs. Rebuild from the start of the
+                # stream, which holds every live revocation, sized for all of them
+                self._reset(capacity=2 * self.redis.xlen(self.stream))
+            while True:
+                response = self.redis.xread({self.stream: self._cursor}, count=1000)
+                if not response:
+                    break
+                entries = response[0][1]
+                for entry_id, fields in entries:
+                    if b'jti' in fields:
+                        self.bloom.add(fields[b'jti'].decode())
+                    else:
+                        user_id = fields[b'user'].decode()
+                        self.versions[user_id] = max(int(fields[b'ver']), self.versions.get(user_id, 0))
+                    self._cursor = entry_id
+                if len(entries) < 1000:
+                    break
+            self._synced_at = now
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_revocation_store():
+    """
+    Return the process-wide revocation store (created on first use).
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                redis_client = None
+                url = getattr(settings, 'TOKEN_REVOCATION_REDIS_URL', '')
+                if url:
+                    import redis
+
+                    redis_client = redis.Redis.from_url(url)
+                _store = RevocationStore(
+                    redis_client=redis_client,
+                    sync_interval=getattr(settings, 'TOKEN_REVOCATION_SYNC_INTERVAL', 1.0),
+                    capacity=getattr(settings, 'TOKEN_REVOCATION_BLOOM_CAPACITY', 100000),
+                )
+    return _store
+
+
+@receiver(setting_changed)
+def reset_revocation_store(setting, **kwargs):
+    global _store
+    if setting.startswith('TOKEN_REVOCATION_'):
+        _store = None
+
+
+def revoke_all_sessions(user):
+    """
+    Revoke every token issued to ``user`` so far. Returns the new version.
+    """
+    user.token_version = F('token_version') + 1
+    # save() (not update()) so the authenticated-user cache is invalidated
+    user.save(update_fields=['token_version'])
+    user.refresh_from_db(fields=['token_version'])
+    get_revocation_store().revoke_user(user.pk, user.token_version)
+    return user.token_version
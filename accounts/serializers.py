@@ -4,7 +4,10 @@ Authentication serializers for the ecommerce application.
 
 from rest_framework import serializers
 from django.contrib.auth import authenticate
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
 from .models import User
+from .registration import register_user
+from .tokens import AccountRefreshToken
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -16,7 +19,9 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = User
-        fields = ['email', 'password', 'confirm_password', 'user_type', 'mobile', "first_name", "last_name"]
+        fields = ['email', 'username', 'password', 'confirm_password', 'user_type', 'mobile', "first_name", "last_name"]
+        # Uniqueness is left to the database (see accounts.registration)
+        extra_kwargs = {'email': {'validators': []}, 'username': {'validators': []}}
         
     def validate(self, attrs):
         if attrs['password'] != attrs['confirm_password']:
@@ -24,10 +29,8 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         return attrs
 
     def create(self, validated_data):
-        print(validated_data, "*"*10)
         validated_data.pop('confirm_password')
-        user = User.objects.create_user(**validated_data)
-        return user
+        return register_user(**validated_data)
 
 
 
@@ -39,6 +42,8 @@ class UserLoginSerializer(serializers.Serializer):
     """
     email = serializers.EmailField()
     password = serializers.CharField(write_only=True)
+    # Guest cart to merge into the account cart on login
+    guest_user_id = serializers.CharField(required=False, max_length=20)
 
     def validate(self, attrs):
         email = attrs.get('email')
@@ -63,3 +68,12 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = ['id', 'email', 'user_type', 'mobile', 'date_joined', "first_name", "last_name"]
         read_only_fields = ['id', 'user_type', 'date_joined']
+
+
+
+class AccountTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh serializer for ``AccountRefreshToken``: revoked tokens fail to
+    decode, and a rotated token is revoked (``BLACKLIST_AFTER_ROTATION``).
+    """
+    token_class = AccountRefreshToken
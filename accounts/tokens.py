@@ -0,0 +1,64 @@
+"""
+JWT tokens issued by the accounts app.
+
+Tokens carry the user's ``user_type`` for clients, and the user's
+``token_version`` (``ver``). Bumping it revokes every token issued before
+(see ``accounts.revocation``).
+
+Refresh tokens are checked against the revocation store and the user's
+``token_version`` when they are decoded. ``blacklist()`` revokes them, as simplejwt does on logout and
+after rotation, without the ``token_blacklist`` app's database tables.
+"""
+
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .revocation import get_revocation_store
+
+USER_TYPE_CLAIM = 'user_type'
+TOKEN_VERSION_CLAIM = 'ver'
+
+
+class AccountRefreshToken(RefreshToken):
+    """
+    Refresh token with the account claims; its access tokens copy them.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token[USER_TYPE_CLAIM] = user.user_type
+        token[TOKEN_VERSION_CLAIM] = user.token_version
+        return token
+
+    def verify(self):
+        super().verify()
+        if self.is_revoked():
+            raise TokenError("Token is blacklisted")
+
+    def is_revoked(self):
+        store = get_revocation_store()
+        if store.is_revoked(self.payload[api_settings.JTI_CLAIM]):
+            return True
+        user_id = self.payload.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return False
+        version = self.payload.get(TOKEN_VERSION_CLAIM, 0)
+        if version < store.token_version(user_id):
+            return True
+        # The store only remembers "log out everywhere" for a while; the user row is the record
+        current = (
+            get_user_model().objects.filter(**{api_settings.USER_ID_FIELD: user_id})
+            .values_list('token_version', flat=True).first()
+        )
+        return current is None or version < current
+
+    def blacklist(self):
+        """
+        Revoke this token for the rest of its lifetime. Raises ``TokenError``
+        if it was revoked already (e.g. a concurrent rotation won).
+        """
+        if not get_revocation_store().revoke(self.payload[api_settings.JTI_CLAIM], self.payload['exp']):
+            raise TokenError("Token is blacklisted")
@@ -3,14 +3,15 @@ Authentication URLs for the ecommerce application.
 """
 
 from django.urls import path
-from rest_framework_simplejwt.views import TokenRefreshView
-from .views import register, login, logout, profile, update_profile
+from .views import register, login, logout, logout_all, profile, update_profile, provision, TokenRefreshView
 
 urlpatterns = [
     path('register/', register, name='register'),
     path('login/', login, name='login'),
     path('logout/', logout, name='logout'),
+    path('logout/all/', logout_all, name='logout_all'),
     path('profile/', profile, name='profile'),
     path('profile/update/', update_profile, name='update_profile'),
+    path('users/provision/', provision, name='provision_users'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 ]
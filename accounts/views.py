@@ -2,13 +2,23 @@
 Authentication views for the ecommerce application.
 """
 
+from itertools import islice
+
+from django.conf import settings
 from rest_framework import status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.views import TokenRefreshView as BaseTokenRefreshView
 
-from .serializers import UserRegistrationSerializer, UserLoginSerializer, UserSerializer
+from core.permissions import IsAdminUserType
+from orders.cart import CartMergeError, get_cart_backend
+from .provisioning import ProvisioningError, decode_upload, provision_users, read_records
+from .revocation import revoke_all_sessions
+from .serializers import UserRegistrationSerializer, UserLoginSerializer, UserSerializer, AccountTokenRefreshSerializer
+from .tokens import AccountRefreshToken
 
 
 @api_view(['POST'])
@@ -22,7 +32,7 @@ def register(request):
         user = serializer.save()
         
         # Generate JWT tokens
-        refresh = RefreshToken.for_user(user)
+        refresh = AccountRefreshToken.for_user(user)
         
         return Response({
             'message': 'User registered successfully',
@@ -41,22 +51,34 @@ def register(request):
 def login(request):
     """
     User login endpoint.
+
+    Pass ``guest_user_id`` to merge that guest cart into the user's cart.
     """
     serializer = UserLoginSerializer(data=request.data)
     if serializer.is_valid():
         user = serializer.validated_data['user']
         
         # Generate JWT tokens
-        refresh = RefreshToken.for_user(user)
+        refresh = AccountRefreshToken.for_user(user)
         
-        return Response({
+        data = {
             'message': 'Login successful',
             'user': UserSerializer(user).data,
             'tokens': {
                 'refresh': str(refresh),
                 'access': str(refresh.access_token),
             }
-        }, status=status.HTTP_200_OK)
+        }
+        guest_user_id = serializer.validated_data.get('guest_user_id')
+        if guest_user_id:
+            # A failed merge must not cost the user the login
+            try:
+                merged = get_cart_backend().merge(guest_user_id, str(user.id))
+            except CartMergeError as e:
+                data['cart'] = {'error': str(e)}
+            else:
+                data['cart'] = {'user_id': str(user.id), 'merged_lines': merged}
+        return Response(data, status=status.HTTP_200_OK)
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -66,16 +88,71 @@ def login(request):
 def logout(request):
     """
     User logout endpoint.
+
+    Revokes the given refresh token for the rest of its lifetime.
     """
     try:
-        refresh_token = request.data["refresh"]
-        token = RefreshToken(refresh_token)
+        token = AccountRefreshToken(request.data["refresh"])
+        if str(token.get(api_settings.USER_ID_CLAIM)) != str(request.user.pk):
+            raise TokenError("Token belongs to another user")
         token.blacklist()
         return Response({'message': 'Logout successful'}, status=status.HTTP_200_OK)
-    except Exception as e:
+    except (KeyError, TokenError):
         return Response({'error': 'Invalid token'}, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def logout_all(request):
+    """
+    Log out of every session: revokes all refresh and access tokens issued so far.
+    """
+    revoke_all_sessions(request.user)
+    return Response({'message': 'Logged out of all sessions'}, status=status.HTTP_200_OK)
+
+
+class TokenRefreshView(BaseTokenRefreshView):
+    """
+    Token refresh that rejects revoked refresh tokens and revokes rotated ones.
+    """
+    serializer_class = AccountTokenRefreshSerializer
+
+
+@api_view(['POST'])
+@permission_classes([IsAdminUserType])
+def provision(request):
+    """
+    Bulk-create users and customer profiles (admin only).
+
+    Body: a ``file`` upload (CSV or JSON lines, optional ``format``) or a
+    JSON ``users`` list, plus optional ``dry_run``. Larger imports than
+    ``PROVISION_API_MAX_ROWS`` belong to ``manage.py provision_users``.
+    """
+    max_rows = settings.PROVISION_API_MAX_ROWS
+    try:
+        if 'file' in request.FILES:
+            upload = request.FILES['file']
+            records = read_records(decode_upload(upload), request.data.get('format'), upload.name)
+        elif isinstance(request.data.get('users'), list):
+            records = request.data['users']
+        else:
+            return Response({'error': 'Provide a file or a users list'}, status=status.HTTP_400_BAD_REQUEST)
+        records = list(islice(records, max_rows + 1))
+    except (ProvisioningError, UnicodeDecodeError) as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if len(records) > max_rows:
+        return Response(
+            {'error': f'At most {max_rows} users per request; use manage.py provision_users for larger imports'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if not all(isinstance(record, dict) for record in records):
+        return Response({'error': 'Each user must be an object'}, status=status.HTTP_400_BAD_REQUEST)
+
+    dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true')
+    stats = provision_users(records, dry_run=dry_run)
+    return Response(stats, status=status.HTTP_200_OK if dry_run else status.HTTP_201_CREATED)
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def profile(request):
@@ -0,0 +1,110 @@
+"""
+Declarative KPI serializers backed by conditional aggregation.
+
+A KPI serializer declares its metrics as ``KPIField`` instances. When the
+serializer is rendered, all KPI fields that target the same model are folded
+into a single ``aggregate()`` call using filtered ``Count``/``Sum``
+expressions, so adding a new KPI never adds a query.
+
+Example::
+
+    class ProductKPISerializer(KPISerializer):
+        total_count = KPICount()
+        promo_count = KPICount(filter=Q(is_promo=True))
+
+        class Meta:
+            model = Product
+"""
+
+from decimal import Decimal
+
+from django.apps import apps
+from django.db import models
+from rest_framework import serializers
+
+
+class KPIField(serializers.Field):
+    """
+    Read-only field whose value is computed by an aggregate expression.
+
+    ``filter`` may be a ``Q``/conditional expression or a callable returning
+    one; callables are evaluated on every render so time-relative KPIs
+    (e.g. "this month") stay current. ``model`` overrides the serializer's
+    ``Meta.model`` and accepts either a model class or an ``"app.Model"`` label.
+    """
+
+    aggregate_class = None
+
+    def __init__(self, expression='pk', filter=None, model=None, empty_value=0, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+        self.expression = expression
+        self.filter = filter
+        self.model = model
+        self.empty_value = empty_value
+
+    def get_model(self):
+        if isinstance(self.model, str):
+            return apps.get_model(self.model)
+        return self.model
+
+    def build_aggregate(self):
+        condition = self.filter() if callable(self.filter) else self.filter
+        return self.aggregate_class(self.expression, filter=condition)
+
+    def to_representation(self, value):
+        return self.empty_value if value is None else value
+
+
+class KPICount(KPIField):
+    """
+    ``COUNT`` of rows matching the optional filter.
+    """
+    aggregate_class = models.Count
+
+
+class KPISum(KPIField):
+    """
+    ``SUM`` of ``expression`` over rows matching the optional filter.
+    """
+    aggregate_class = models.Sum
+
+    def __init__(self, expression, **kwargs):
+        kwargs.setdefault('empty_value', Decimal('0'))
+        super().__init__(expression, **kwargs)
+
+
+class KPISerializer(serializers.Serializer):
+    """
+    Serializer that resolves every ``KPIField`` with one aggregate per model.
+
+    The aggregated values are passed as the instance to the regular field
+    machinery, so ``SerializerMethodField`` getters receive a dict of the
+    computed KPIs and can derive further metrics without extra queries.
+    """
+
+    def to_representation(self, instance):
+        return super().to_representation(self.get_kpi_values())
+
+    def get_kpi_fields(self):
+        return {
+            name: field for name, field in self.fields.items()
+            if isinstance(field, KPIField)
+        }
+
+    def get_kpi_values(self):
+        default_model = getattr(getattr(self, 'Meta', None), 'model', None)
+        aggregates_by_model = {}
+        for field in self.get_kpi_fields().values():
+            model = field.get_model() or default_model
+            if model is None:
+                raise AssertionError(
+                    f"KPI field '{field.field_name}' on {self.__class__.__name__} has no model; "
+                    "set `Meta.model` or pass `model=`."
+                )
+            aggregates_by_model.setdefault(model, {})[field.source] = field.build_aggregate()
+
+        values = {}
+        for model, aggregates in aggregates_by_model.items():
+            values.update(model._default_manager.aggregate(**aggregates))
+        return values
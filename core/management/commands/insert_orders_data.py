@@ -14,6 +14,7 @@ import string
 from core.models import OrderStatus, Coupon
 from products.models import ProductAttribute
 from orders.models import Order, OrderDetail
+from orders.services import product_snapshot
 
 User = get_user_model()
 
@@ -44,7 +45,7 @@ class Command(BaseCommand):
         orders_per_user = max(10, options["orders"])
 
         # Preconditions
-        product_attrs = list(ProductAttribute.objects.select_related("product").all())
+        product_attrs = list(ProductAttribute.objects.select_related("product__tax", "size", "color").all())
         if not product_attrs:
             self.stdout.write(self.style.ERROR("No product attributes found. Seed products first."))
             return
@@ -117,12 +118,15 @@ class Command(BaseCommand):
                     subtotal = Decimal("0.00")
                     for attr in items:
                         qty = random.randint(1, 3)
+                        tax = attr.product.tax
+                        tax_rate = tax.tax_value if tax is not None and tax.status else Decimal("0.00")
                         OrderDetail.objects.create(
                             order=order,
                             product=attr.product,
                             product_attr=attr,
                             price=attr.price,
                             qty=qty,
+                            **product_snapshot(attr, tax_rate),
                         )
                         subtotal += (attr.price * qty)
 
@@ -0,0 +1,16 @@
+"""
+Shared permission classes for the ecommerce application.
+"""
+
+from rest_framework import permissions
+
+
+class IsAdminUserType(permissions.BasePermission):
+    """
+    Allow access only to authenticated users with ``user_type='admin'``.
+    """
+    message = 'Admin access required.'
+
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(user and user.is_authenticated and getattr(user, 'user_type', None) == 'admin')
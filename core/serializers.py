@@ -8,7 +8,8 @@ from django.db import models
 from django.utils import timezone
 from django.apps import apps
 from orders.models import Order
-from django.db.models import Sum
+from django.db.models import Sum, Q, Exists, OuterRef
+from .kpis import KPISerializer, KPICount, KPISum
 
 class BrandSerializer(serializers.ModelSerializer):
     """
@@ -40,19 +41,21 @@ class CategorySerializer(serializers.ModelSerializer):
         return obj.product_count
 
 
-class CategoryKpisSerializer(serializers.Serializer):
-    active_categories_count = serializers.SerializerMethodField()
-    inactive_categories_count = serializers.SerializerMethodField()
-    category_with_products_count = serializers.SerializerMethodField()
+def _category_has_products():
+    Product = apps.get_model('products', 'Product')
+    return Exists(Product.objects.filter(category=OuterRef('pk')))
 
-    def get_active_categories_count(self, obj):
-        return Category.objects.filter(status=True).count()
 
-    def get_inactive_categories_count(self, obj):
-        return Category.objects.filter(status=False).count()
+class CategoryKpisSerializer(KPISerializer):
+    """
+    Category KPIs computed in a single aggregate query.
+    """
+    active_categories_count = KPICount(filter=Q(status=True))
+    inactive_categories_count = KPICount(filter=Q(status=False))
+    category_with_products_count = KPICount(filter=_category_has_products)
 
-    def get_category_with_products_count(self, obj):
-        return Category.objects.annotate(product_count=models.Count('products')).filter(product_count__gt=0).count()
+    class Meta:
+        model = Category
 
 
 
@@ -120,94 +123,89 @@ class OrderStatusOverviewSerializer(serializers.Serializer):
         return obj.orders_status
 
     def get_order_status_count(self, obj):
+        # Prefer the count annotated by ``with_order_counts`` to avoid a query per status
+        if hasattr(obj, 'order_count'):
+            return obj.order_count
         return Order.objects.filter(order_status=obj).count()
 
+    @staticmethod
+    def with_order_counts(queryset):
+        return queryset.annotate(order_count=models.Count('order'))
+
+
+
+LOW_STOCK_THRESHOLD = 5
+
 
+def _low_stock_products():
+    Product = apps.get_model('products', 'Product')
+    return (
+        Product.objects
+        .annotate(total_qty=models.Sum('attributes__qty'))
+        .filter(total_qty__lt=LOW_STOCK_THRESHOLD)
+    )
 
-class DashboardKPISerializer(serializers.Serializer):
+
+def _is_low_stock():
+    return Q(pk__in=_low_stock_products().values('pk'))
+
+
+def _added_this_month():
+    now = timezone.now()
+    return Q(added_on__year=now.year, added_on__month=now.month)
+
+
+def _added_last_month():
+    now = timezone.now()
+    last_month = now.month - 1 or 12
+    year = now.year if now.month > 1 else now.year - 1
+    return Q(added_on__year=year, added_on__month=last_month)
+
+
+class DashboardKPISerializer(KPISerializer):
     """
     Dashboard KPI serializer.
+
+    Counts and revenue figures are resolved with one aggregate query per model
+    (products, orders); list sections are fetched separately.
     """
-    total_products_count = serializers.SerializerMethodField()
-    total_orders_count = serializers.SerializerMethodField()
-    total_revenue = serializers.SerializerMethodField()
-    low_stock_alert_count = serializers.SerializerMethodField()
-    last_month_revenue = serializers.SerializerMethodField()
-    this_month_revenue = serializers.SerializerMethodField()
+    # --- Product KPIs ---
+    total_products_count = KPICount(model='products.Product')
+    low_stock_alert_count = KPICount(model='products.Product', filter=_is_low_stock)
+
+    # --- Order KPIs ---
+    total_orders_count = KPICount(model='orders.Order')
+    total_revenue = KPISum('total_amt', model='orders.Order')
+
+    # --- Revenue KPIs ---
+    last_month_revenue = KPISum('total_amt', model='orders.Order', filter=_added_last_month)
+    this_month_revenue = KPISum('total_amt', model='orders.Order', filter=_added_this_month)
     revenue_growth = serializers.SerializerMethodField()
+
     recent_orders = serializers.SerializerMethodField()
     order_status_overview = serializers.SerializerMethodField()
     low_stock_products = serializers.SerializerMethodField()
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.Product = apps.get_model('products', 'Product')
         self.Order = apps.get_model('orders', 'Order')
         self.OrderStatus = apps.get_model('core', 'OrderStatus')
         from products.serializers import ProductDetailSerializer
         self.ProductDetailSerializer = ProductDetailSerializer
         self.request = self.context.get("request")
-    # --- Product KPIs ---
+
     def get_low_stock_products(self, obj):
-        """Return list of products whose total stock (sum of all attributes) is below 10."""
-        # from products.serializers import ProductSerializer
-        low_stock_products = (
-            self.Product.objects
-            .annotate(total_qty=models.Sum('attributes__qty'))
-            .filter(total_qty__lt=5)
-        )
-        return self.ProductDetailSerializer(low_stock_products, many=True, context={'request': self.request}).data
-
-    def get_low_stock_alert_count(self, obj):
-        """Count how many products have low stock."""
-        return (
-            self.Product.objects
-            .annotate(total_qty=models.Sum('attributes__qty'))
-            .filter(total_qty__lt=5)
-            .count()
-        )
-
-    def get_total_products_count(self, obj):
-        return self.Product.objects.count()
+        """Return list of products whose total stock (sum of all attributes) is below the threshold."""
+        return self.ProductDetailSerializer(_low_stock_products(), many=True, context={'request': self.request}).data
 
-    # --- Order KPIs ---
     def get_recent_orders(self, obj):
         from orders.serializers import OrderSerializer
-        return OrderSerializer(
-            self.Order.objects.order_by('-added_on')[:10], many=True
-        ).data
-
-    def get_total_orders_count(self, obj):
-        return self.Order.objects.count()
-
-    def get_total_revenue(self, obj):
-        return (
-            self.Order.objects.aggregate(total_revenue=models.Sum('total_amt'))
-            .get('total_revenue') or 0
-        )
-
-    # --- Revenue KPIs ---
-    def get_last_month_revenue(self, obj):
-        now = timezone.now()
-        last_month = now.month - 1 or 12
-        year = now.year if now.month > 1 else now.year - 1
-        return (
-            self.Order.objects.filter(added_on__year=year, added_on__month=last_month)
-            .aggregate(total_revenue=models.Sum('total_amt'))
-            .get('total_revenue') or 0
-        )
-
-    def get_this_month_revenue(self, obj):
-        now = timezone.now()
-        return (
-            self.Order.objects.filter(added_on__year=now.year, added_on__month=now.month)
-            .aggregate(total_revenue=models.Sum('total_amt'))
-            .get('total_revenue') or 0
-        )
+        recent_orders = OrderSerializer.setup_eager_loading(self.Order.objects.order_by('-added_on'))[:10]
+        return OrderSerializer(recent_orders, many=True).data
 
     def get_revenue_growth(self, obj):
-        last = self.get_last_month_revenue(obj)
-        this = self.get_this_month_revenue(obj)
+        last = obj['last_month_revenue'] or 0
+        this = obj['this_month_revenue'] or 0
 
         if last == 0 and this > 0:
             return 100.0
@@ -217,5 +215,6 @@ class DashboardKPISerializer(serializers.Serializer):
 
     # --- Order Status Overview ---
     def get_order_status_overview(self, obj):
-        from .serializers import OrderStatusOverviewSerializer
-        return OrderStatusOverviewSerializer(self.OrderStatus.objects.all(), many=True).data
\ No newline at end of file
+        return OrderStatusOverviewSerializer(
+            OrderStatusOverviewSerializer.with_order_counts(self.OrderStatus.objects.all()), many=True
+        ).data
@@ -267,7 +267,10 @@ class KPIView(APIView):
             case KPIPages.DASHBOARD.value:
                 return DashboardKPISerializer(instance={}, context={'request': request}).data
             case KPIPages.ORDER.value:
-                return OrderStatusOverviewSerializer(OrderStatus.objects.all(), many=True, context={'request': request}).data
+                return OrderStatusOverviewSerializer(
+                    OrderStatusOverviewSerializer.with_order_counts(OrderStatus.objects.all()),
+                    many=True, context={'request': request}
+                ).data
             case KPIPages.PRODUCT.value:
                 from products.serializers import ProductKPISerializer
                 return ProductKPISerializer(instance={}, context={'request': request}).data
@@ -4,6 +4,8 @@ Customer serializers for the ecommerce application.
 
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+
+from accounts.registration import register_user
 from .models import Customer
 
 User = get_user_model()
@@ -56,41 +58,21 @@ class CustomerRegistrationSerializer(serializers.Serializer):
     def validate(self, attrs):
         if attrs['password'] != attrs['confirm_password']:
             raise serializers.ValidationError("Passwords don't match")
-        
-        # Check if username already exists
-        if User.objects.filter(username=attrs['username']).exists():
-            raise serializers.ValidationError("Username already exists")
-            
-        # Check if email already exists
-        if User.objects.filter(email=attrs['email']).exists():
-            raise serializers.ValidationError("Email already exists")
-            
+        # Username and email uniqueness is left to the database (see accounts.registration)
         return attrs
 
     def create(self, validated_data):
-        validated_data.pop('confirm_password')
-        
-        # Extract customer-specific data
-        customer_data = {
-            'name': validated_data.pop('name'),
-            'mobile': validated_data.pop('mobile', ''),
-        }
-        
-        # Create user
-        user = User.objects.create_user(
+        user = register_user(
+            password=validated_data['password'],
             username=validated_data['username'],
             email=validated_data['email'],
-            password=validated_data['password'],
-            user_type='customer'
-        )
-        
-        # Create customer profile
-        customer = Customer.objects.create(
-            user=user,
-            **customer_data
+            user_type='customer',
+            customer={
+                'name': validated_data['name'],
+                'mobile': validated_data.get('mobile', ''),
+            },
         )
-        
-        return customer
+        return user.customer_profile
 
     def to_representation(self, instance):
         """Return customer data with user information."""
@@ -0,0 +1,16 @@
+"""
+Celery application for scheduled jobs (see ``CELERY_BEAT_SCHEDULE``).
+
+Celery is optional: the same jobs are available as management commands.
+Run: celery -A ecommerce_api worker --beat
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecommerce_api.settings.development')
+
+app = Celery('ecommerce_api')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
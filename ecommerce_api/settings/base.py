@@ -2,6 +2,7 @@
 Django base settings for ecommerce_api project.
 """
 
+import importlib.util
 from pathlib import Path
 from decouple import config
 
@@ -153,7 +154,7 @@ AUTH_USER_MODEL = 'accounts.User'
 # Django REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -174,6 +175,67 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
+    # Rotated refresh tokens are revoked in accounts.revocation (no token_blacklist tables)
+    'BLACKLIST_AFTER_ROTATION': True,
+}
+
+# Password hashing: Argon2 when argon2-cffi is installed; older hashes are upgraded at login
+PASSWORD_HASHERS = [
+    'accounts.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+if importlib.util.find_spec('argon2') is None:
+    PASSWORD_HASHERS.pop(0)
+PASSWORD_ARGON2_TIME_COST = config('PASSWORD_ARGON2_TIME_COST', default=2, cast=int)
+PASSWORD_ARGON2_MEMORY_COST = config('PASSWORD_ARGON2_MEMORY_COST', default=102400, cast=int)
+PASSWORD_ARGON2_PARALLELISM = config('PASSWORD_ARGON2_PARALLELISM', default=8, cast=int)
+# Processes that hash passwords off the request threads (0 hashes inline) and jobs queued per process
+PASSWORD_HASH_WORKERS = config('PASSWORD_HASH_WORKERS', default=0, cast=int)
+PASSWORD_HASH_QUEUE = config('PASSWORD_HASH_QUEUE', default=4, cast=int)
+# Largest file the bulk provisioning API accepts (bigger imports: manage.py provision_users)
+PROVISION_API_MAX_ROWS = config('PROVISION_API_MAX_ROWS', default=10000, cast=int)
+
+# Authenticated user cache (accounts.authentication): in-process LRU, plus Redis when a URL is set
+AUTH_USER_CACHE_TTL = config('AUTH_USER_CACHE_TTL', default=30, cast=int)
+AUTH_USER_CACHE_SIZE = config('AUTH_USER_CACHE_SIZE', default=10000, cast=int)
+AUTH_USER_CACHE_REDIS_URL = config('AUTH_USER_CACHE_REDIS_URL', default='')
+AUTH_USER_CACHE_REDIS_TTL = config('AUTH_USER_CACHE_REDIS_TTL', default=300, cast=int)
+
+# Revoked refresh tokens (accounts.revocation); without a Redis URL they are kept per process
+TOKEN_REVOCATION_REDIS_URL = config('TOKEN_REVOCATION_REDIS_URL', default='')
+TOKEN_REVOCATION_SYNC_INTERVAL = config('TOKEN_REVOCATION_SYNC_INTERVAL', default=1.0, cast=float)
+TOKEN_REVOCATION_BLOOM_CAPACITY = config('TOKEN_REVOCATION_BLOOM_CAPACITY', default=100000, cast=int)
+
+# Order archival: orders older than this many days are moved to the archive tables
+ORDER_ARCHIVE_HORIZON_DAYS = config('ORDER_ARCHIVE_HORIZON_DAYS', default=365, cast=int)
+
+# Cart storage: orders.cart.DatabaseCartBackend (default) or orders.cart.RedisCartBackend
+CART_BACKEND = config('CART_BACKEND', default='orders.cart.DatabaseCartBackend')
+CART_REDIS_URL = config('CART_REDIS_URL', default='redis://localhost:6379/1')
+CART_REDIS_TTL = config('CART_REDIS_TTL', default=60 * 60 * 24 * 30, cast=int)
+
+# Cart retention: carts whose newest line is older than this are purged by sweep_carts (0 keeps them)
+CART_RETENTION_GUEST_DAYS = config('CART_RETENTION_GUEST_DAYS', default=30, cast=int)
+CART_RETENTION_REGISTERED_DAYS = config('CART_RETENTION_REGISTERED_DAYS', default=180, cast=int)
+
+# Celery (optional): broker and schedule for periodic jobs, run with `celery -A ecommerce_api worker --beat`
+CELERY_BROKER_URL = config('CELERY_BROKER_URL', default='redis://localhost:6379/0')
+CELERY_BEAT_SCHEDULE = {
+    'sweep-stale-carts': {
+        'task': 'orders.tasks.sweep_stale_carts',
+        'schedule': config('CART_SWEEP_INTERVAL', default=60 * 60 * 24, cast=int),
+    },
+    'process-stripe-events': {
+        'task': 'integrations.tasks.process_stripe_events',
+        'schedule': config('STRIPE_EVENT_POLL_INTERVAL', default=5, cast=int),
+    },
+    'dispatch-outbox': {
+        'task': 'orders.tasks.dispatch_outbox',
+        'schedule': config('OUTBOX_DISPATCH_INTERVAL', default=2, cast=int),
+    },
 }
 
 # CORS Configuration
@@ -231,4 +293,11 @@ SPECTACULAR_SETTINGS = {
 STRIPE_SECRET_KEY = config('STRIPE_SECRET_KEY')
 STRIPE_WEBHOOK_SECRET = config('STRIPE_WEBHOOK_SECRET')
 STRIPE_PUBLISHABLE_KEY = config('STRIPE_PUBLISHABLE_KEY')
-STRIPE_ENDPOINT_SECRET = config('STRIPE_ENDPOINT_SECRET')
\ No newline at end of file
+STRIPE_ENDPOINT_SECRET = config('STRIPE_ENDPOINT_SECRET')
+
+# Stripe HTTP client: API base (point at `manage.py run_fake_stripe` offline), timeouts in seconds, retries of transient errors
+STRIPE_API_BASE = config('STRIPE_API_BASE', default='https://api.stripe.com')
+STRIPE_CONNECT_TIMEOUT = config('STRIPE_CONNECT_TIMEOUT', default=3.0, cast=float)
+STRIPE_READ_TIMEOUT = config('STRIPE_READ_TIMEOUT', default=10.0, cast=float)
+STRIPE_MAX_RETRIES = config('STRIPE_MAX_RETRIES', default=2, cast=int)
+STRIPE_POOL_SIZE = config('STRIPE_POOL_SIZE', default=10, cast=int)
\ No newline at end of file
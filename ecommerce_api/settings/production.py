@@ -2,6 +2,8 @@
 Production settings for ecommerce_api project.
 """
 
+from django.core.exceptions import ImproperlyConfigured
+
 from .base import *
 
 # SECURITY WARNING: don't run with debug turned on in production!
@@ -19,6 +21,11 @@ DATABASES = {
     }
 }
 
+# Revoked tokens must reach every worker and survive restarts (accounts.revocation)
+TOKEN_REVOCATION_REDIS_URL = config('TOKEN_REVOCATION_REDIS_URL')
+if not TOKEN_REVOCATION_REDIS_URL:
+    raise ImproperlyConfigured('TOKEN_REVOCATION_REDIS_URL is required in production.')
+
 # Security settings
 SECURE_BROWSER_XSS_FILTER = True
 SECURE_CONTENT_TYPE_NOSNIFF = True
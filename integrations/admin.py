@@ -1,3 +1,17 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import StripeEvent
+from .stripe.events import replay_events
+
+
+@admin.register(StripeEvent)
+class StripeEventAdmin(admin.ModelAdmin):
+    list_display = ['event_id', 'type', 'payment_intent', 'status', 'attempts', 'created', 'processed_at']
+    list_filter = ['status', 'type']
+    search_fields = ['event_id', 'payment_intent']
+    readonly_fields = ['event_id', 'type', 'payment_intent', 'payload', 'created', 'received_at', 'processed_at', 'attempts', 'last_error']
+    actions = ['replay']
+
+    @admin.action(description="Replay selected events")
+    def replay(self, request, queryset):
+        self.message_user(request, f"Re-queued {replay_events(queryset)} events.")
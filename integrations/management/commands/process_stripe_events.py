@@ -0,0 +1,34 @@
+"""
+Django management command to apply stored Stripe webhook events.
+Events are applied in Stripe order per payment intent (see integrations.stripe.events).
+Run: python manage.py process_stripe_events --interval 2
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from integrations.stripe.events import process_pending, DEFAULT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Process pending Stripe webhook events (once, or every --interval seconds)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, default=0, help="Seconds between polls; 0 drains the queue once and exits")
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Events processed per poll")
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            counts = process_pending(batch_size=options["batch_size"])
+            if any(counts.values()):
+                self.stdout.write(
+                    f"Processed {counts['processed']} events, {counts['failed']} failed, "
+                    f"{counts['deferred']} deferred in {time.monotonic() - started:.3f}s"
+                )
+            if counts['processed'] + counts['failed'] >= options["batch_size"]:
+                continue
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,52 @@
+"""
+Django management command to settle pending gateway orders from Stripe.
+Picks up payments whose webhook was missed (see integrations.stripe.reconcile).
+Run: python manage.py reconcile_payments --workers 8 --rate 20 --dry-run
+"""
+
+import json
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from integrations.stripe.reconcile import (
+    DEFAULT_CHUNK_SIZE, DEFAULT_MIN_AGE, DEFAULT_RATE, DEFAULT_WORKERS, reconcile_payments,
+)
+
+
+class Command(BaseCommand):
+    help = "Update pending Gateway orders from their Stripe payment intents and report mismatches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Orders read per query")
+        parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent Stripe requests")
+        parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="Maximum Stripe requests per second")
+        parser.add_argument(
+            "--min-age", type=float, default=DEFAULT_MIN_AGE.total_seconds() / 60,
+            help="Skip orders placed in the last N minutes (left to the webhook)",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Report what would change without updating orders")
+        parser.add_argument("--report", help="Write mismatches to this file as JSON lines")
+
+    def handle(self, *args, **options):
+        stats = reconcile_payments(
+            chunk_size=options["chunk_size"],
+            workers=options["workers"],
+            rate=options["rate"],
+            min_age=timedelta(minutes=options["min_age"]),
+            dry_run=options["dry_run"],
+        )
+
+        updated = ", ".join(f"{count} {status}" for status, count in sorted(stats["updated"].items())) or "none"
+        self.stdout.write(
+            f"{'Would update' if options['dry_run'] else 'Updated'} {updated} of {stats['checked']} orders checked "
+            f"in {stats['seconds']:.3f}s ({stats['errors']} errors)"
+        )
+        for mismatch in stats["mismatches"]:
+            self.stdout.write(self.style.WARNING(
+                f"Order {mismatch['order_id']} ({mismatch['payment_id']}): {mismatch['reason']} mismatch"
+            ))
+        if options["report"]:
+            with open(options["report"], "w") as report:
+                for mismatch in stats["mismatches"]:
+                    report.write(json.dumps(mismatch) + "\n")
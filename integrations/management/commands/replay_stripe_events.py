@@ -0,0 +1,43 @@
+"""
+Django management command to re-queue Stripe webhook events.
+By default every failed event is replayed; pass event ids to replay specific events.
+Run: python manage.py replay_stripe_events [evt_... ...] [--status failed] [--type payment_intent.succeeded]
+"""
+
+from django.core.management.base import BaseCommand
+
+from integrations.models import StripeEvent
+from integrations.stripe.events import process_pending, replay_events
+
+
+class Command(BaseCommand):
+    help = "Re-queue failed (or selected) Stripe events and process them"
+
+    def add_arguments(self, parser):
+        parser.add_argument("event_ids", nargs="*", help="Stripe event ids to replay (any status)")
+        parser.add_argument(
+            "--status", choices=[choice for choice, _ in StripeEvent.STATUS_CHOICES], default=StripeEvent.FAILED,
+            help="Replay events in this status when no ids are given",
+        )
+        parser.add_argument("--type", help="Only replay events of this type")
+        parser.add_argument("--no-process", action="store_true", help="Only re-queue; leave processing to the worker")
+
+    def handle(self, *args, **options):
+        if options["event_ids"]:
+            events = StripeEvent.objects.filter(event_id__in=options["event_ids"])
+        else:
+            events = StripeEvent.objects.filter(status=options["status"])
+        if options["type"]:
+            events = events.filter(type=options["type"])
+
+        queued = replay_events(events)
+        self.stdout.write(f"Re-queued {queued} events")
+        if queued and not options["no_process"]:
+            processed = failed = 0
+            while True:
+                counts = process_pending()
+                processed += counts['processed']
+                failed += counts['failed']
+                if not counts['processed']:
+                    break
+            self.stdout.write(self.style.SUCCESS(f"Processed {processed} events, {failed} failed"))
@@ -0,0 +1,28 @@
+"""
+Django management command to serve the offline fake Stripe API for local development.
+Point STRIPE_API_BASE at the printed URL.
+Run: python manage.py run_fake_stripe --port 12111
+"""
+
+from django.core.management.base import BaseCommand
+
+from integrations.stripe.fake import FakeStripeServer
+
+
+class Command(BaseCommand):
+    help = "Serve a local fake of the Stripe payment intents API"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=12111)
+        parser.add_argument("--latency", type=float, default=0, help="Seconds added to every response")
+
+    def handle(self, *args, **options):
+        server = FakeStripeServer(options["host"], options["port"], latency=options["latency"])
+        self.stdout.write(f"Fake Stripe listening on {server.url} (set STRIPE_API_BASE={server.url})")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.16 on 2026-10-18 23:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StripeEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(max_length=255, unique=True)),
+                ('type', models.CharField(max_length=100)),
+                ('payment_intent', models.CharField(blank=True, max_length=255, null=True)),
+                ('payload', models.JSONField()),
+                ('created', models.DateTimeField(help_text='When Stripe created the event')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processed', 'Processed'), ('ignored', 'Ignored'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'stripe_events',
+                'ordering': ['created', 'id'],
+                'indexes': [models.Index(fields=['status', 'created'], name='stripe_event_status_idx'), models.Index(fields=['payment_intent', 'created'], name='stripe_event_intent_idx')],
+            },
+        ),
+    ]
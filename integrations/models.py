@@ -1,3 +1,44 @@
 from django.db import models
 
-# Create your models here.
+
+class StripeEvent(models.Model):
+    """
+    Stripe webhook events, stored once per Stripe event id.
+
+    The webhook view only inserts (ignoring duplicates from Stripe retries)
+    and acknowledges; ``integrations.stripe.events.process_pending`` applies
+    them in the background, in ``created`` order per payment intent.
+    """
+    PENDING = 'pending'
+    PROCESSED = 'processed'
+    IGNORED = 'ignored'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (PROCESSED, 'Processed'),
+        (IGNORED, 'Ignored'),
+        (FAILED, 'Failed'),
+    ]
+
+    event_id = models.CharField(max_length=255, unique=True)
+    type = models.CharField(max_length=100)
+    payment_intent = models.CharField(max_length=255, blank=True, null=True)
+    payload = models.JSONField()
+    created = models.DateTimeField(help_text="When Stripe created the event")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, null=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.event_id} ({self.type}, {self.status})"
+
+    class Meta:
+        db_table = 'stripe_events'
+        ordering = ['created', 'id']
+        indexes = [
+            # The worker's queue: pending events in Stripe order
+            models.Index(fields=['status', 'created'], name='stripe_event_status_idx'),
+            models.Index(fields=['payment_intent', 'created'], name='stripe_event_intent_idx'),
+        ]
@@ -1,27 +1,241 @@
-import stripe
+"""
+Stripe API client.
+
+One client per process (``get_stripe_client``) talks to the Stripe REST API
+over a shared ``requests.Session``, so connections are kept alive and pooled
+across requests instead of being set up per call. Every call has explicit
+connect/read timeouts (``STRIPE_CONNECT_TIMEOUT`` / ``STRIPE_READ_TIMEOUT``).
+
+Transient failures (connection errors, timeouts, 409 lock conflicts, 429 and
+5xx, or ``Stripe-Should-Retry: true``) are retried up to
+``STRIPE_MAX_RETRIES`` times with full-jitter exponential backoff. Creates
+carry an idempotency key, so a retried create never makes a second payment
+intent. Call latency is recorded per operation in ``latency``.
+
+``STRIPE_API_BASE`` points the client at another server, such as the
+offline fake in ``integrations.stripe.fake``.
+"""
+
+import bisect
+import json
+import random
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+
+import requests
 from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from requests.adapters import HTTPAdapter
 
+DEFAULT_API_BASE = 'https://api.stripe.com'
+RETRY_STATUSES = {409, 429, 500, 502, 503, 504}
+
+
+class StripeError(Exception):
+    """
+    A Stripe API call failed. ``status`` is the HTTP status (``None`` for
+    network errors) and ``code`` the Stripe error code, if any.
+    """
+
+    def __init__(self, message, status=None, code=None, retryable=False):
+        self.status = status
+        self.code = code
+        self.retryable = retryable
+        super().__init__(message)
+
+
+class LatencyHistogram:
+    """
+    Thread-safe latency histogram per ``(operation, outcome)``. Each bucket
+    counts the calls that took at most its bound in milliseconds (and more
+    than the previous bound).
+    """
+    BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
 
-class StripeClient:
     def __init__(self):
-        stripe.api_key = settings.STRIPE_SECRET_KEY
-        self.webhook_secret = settings.STRIPE_WEBHOOK_SECRET
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, operation, outcome, seconds):
+        ms = seconds * 1000
+        with self._lock:
+            series = self._series.setdefault(
+                (operation, outcome), {'counts': [0] * (len(self.BUCKETS_MS) + 1), 'count': 0, 'sum_ms': 0.0}
+            )
+            series['counts'][bisect.bisect_left(self.BUCKETS_MS, ms)] += 1
+            series['count'] += 1
+            series['sum_ms'] += ms
+
+    def snapshot(self):
+        """
+        ``{(operation, outcome): {'buckets': {le_ms: count}, 'count', 'sum_ms'}}``;
+        the last bucket is ``'+Inf'``.
+        """
+        with self._lock:
+            return {
+                key: {
+                    'buckets': dict(zip(self.BUCKETS_MS + ('+Inf',), series['counts'])),
+                    'count': series['count'],
+                    'sum_ms': round(series['sum_ms'], 3),
+                }
+                for key, series in self._series.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+latency = LatencyHistogram()
+
+
+def to_namespace(value):
+    """Stripe JSON as attribute-accessible objects (``intent.client_secret``)."""
+    if isinstance(value, dict):
+        return SimpleNamespace(**{key: to_namespace(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return [to_namespace(item) for item in value]
+    return value
+
+
+def encode_params(params, prefix=None):
+    """Flatten nested params into Stripe's form encoding (``metadata[order_id]=1``)."""
+    pairs = []
+    for key, value in params.items():
+        name = f'{prefix}[{key}]' if prefix else key
+        if isinstance(value, dict):
+            pairs.extend(encode_params(value, name))
+        elif value is not None:
+            pairs.append((name, str(value)))
+    return pairs
+
 
-    def create_payment_intent(self, amount, currency="pkr", metadata=None):
+class StripeClient:
+    def __init__(self, api_key=None, webhook_secret=None, api_base=None, connect_timeout=None, read_timeout=None,
+                 max_retries=None, backoff_base=None, backoff_cap=None, pool_size=None, session=None):
+        self.api_key = api_key or settings.STRIPE_SECRET_KEY
+        self.webhook_secret = webhook_secret or settings.STRIPE_WEBHOOK_SECRET
+        self.api_base = (api_base or getattr(settings, 'STRIPE_API_BASE', DEFAULT_API_BASE)).rstrip('/')
+        self.timeout = (
+            connect_timeout if connect_timeout is not None else getattr(settings, 'STRIPE_CONNECT_TIMEOUT', 3.0),
+            read_timeout if read_timeout is not None else getattr(settings, 'STRIPE_READ_TIMEOUT', 10.0),
+        )
+        self.max_retries = max_retries if max_retries is not None else getattr(settings, 'STRIPE_MAX_RETRIES', 2)
+        self.backoff_base = backoff_base if backoff_base is not None else 0.25
+        self.backoff_cap = backoff_cap if backoff_cap is not None else 2.0
+        self.session = session or self.build_session(pool_size or getattr(settings, 'STRIPE_POOL_SIZE', 10))
+
+    def build_session(self, pool_size):
+        session = requests.Session()
+        # Retries are handled in request() so they can honour Stripe's headers and idempotency
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({'Authorization': f'Bearer {self.api_key}'})
+        return session
+
+    def backoff(self, attempt, retry_after=None):
+        """Full-jitter exponential backoff, capped; ``Retry-After`` wins when sent."""
+        if retry_after is not None:
+            return min(retry_after, self.backoff_cap)
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def request(self, method, path, operation, params=None, idempotency_key=None):
+        """
+        Call the API, retrying transient failures, and return the decoded JSON.
+        Raises ``StripeError``.
+        """
+        headers = {'Idempotency-Key': idempotency_key} if idempotency_key else {}
+        data = encode_params(params) if params and method == 'POST' else None
+        query = encode_params(params) if params and method != 'POST' else None
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            retry_after = None
+            try:
+                response = self.session.request(
+                    method, f'{self.api_base}{path}', data=data, params=query, headers=headers, timeout=self.timeout,
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = StripeError(f'Stripe request failed: {e}', retryable=True)
+            else:
+                if response.status_code < 400:
+                    latency.observe(operation, 'ok', time.monotonic() - started)
+                    return response.json()
+                error = self.error_from(response)
+                retry_after = response.headers.get('Retry-After')
+                retry_after = float(retry_after) if retry_after and retry_after.replace('.', '', 1).isdigit() else None
+
+            latency.observe(operation, 'error', time.monotonic() - started)
+            if not error.retryable or attempt >= self.max_retries:
+                raise error
+            time.sleep(self.backoff(attempt, retry_after))
+            attempt += 1
+
+    def error_from(self, response):
+        try:
+            body = response.json().get('error', {})
+        except ValueError:
+            body = {}
+        should_retry = response.headers.get('Stripe-Should-Retry')
+        if should_retry is not None:
+            retryable = should_retry == 'true'
+        else:
+            retryable = response.status_code in RETRY_STATUSES
+        return StripeError(
+            body.get('message') or f'Stripe returned HTTP {response.status_code}',
+            status=response.status_code, code=body.get('code'), retryable=retryable,
+        )
+
+    def create_payment_intent(self, amount, currency="pkr", metadata=None, idempotency_key=None):
         """
         amount must be in the smallest currency unit (paisa for PKR).
         Example: 100 PKR => 10000 paisa
+
+        The same idempotency key (a new UUID unless given) is sent on every
+        retry, so a retried create never makes a second payment intent.
         """
-        return stripe.PaymentIntent.create(
-            amount=amount,
-            currency=currency,
-            metadata=metadata or {},
-        )
+        return to_namespace(self.request(
+            'POST', '/v1/payment_intents', 'payment_intent.create',
+            params={'amount': amount, 'currency': currency, 'metadata': metadata or {}},
+            idempotency_key=idempotency_key or str(uuid.uuid4()),
+        ))
 
     def retrieve_payment_intent(self, intent_id):
-        return stripe.PaymentIntent.retrieve(intent_id)
+        return to_namespace(self.request('GET', f'/v1/payment_intents/{intent_id}', 'payment_intent.retrieve'))
 
     def construct_event(self, payload, sig_header):
-        return stripe.Webhook.construct_event(
-            payload, sig_header, self.webhook_secret
-        )
+        """
+        Verify the webhook signature and return the event as a plain dict
+        (``StripeObject`` is not a dict in every stripe release).
+        """
+        import stripe
+
+        stripe.Webhook.construct_event(payload, sig_header, self.webhook_secret)
+        return json.loads(payload)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_stripe_client():
+    """
+    Return the process-wide Stripe client (created on first use).
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = StripeClient()
+    return _client
+
+
+@receiver(setting_changed)
+def reset_stripe_client(setting, **kwargs):
+    global _client
+    if setting.startswith('STRIPE_'):
+        _client = None
@@ -0,0 +1,146 @@
+"""
+Stripe webhook event store and processing.
+
+``store_event`` is all the webhook view does: one ``INSERT ... ON CONFLICT
+DO NOTHING`` keyed by the Stripe event id, so retries of an event are
+dropped and the acknowledgement does not wait on order updates.
+
+``process_pending`` (run by the ``process_stripe_events`` command or the
+Celery task) applies pending events in ``created`` order. Events of one
+payment intent are applied strictly in order: if one fails, the later
+events of that intent wait until it succeeds or is replayed
+(``replay_stripe_events``). Each event is claimed with ``SELECT ... FOR
+UPDATE SKIP LOCKED`` and a conditional status flip, so concurrent workers
+never apply it twice.
+"""
+
+import logging
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import transaction
+from django.utils import timezone
+
+from core.enums import PaymentStatus
+from orders.events import record_payment_event
+from orders.models import Order
+from integrations.models import StripeEvent
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 100
+MAX_ATTEMPTS = 5
+
+
+def payment_intent_of(event):
+    """
+    The payment intent an event belongs to, if any.
+    """
+    obj = event.get('data', {}).get('object', {})
+    if event.get('type', '').startswith('payment_intent.'):
+        return obj.get('id')
+    return obj.get('payment_intent')
+
+
+def store_event(event):
+    """
+    Insert a verified Stripe event unless its id is already stored.
+    """
+    created = event.get('created')
+    StripeEvent.objects.bulk_create([
+        StripeEvent(
+            event_id=event['id'],
+            type=event['type'],
+            payment_intent=payment_intent_of(event),
+            payload=event,
+            created=datetime.fromtimestamp(created, tz=dt_timezone.utc) if created else timezone.now(),
+        )
+    ], ignore_conflicts=True)
+
+
+def set_payment_status(event, payment_status):
+    order_id = event['data']['object'].get('metadata', {}).get('order_id')
+    # Update payment status and append it to the order's event log
+    if order_id and Order.objects.filter(id=order_id).update(payment_status=payment_status):
+        record_payment_event(order_id, payment_status)
+
+
+HANDLERS = {
+    'payment_intent.succeeded': lambda event: set_payment_status(event, PaymentStatus.SUCCESS.value),
+    'payment_intent.payment_failed': lambda event: set_payment_status(event, PaymentStatus.FAILED.value),
+}
+
+
+def process_event(stored):
+    """
+    Claim and apply one stored event in its own transaction and record the
+    outcome. Returns True if it was applied (or needs no handling), False if
+    it failed, and ``None`` if another worker holds or already applied it.
+    """
+    handler = HANDLERS.get(stored.type)
+    status = StripeEvent.PROCESSED if handler else StripeEvent.IGNORED
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            # Lock the row (other workers skip it on PostgreSQL) and flip its
+            # status before applying, so an event is applied at most once
+            pending = StripeEvent.objects.filter(pk=stored.pk, status=StripeEvent.PENDING)
+            if pending.select_for_update(skip_locked=True).values_list('pk', flat=True).first() is None:
+                return None
+            if not pending.update(status=status, processed_at=now, last_error=None):
+                return None
+            if handler is not None:
+                handler(stored.payload)
+        stored.status, stored.processed_at, stored.last_error = status, now, None
+        return True
+    except Exception as e:
+        logger.exception("Stripe event %s failed", stored.event_id)
+        stored.attempts += 1
+        stored.last_error = f"{type(e).__name__}: {e}"
+        stored.status = StripeEvent.FAILED if stored.attempts >= MAX_ATTEMPTS else StripeEvent.PENDING
+        stored.save(update_fields=['attempts', 'last_error', 'status'])
+        return False
+
+
+def process_pending(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Process up to ``batch_size`` pending events, oldest first. Events of a
+    payment intent with a failed event are skipped, and so are the events
+    after one that errors, or that another worker holds, in this batch.
+    Returns ``{'processed', 'failed', 'deferred'}``.
+    """
+    blocked = set(
+        StripeEvent.objects
+        .filter(status=StripeEvent.FAILED, payment_intent__isnull=False)
+        .values_list('payment_intent', flat=True)
+    )
+    pending = (
+        StripeEvent.objects
+        .filter(status=StripeEvent.PENDING)
+        .exclude(payment_intent__in=blocked)
+        .order_by('created', 'id')
+    )
+    counts = {'processed': 0, 'failed': 0, 'deferred': 0}
+    for stored in pending[:batch_size]:
+        if stored.payment_intent in blocked:
+            counts['deferred'] += 1
+            continue
+        applied = process_event(stored)
+        if applied:
+            counts['processed'] += 1
+            continue
+        if applied is None:
+            counts['deferred'] += 1
+        else:
+            counts['failed'] += 1
+        # Keep later events of the intent behind this one
+        if stored.payment_intent:
+            blocked.add(stored.payment_intent)
+    return counts
+
+
+def replay_events(events):
+    """
+    Put ``events`` (a ``StripeEvent`` queryset) back in the queue with a
+    fresh attempt budget. Returns the number of events re-queued.
+    """
+    return events.update(status=StripeEvent.PENDING, attempts=0, last_error=None, processed_at=None)
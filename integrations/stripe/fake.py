@@ -0,0 +1,173 @@
+"""
+A small offline stand-in for the Stripe payment intents API.
+
+Serves ``POST /v1/payment_intents`` and ``GET /v1/payment_intents/<id>``
+with Stripe's form encoding, JSON responses and idempotency-key replay, and
+can inject failures and latency. Point ``STRIPE_API_BASE`` at it (the tests
+do this through the ``fake_stripe`` fixture).
+Run: python manage.py run_fake_stripe --port 12111
+"""
+
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+INTENT_PATH = re.compile(r'^/v1/payment_intents/(?P<intent_id>[^/?]+)$')
+PARAM_KEY = re.compile(r'^(?P<name>\w+)\[(?P<key>[^\]]+)\]$')
+
+
+def decode_params(body):
+    """Stripe form encoding back to nested dicts (one level, e.g. ``metadata``)."""
+    params = {}
+    for name, value in parse_qsl(body, keep_blank_values=True):
+        match = PARAM_KEY.match(name)
+        if match:
+            params.setdefault(match['name'], {})[match['key']] = value
+        else:
+            params[name] = value
+    return params
+
+
+class FakeStripeServer(ThreadingHTTPServer):
+    """
+    In-memory Stripe. ``calls`` records every created payment intent's
+    ``amount``, ``currency`` and ``metadata``; ``requests`` records every
+    request as ``(method, path, idempotency_key)``.
+    """
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0):
+        super().__init__((host, port), FakeStripeHandler)
+        self.latency = latency
+        self.intents = {}
+        self.idempotent = {}
+        self.calls = []
+        self.requests = []
+        self.failures = []
+        self.lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def fail_next(self, count=1, status=500, should_retry=None, body=None):
+        """Answer the next ``count`` requests with an error response."""
+        with self.lock:
+            self.failures.extend([(status, should_retry, body)] * count)
+
+    def set_status(self, intent_id, status, last_payment_error=None):
+        """Move an intent to ``status`` (e.g. ``succeeded``) as if it was paid or declined."""
+        with self.lock:
+            intent = self.intents[intent_id]
+            intent['status'] = status
+            intent['last_payment_error'] = last_payment_error
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class FakeStripeHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def respond(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def error(self, status, message, code=None, headers=None):
+        self.respond(status, {'error': {'message': message, 'code': code, 'type': 'invalid_request_error'}}, headers)
+
+    def begin(self):
+        """Record the request and apply injected latency/failures. Returns False if answered."""
+        server = self.server
+        idempotency_key = self.headers.get('Idempotency-Key')
+        with server.lock:
+            server.requests.append((self.command, self.path, idempotency_key))
+            failure = server.failures.pop(0) if server.failures else None
+        if server.latency:
+            time.sleep(server.latency)
+        if not self.headers.get('Authorization', '').startswith('Bearer '):
+            self.error(401, 'You did not provide an API key.')
+            return False
+        if failure:
+            status, should_retry, body = failure
+            headers = {'Stripe-Should-Retry': 'true' if should_retry else 'false'} if should_retry is not None else {}
+            if body is None:
+                self.error(status, 'Injected failure', headers=headers)
+            else:
+                self.respond(status, body, headers)
+            return False
+        return True
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode()
+        if not self.begin():
+            return
+        if self.path != '/v1/payment_intents':
+            return self.error(404, f'Unrecognized request URL (POST: {self.path})')
+
+        server = self.server
+        idempotency_key = self.headers.get('Idempotency-Key')
+        with server.lock:
+            if idempotency_key and idempotency_key in server.idempotent:
+                return self.respond(200, server.idempotent[idempotency_key], {'Idempotent-Replayed': 'true'})
+
+        params = decode_params(body)
+        try:
+            amount = int(params.get('amount', ''))
+        except ValueError:
+            return self.error(400, 'Invalid integer: amount', code='parameter_invalid_integer')
+        intent_id = f'pi_fake_{uuid.uuid4().hex[:24]}'
+        intent = {
+            'id': intent_id,
+            'object': 'payment_intent',
+            'amount': amount,
+            'currency': params.get('currency', 'usd'),
+            'metadata': params.get('metadata', {}),
+            'status': 'requires_payment_method',
+            'last_payment_error': None,
+            'client_secret': f'{intent_id}_secret_{uuid.uuid4().hex[:12]}',
+            'created': int(time.time()),
+        }
+        with server.lock:
+            server.intents[intent_id] = intent
+            server.calls.append({'amount': amount, 'currency': intent['currency'], 'metadata': intent['metadata']})
+            if idempotency_key:
+                server.idempotent[idempotency_key] = intent
+        self.respond(200, intent)
+
+    def do_GET(self):
+        if not self.begin():
+            return
+        match = INTENT_PATH.match(self.path.split('?', 1)[0])
+        intent = self.server.intents.get(match['intent_id']) if match else None
+        if intent is None:
+            return self.error(404, f'No such payment_intent: {match["intent_id"] if match else self.path}', code='resource_missing')
+        self.respond(200, intent)
@@ -0,0 +1,191 @@
+"""
+Payment reconciliation against Stripe payment intents.
+
+When a webhook is missed the order stays ``Pending``. ``reconcile_payments``
+walks pending ``Gateway`` orders that have a ``payment_id`` in primary-key
+chunks. It fetches each chunk's payment intents concurrently from a bounded
+thread pool that shares one rate limiter. Then it applies the settled states
+with one ``UPDATE`` per status and one event insert per chunk.
+
+The limiter starts at ``rate`` requests per second and halves whenever
+Stripe still answers 429 after the client's own retries, so a run backs off
+instead of eating the account's rate limit. Intents whose amount differs
+from the order total, and intents Stripe does not know, are reported as
+mismatches and left alone.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.utils import timezone
+
+from core.enums import PaymentStatus, PaymentType
+from orders.models import Order, OrderEvent
+from integrations.stripe.client import StripeError, get_stripe_client
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 500
+DEFAULT_WORKERS = 8
+# Stripe allows 25 read requests per second in test mode (100 live)
+DEFAULT_RATE = 20
+# Leave recent orders to the webhook
+DEFAULT_MIN_AGE = timedelta(minutes=15)
+RATE_LIMIT_RETRIES = 3
+
+
+def payment_status_of(intent):
+    """
+    The order payment status an intent has settled on, or ``None`` while it
+    is still in progress.
+    """
+    if intent.status == 'succeeded':
+        return PaymentStatus.SUCCESS.value
+    if intent.status == 'canceled':
+        return PaymentStatus.FAILED.value
+    if intent.status == 'requires_payment_method' and getattr(intent, 'last_payment_error', None):
+        return PaymentStatus.FAILED.value
+    return None
+
+
+def minor_units(amount):
+    return int((Decimal(amount) * 100).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+class RateLimiter:
+    """
+    Token bucket shared by the worker threads. ``slow_down`` halves the rate
+    (down to ``minimum``) after a 429.
+    """
+
+    def __init__(self, rate, minimum=1):
+        self.rate = float(rate)
+        self.minimum = minimum
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + 1 / self.rate
+        if wait > 0:
+            time.sleep(wait)
+
+    def slow_down(self):
+        with self._lock:
+            self.rate = max(self.minimum, self.rate / 2)
+            self._next = max(self._next, time.monotonic()) + 1 / self.rate
+        logger.warning("Stripe rate limited; reconciling at %.1f requests/s", self.rate)
+
+
+def pending_orders(min_age=DEFAULT_MIN_AGE, now=None):
+    """
+    Gateway orders still waiting on their payment.
+    """
+    now = now or timezone.now()
+    return Order.objects.filter(
+        payment_type=PaymentType.GATEWAY.value,
+        payment_status=PaymentStatus.PENDING.value,
+        payment_id__isnull=False,
+        added_on__lt=now - min_age,
+    ).exclude(payment_id='')
+
+
+def fetch_intent(client, limiter, payment_id):
+    """
+    Retrieve one intent through the limiter. Returns ``(intent, error)``.
+    """
+    for attempt in range(RATE_LIMIT_RETRIES + 1):
+        limiter.acquire()
+        try:
+            return client.retrieve_payment_intent(payment_id), None
+        except StripeError as e:
+            if e.status == 429 and attempt < RATE_LIMIT_RETRIES:
+                limiter.slow_down()
+                continue
+            return None, e
+
+
+def reconcile_payments(chunk_size=DEFAULT_CHUNK_SIZE, workers=DEFAULT_WORKERS, rate=DEFAULT_RATE,
+                       min_age=DEFAULT_MIN_AGE, dry_run=False, client=None, now=None):
+    """
+    Settle pending gateway orders from their Stripe payment intents.
+
+    Returns ``{'checked', 'updated': {payment_status: orders}, 'errors',
+    'mismatches', 'seconds'}``. Each mismatch is a dict with ``order_id``,
+    ``payment_id``, ``reason`` (``amount`` or ``missing``) and details.
+    """
+    started = time.monotonic()
+    client = client or get_stripe_client()
+    limiter = RateLimiter(rate)
+    orders = pending_orders(min_age, now).order_by('pk').values_list('pk', 'payment_id', 'total_amt')
+    stats = {'checked': 0, 'updated': {}, 'errors': 0, 'mismatches': []}
+
+    last_pk = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='reconcile') as pool:
+        while True:
+            chunk = list(orders.filter(pk__gt=last_pk)[:chunk_size])
+            if not chunk:
+                break
+            last_pk = chunk[-1][0]
+            results = pool.map(lambda row: fetch_intent(client, limiter, row[1]), chunk)
+
+            settled = {}
+            for (order_id, payment_id, total), (intent, error) in zip(chunk, results):
+                stats['checked'] += 1
+                if error is not None:
+                    if error.code == 'resource_missing':
+                        stats['mismatches'].append({'order_id': order_id, 'payment_id': payment_id, 'reason': 'missing'})
+                    else:
+                        stats['errors'] += 1
+                        logger.warning("Could not fetch %s for order %s: %s", payment_id, order_id, error)
+                    continue
+                if intent.amount != minor_units(total):
+                    stats['mismatches'].append({
+                        'order_id': order_id, 'payment_id': payment_id, 'reason': 'amount',
+                        'order_amount': minor_units(total), 'intent_amount': intent.amount,
+                        'intent_status': intent.status,
+                    })
+                    continue
+                payment_status = payment_status_of(intent)
+                if payment_status is not None:
+                    settled.setdefault(payment_status, []).append(order_id)
+
+            for payment_status, order_ids in settled.items():
+                stats['updated'][payment_status] = stats['updated'].get(payment_status, 0) + len(order_ids)
+            if settled and not dry_run:
+                apply_statuses(settled)
+
+    stats['seconds'] = round(time.monotonic() - started, 3)
+    logger.info(
+        "payment reconciliation%s: %s orders checked, %s updated, %s mismatches, %s errors (%.3fs)",
+        " (dry run)" if dry_run else "", stats['checked'], sum(stats['updated'].values()),
+        len(stats['mismatches']), stats['errors'], stats['seconds'],
+    )
+    return stats
+
+
+def apply_statuses(settled):
+    """
+    Bulk-update ``{payment_status: [order_id]}`` and log one event per
+    order that was still pending (a webhook may have got there first).
+    """
+    with transaction.atomic():
+        events = []
+        for payment_status, order_ids in settled.items():
+            pending = Order.objects.select_for_update().filter(
+                pk__in=order_ids, payment_status=PaymentStatus.PENDING.value,
+            )
+            changed = list(pending.values_list('pk', flat=True))
+            Order.objects.filter(pk__in=changed).update(payment_status=payment_status)
+            events.extend(
+                OrderEvent(order_id=order_id, payment_status=payment_status, source='reconcile')
+                for order_id in changed
+            )
+        OrderEvent.objects.bulk_create(events)
@@ -1,13 +1,12 @@
 from django.http import HttpResponse
 from django.views.decorators.csrf import csrf_exempt
-from orders.models import Order
-from core.models import OrderStatus
-from .client import StripeClient
-from core.enums import PaymentStatus
-stripe_client = StripeClient()
+from .client import get_stripe_client
+from .events import store_event
+
 
 @csrf_exempt
 def webhook_view(request):
+    stripe_client = get_stripe_client()
     payload = request.body
     sig_header = request.META.get("HTTP_STRIPE_SIGNATURE")
 
@@ -30,22 +29,6 @@ def webhook_view(request):
         print(f"Payload (first 200 chars): {payload[:200]}")
         return HttpResponse(status=400)
 
-    if event["type"] == "payment_intent.succeeded":
-        intent = event["data"]["object"]
-        order_id = intent["metadata"].get("order_id")
-
-        # Update payment status
-        Order.objects.filter(id=order_id).update(
-            payment_status=PaymentStatus.SUCCESS.value
-        )
-
-    elif event["type"] == "payment_intent.payment_failed":
-        intent = event["data"]["object"]
-        order_id = intent["metadata"].get("order_id")
-        
-        # Update payment status
-        Order.objects.filter(id=order_id).update(
-            payment_status=PaymentStatus.FAILED.value
-        )
-
-    return HttpResponse(status=200)
\ No newline at end of file
+    # Store and acknowledge; orders are updated by the event worker
+    store_event(event)
+    return HttpResponse(status=200)
@@ -0,0 +1,15 @@
+"""
+Celery tasks for the integrations app (loaded by the Celery worker only).
+"""
+
+from celery import shared_task
+
+from .stripe.events import process_pending
+
+
+@shared_task
+def process_stripe_events():
+    """
+    Apply pending Stripe webhook events (``process_stripe_events`` command).
+    """
+    return process_pending()
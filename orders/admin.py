@@ -3,7 +3,9 @@ Order admin configuration.
 """
 
 from django.contrib import admin
-from .models import Order, OrderDetail, Cart
+from django.utils import timezone
+from .models import Order, OrderDetail, OrderEvent, Cart, ArchivedOrder, ArchivedOrderDetail, OutboxMessage, DailySalesRollup
+from .search import search_orders, OrderSearchError
 
 
 class OrderDetailInline(admin.TabularInline):
@@ -12,17 +14,72 @@ class OrderDetailInline(admin.TabularInline):
     readonly_fields = ['product', 'product_attr', 'price', 'qty']
 
 
+class OrderEventInline(admin.TabularInline):
+    model = OrderEvent
+    extra = 0
+    can_delete = False
+    readonly_fields = ['order_status', 'payment_status', 'track_details', 'source', 'created_at']
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = ['id', 'user', 'name', 'email', 'order_status', 'payment_type', 'payment_status', 'total_amt', 'added_on']
     list_filter = ['order_status', 'payment_type', 'payment_status', 'added_on']
-    search_fields = ['name', 'email', 'mobile']
+    search_fields = ['name', 'email', 'mobile', 'payment_id', 'txn_id']
     readonly_fields = ['added_on']
-    inlines = [OrderDetailInline]
+    inlines = [OrderDetailInline, OrderEventInline]
+
+    def get_search_results(self, request, queryset, search_term):
+        # Route the term to the matching index (see orders.search) instead of
+        # an OR of icontains over every search field.
+        if not search_term.strip():
+            return queryset, False
+        try:
+            return search_orders(queryset, search_term)[1], False
+        except OrderSearchError:
+            return queryset.none(), False
+
+
+class ArchivedOrderDetailInline(admin.TabularInline):
+    model = ArchivedOrderDetail
+    extra = 0
+    readonly_fields = ['product', 'product_attr', 'price', 'qty']
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'name', 'email', 'order_status', 'payment_type', 'payment_status', 'total_amt', 'added_on', 'archived_on']
+    list_filter = ['payment_type', 'payment_status', 'added_on']
+    search_fields = ['name', 'email', 'mobile']
+    readonly_fields = ['added_on', 'archived_on']
+    inlines = [ArchivedOrderDetailInline]
 
 
 @admin.register(Cart)
 class CartAdmin(admin.ModelAdmin):
     list_display = ['user_id', 'user_type', 'product', 'qty', 'added_on']
     list_filter = ['user_type', 'added_on']
-    search_fields = ['user_id', 'product__name']
\ No newline at end of file
+    search_fields = ['user_id', 'product__name']
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ['id', 'topic', 'status', 'attempts', 'available_at', 'created_at', 'sent_at']
+    list_filter = ['topic', 'status']
+    readonly_fields = ['topic', 'payload', 'attempts', 'last_error', 'created_at', 'sent_at']
+    actions = ['retry']
+
+    @admin.action(description="Retry selected messages now")
+    def retry(self, request, queryset):
+        updated = queryset.exclude(status=OutboxMessage.SENT).update(
+            status=OutboxMessage.PENDING, attempts=0, available_at=timezone.now(),
+        )
+        self.message_user(request, f"{updated} messages queued for delivery.")
+
+
+@admin.register(DailySalesRollup)
+class DailySalesRollupAdmin(admin.ModelAdmin):
+    list_display = ['date', 'orders', 'items', 'revenue', 'updated_at']
+    date_hierarchy = 'date'
@@ -0,0 +1,160 @@
+"""
+Order archival: moving historical orders out of the live tables.
+
+Orders older than the archive horizon (``ORDER_ARCHIVE_HORIZON_DAYS``) are
+copied with their details into ``orders_archive`` / ``orders_details_archive``
+and removed from the live tables, one bounded chunk per transaction. Live
+reads stay small; the archive is only consulted when a request explicitly
+asks for a date range that reaches past the horizon.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Order, OrderDetail, ArchivedOrder, ArchivedOrderDetail
+
+DEFAULT_ARCHIVE_CHUNK_SIZE = 1000
+
+ORDER_COLUMNS = [
+    'id', 'user_id', 'name', 'email', 'mobile', 'address', 'city', 'state', 'pincode',
+    'coupon_code', 'coupon_value', 'order_status_id', 'payment_type', 'payment_status',
+    'payment_id', 'txn_id', 'total_amt', 'track_details', 'added_on',
+]
+DETAIL_COLUMNS = [
+    'id', 'order_id', 'product_id', 'product_attr_id', 'price', 'qty',
+    'product_name', 'sku', 'size', 'color', 'image', 'mrp', 'tax_rate',
+]
+
+
+def archive_horizon_days():
+    return getattr(settings, 'ORDER_ARCHIVE_HORIZON_DAYS', 365)
+
+
+def archive_cutoff(horizon_days=None, now=None):
+    """
+    Orders added before the returned datetime belong in the archive.
+    """
+    horizon_days = archive_horizon_days() if horizon_days is None else horizon_days
+    return (now or timezone.now()) - timedelta(days=horizon_days)
+
+
+def ensure_archive_partitions(start, end):
+    """
+    On PostgreSQL, create the yearly ``orders_archive`` partitions covering
+    ``start``..``end``. No-op on other databases.
+    """
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        for year in range(start.year, end.year + 1):
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS orders_archive_y{year} PARTITION OF orders_archive "
+                f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+            )
+
+
+def archive_chunk(cutoff, chunk_size=DEFAULT_ARCHIVE_CHUNK_SIZE):
+    """
+    Move up to ``chunk_size`` orders added before ``cutoff`` into the archive
+    in one transaction. Returns ``(orders_moved, details_moved)``.
+    """
+    with transaction.atomic():
+        orders = list(
+            Order.objects
+            .filter(added_on__lt=cutoff)
+            .order_by('pk')
+            .values(*ORDER_COLUMNS)[:chunk_size]
+        )
+        if not orders:
+            return 0, 0
+
+        order_ids = [order['id'] for order in orders]
+        details = list(OrderDetail.objects.filter(order_id__in=order_ids).values(*DETAIL_COLUMNS))
+
+        ensure_archive_partitions(
+            min(order['added_on'] for order in orders),
+            max(order['added_on'] for order in orders),
+        )
+        ArchivedOrder.objects.bulk_create([ArchivedOrder(**order) for order in orders])
+        ArchivedOrderDetail.objects.bulk_create([ArchivedOrderDetail(**detail) for detail in details])
+
+        OrderDetail.objects.filter(order_id__in=order_ids).delete()
+        Order.objects.filter(pk__in=order_ids).delete()
+    return len(orders), len(details)
+
+
+def archive_orders(cutoff, chunk_size=DEFAULT_ARCHIVE_CHUNK_SIZE):
+    """
+    Archive every order added before ``cutoff``, chunk by chunk.
+    Yields ``(orders_moved, details_moved)`` for each committed chunk.
+    """
+    while True:
+        moved = archive_chunk(cutoff, chunk_size)
+        if not moved[0]:
+            return
+        yield moved
+
+
+def _as_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    moment = datetime.combine(value, time.min)
+    return timezone.make_aware(moment) if settings.USE_TZ else moment
+
+
+def wants_archive(date_from=None, date_to=None, horizon_days=None):
+    """
+    True when an explicit date filter reaches before the archive horizon.
+    Requests without a date filter never read the archive.
+    """
+    boundary = date_from or date_to
+    if boundary is None:
+        return False
+    return _as_datetime(boundary) < archive_cutoff(horizon_days)
+
+
+class OrderHistory:
+    """
+    Read-only sequence of live orders followed by archived orders.
+
+    Every archived order is older than every live order, so with the default
+    ``-added_on`` ordering the live queryset comes first. Supports ``len()``
+    and slicing, which is all Django's paginator needs; only the requested
+    page is fetched from each table.
+    """
+
+    def __init__(self, live_queryset, archived_queryset):
+        self.live = live_queryset
+        self.archived = archived_queryset
+        self._live_count = None
+
+    @property
+    def live_count(self):
+        if self._live_count is None:
+            self._live_count = self.live.count()
+        return self._live_count
+
+    def count(self):
+        return self.live_count + self.archived.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        stop = index.stop if index.stop is not None else self.count()
+        items = []
+        if start < self.live_count:
+            items.extend(self.live[start:min(stop, self.live_count)])
+        if stop > self.live_count:
+            items.extend(self.archived[max(start - self.live_count, 0):stop - self.live_count])
+        return items
+
+    def __iter__(self):
+        yield from self.live
+        yield from self.archived
@@ -0,0 +1,592 @@
+"""
+Pluggable cart storage.
+
+``CART_BACKEND`` selects where cart lines live:
+
+* ``orders.cart.DatabaseCartBackend`` (default) reads and writes the ``cart``
+  table directly.
+* ``orders.cart.RedisCartBackend`` keeps one Redis hash per ``user_id``
+  (``product_attr_id -> qty``), so adds, updates and removals are single
+  O(1) Redis commands. Changed carts are marked dirty and persisted to the
+  ``cart`` table by ``flush_carts`` (write-behind), which keeps the table
+  usable for analytics and recovery.
+
+Both backends return ``Cart`` instances with ``product`` and
+``product_attr`` loaded; Redis lines are unsaved and have no ``id``.
+
+``merge`` folds a guest cart into a registered one when the user logs in.
+Only guest (``Not-Reg``) lines are merged, and the id of a registered user
+is rejected with ``CartMergeError``, so a caller cannot take over another
+user's cart by passing their id.
+
+``apply`` takes a batch of ``add`` / ``set`` / ``remove`` operations for one
+cart, checks the stock of every referenced attribute with one query and
+writes the result all-or-nothing.
+"""
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.signals import setting_changed
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Least
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from products.models import ProductAttribute
+from .models import Cart
+
+# Everything CartSerializer and cart pricing read, in one query
+LINE_RELATED = ('product', 'product_attr__product__tax', 'product_attr__size', 'product_attr__color')
+ATTRIBUTE_RELATED = ('product__tax', 'size', 'color')
+
+
+class CartItemNotFound(LookupError):
+    """
+    Raised when a cart line to update does not exist.
+    """
+
+
+class CartStockError(ValueError):
+    """
+    Raised when adding to a line would exceed the attribute's stock.
+    ``available`` is ``None`` when the attribute does not exist.
+    """
+
+    def __init__(self, product_attr_id, available):
+        self.product_attr_id = product_attr_id
+        self.available = available
+        super().__init__(f'Product attribute {product_attr_id} is out of stock.')
+
+
+class CartMergeError(ValueError):
+    """
+    Raised when the cart to merge from is not a guest cart.
+    """
+
+
+class CartBatchError(ValueError):
+    """
+    Raised when a batch of cart operations is rejected; nothing is written.
+    ``errors`` holds one ``{'index', 'product_attr', 'error',
+    'available_stock'}`` dict per rejected operation.
+    """
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(f'{len(errors)} cart operation(s) rejected.')
+
+
+def batch_attributes(operations):
+    """
+    Load stock and product of every attribute referenced by ``operations``
+    in one query, as ``{product_attr_id: ProductAttribute}``.
+    """
+    attr_ids = {operation['product_attr'] for operation in operations}
+    return ProductAttribute.objects.only('id', 'qty', 'product_id').in_bulk(attr_ids)
+
+
+def plan_batch(current, operations, attributes):
+    """
+    Apply ``operations`` (dicts of ``op``, ``product_attr`` and ``qty``) in
+    order to ``current`` (``{product_attr_id: qty}``) and return the
+    resulting quantities.
+
+    Lines touched by an ``add`` or ``set`` must end within stock; untouched
+    lines are left alone. Raises ``CartBatchError`` listing every rejected
+    operation.
+    """
+    quantities = dict(current)
+    errors = []
+    touched = {}
+    for index, operation in enumerate(operations):
+        op, attr_id, qty = operation['op'], operation['product_attr'], operation.get('qty', 0)
+        if op == 'remove':
+            quantities.pop(attr_id, None)
+            continue
+        if attr_id not in attributes:
+            errors.append({'index': index, 'product_attr': attr_id, 'error': 'Product attribute not found', 'available_stock': None})
+            continue
+        quantities[attr_id] = quantities.get(attr_id, 0) + qty if op == 'add' else qty
+        touched[attr_id] = index
+
+    quantities = {attr_id: qty for attr_id, qty in quantities.items() if qty > 0}
+    for attr_id, index in touched.items():
+        available = attributes[attr_id].qty
+        if quantities.get(attr_id, 0) > available:
+            errors.append({'index': index, 'product_attr': attr_id, 'error': 'out of stock', 'available_stock': available})
+    if errors:
+        raise CartBatchError(sorted(errors, key=lambda error: error['index']))
+    return quantities
+
+
+class BaseCartBackend:
+    """
+    Interface shared by cart backends. Lines are identified by
+    ``(user_id, product_attr_id)``.
+    """
+
+    def lines(self, user_id):
+        """Cart lines of ``user_id`` as ``Cart`` instances."""
+        raise NotImplementedError
+
+    def summary(self, user_id):
+        """``{'item_count', 'quantity', 'subtotal'}`` for the cart badge, at current prices."""
+        raise NotImplementedError
+
+    def add(self, user_id, product_id, product_attr_id, qty, user_type='Not-Reg'):
+        """
+        Add ``qty`` to a line (creating it if needed) and return the line.
+        Raises ``CartStockError`` if the line would exceed the stock.
+        """
+        raise NotImplementedError
+
+    def set_qty(self, user_id, product_attr_id, qty):
+        """Set a line's quantity; ``qty <= 0`` removes it and returns ``None``."""
+        raise NotImplementedError
+
+    def remove(self, user_id, product_attr_id):
+        """Remove one line. Returns True if it existed."""
+        raise NotImplementedError
+
+    def remove_line(self, line_id, user_id=None):
+        """Remove a line by the ``id`` this backend exposes. Returns True if it existed."""
+        raise NotImplementedError
+
+    def clear(self, user_id):
+        """Remove every line of ``user_id``."""
+        raise NotImplementedError
+
+    def apply(self, user_id, operations, user_type='Not-Reg'):
+        """
+        Apply a batch of operations (see ``plan_batch``) atomically and
+        return the resulting lines. Raises ``CartBatchError`` if any
+        operation is rejected.
+        """
+        raise NotImplementedError
+
+    def merge(self, guest_user_id, user_id, user_type='Reg'):
+        """
+        Move the guest lines of ``guest_user_id`` into the cart of
+        ``user_id``, summing quantities of shared attributes and clamping
+        every merged line to stock, then drop the guest cart. Returns the
+        number of guest lines merged. Raises ``CartMergeError`` if
+        ``guest_user_id`` is a registered user's id.
+        """
+        raise NotImplementedError
+
+    def check_guest(self, guest_user_id):
+        """
+        Raise ``CartMergeError`` if ``guest_user_id`` names a registered user.
+        """
+        if str(guest_user_id).isdigit() and get_user_model().objects.filter(pk=int(guest_user_id)).exists():
+            raise CartMergeError(f'{guest_user_id} is not a guest cart.')
+
+    def flush(self, batch_size=500):
+        """Persist pending changes to the ``cart`` table. Returns the number of carts written."""
+        return 0
+
+
+class DatabaseCartBackend(BaseCartBackend):
+    """
+    Cart lines stored in the ``cart`` table.
+    """
+
+    def lines(self, user_id):
+        return list(Cart.objects.filter(user_id=user_id).select_related(*LINE_RELATED).order_by('id'))
+
+    def summary(self, user_id):
+        return Cart.objects.filter(user_id=user_id).aggregate(
+            item_count=Count('id'),
+            quantity=Coalesce(Sum('qty'), 0),
+            subtotal=Coalesce(
+                Sum(F('qty') * F('product_attr__price'), output_field=DecimalField(max_digits=12, decimal_places=2)),
+                Value(Decimal('0.00')),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            ),
+        )
+
+    def add(self, user_id, product_id, product_attr_id, qty, user_type='Not-Reg'):
+        """
+        Atomically create or increment the line, checking stock in the same
+        statement. Uses ``INSERT ... ON CONFLICT DO UPDATE`` on PostgreSQL and
+        SQLite, and a conditional ``F()`` update elsewhere. The product is
+        taken from the attribute.
+        """
+        if connection.vendor in ('postgresql', 'sqlite') and connection.features.can_return_columns_from_insert:
+            line_id = self._upsert(user_id, product_attr_id, qty, user_type)
+        else:
+            line_id = self._increment(user_id, product_attr_id, qty, user_type)
+        if line_id is None:
+            available = ProductAttribute.objects.filter(pk=product_attr_id).values_list('qty', flat=True).first()
+            raise CartStockError(product_attr_id, available)
+        return Cart.objects.select_related(*LINE_RELATED).get(pk=line_id)
+
+    def _upsert(self, user_id, product_attr_id, qty, user_type):
+        """
+        Insert the line, or add to it on conflict, only while the resulting
+        quantity fits in stock. Returns the line id, or ``None`` if the
+        attribute is missing or out of stock.
+        """
+        cart = connection.ops.quote_name(Cart._meta.db_table)
+        attributes = connection.ops.quote_name(ProductAttribute._meta.db_table)
+        sql = (
+            f"INSERT INTO {cart} (user_id, user_type, qty, product_id, product_attr_id, added_on) "
+            f"SELECT %s, %s, %s, product_id, id, %s FROM {attributes} WHERE id = %s AND qty >= %s "
+            f"ON CONFLICT (user_id, product_attr_id) DO UPDATE SET qty = {cart}.qty + excluded.qty "
+            f"WHERE (SELECT qty FROM {attributes} WHERE id = excluded.product_attr_id) >= {cart}.qty + excluded.qty "
+            f"RETURNING id"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [user_id, user_type, qty, timezone.now(), product_attr_id, qty])
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    def _increment(self, user_id, product_attr_id, qty, user_type, retry=True):
+        """
+        ``F()`` fallback: conditional increment, then insert; a concurrent
+        insert of the same line is retried as an increment.
+        """
+        lines = Cart.objects.filter(user_id=user_id, product_attr_id=product_attr_id)
+        if lines.filter(product_attr__qty__gte=F('qty') + qty).update(qty=F('qty') + qty):
+            return lines.values_list('id', flat=True).first()
+        if lines.exists():
+            return None
+        attribute = ProductAttribute.objects.filter(pk=product_attr_id, qty__gte=qty).values('product_id').first()
+        if attribute is None:
+            return None
+        try:
+            with transaction.atomic():
+                return Cart.objects.create(
+                    user_id=user_id, user_type=user_type, qty=qty,
+                    product_id=attribute['product_id'], product_attr_id=product_attr_id,
+                ).pk
+        except IntegrityError:
+            if not retry:
+                raise
+            return self._increment(user_id, product_attr_id, qty, user_type, retry=False)
+
+    def set_qty(self, user_id, product_attr_id, qty):
+        try:
+            cart_item = Cart.objects.get(user_id=user_id, product_attr_id=product_attr_id)
+        except Cart.DoesNotExist:
+            raise CartItemNotFound(product_attr_id)
+        if qty <= 0:
+            cart_item.delete()
+            return None
+        cart_item.qty = qty
+        cart_item.save()
+        return cart_item
+
+    def remove(self, user_id, product_attr_id):
+        return Cart.objects.filter(user_id=user_id, product_attr_id=product_attr_id).delete()[0] > 0
+
+    def remove_line(self, line_id, user_id=None):
+        return Cart.objects.filter(pk=line_id).delete()[0] > 0
+
+    def clear(self, user_id):
+        Cart.objects.filter(user_id=user_id).delete()
+
+    def apply(self, user_id, operations, user_type='Not-Reg'):
+        """
+        Lock the cart's lines, plan the batch against one stock query, then
+        write it with one delete, one bulk update and one bulk insert.
+        """
+        with transaction.atomic():
+            attributes = batch_attributes(operations)
+            existing = {
+                line.product_attr_id: line
+                for line in Cart.objects.select_for_update().filter(user_id=user_id).only('id', 'product_attr_id', 'qty')
+            }
+            quantities = plan_batch({attr_id: line.qty for attr_id, line in existing.items()}, operations, attributes)
+
+            removed = [attr_id for attr_id in existing if attr_id not in quantities]
+            changed = []
+            for attr_id, line in existing.items():
+                if attr_id in quantities and quantities[attr_id] != line.qty:
+                    line.qty = quantities[attr_id]
+                    changed.append(line)
+            created = [
+                Cart(user_id=user_id, user_type=user_type, qty=qty, product_id=attributes[attr_id].product_id, product_attr_id=attr_id)
+                for attr_id, qty in quantities.items()
+                if attr_id not in existing
+            ]
+
+            if removed:
+                Cart.objects.filter(user_id=user_id, product_attr_id__in=removed).delete()
+            if changed:
+                Cart.objects.bulk_update(changed, ['qty'])
+            if created:
+                if connection.features.supports_update_conflicts_with_target:
+                    # A line inserted concurrently since the lock was taken is overwritten, not duplicated
+                    Cart.objects.bulk_create(
+                        created, update_conflicts=True, unique_fields=['user_id', 'product_attr'], update_fields=['qty'],
+                    )
+                else:
+                    Cart.objects.bulk_create(created)
+        return self.lines(user_id)
+
+    def merge(self, guest_user_id, user_id, user_type='Reg'):
+        """
+        Four set-based statements in one transaction, whatever the cart
+        sizes: add guest quantities to shared lines, delete those guest
+        lines, re-key the remaining guest lines to ``user_id``, and drop
+        lines left with no stock.
+        """
+        if guest_user_id == user_id:
+            return 0
+        self.check_guest(guest_user_id)
+        stock = Subquery(ProductAttribute.objects.filter(pk=OuterRef('product_attr_id')).values('qty')[:1])
+        guest_lines = Cart.objects.filter(user_id=guest_user_id, user_type='Not-Reg')
+        guest_qty = Subquery(guest_lines.filter(product_attr_id=OuterRef('product_attr_id')).values('qty')[:1])
+
+        with transaction.atomic():
+            shared = Cart.objects.filter(user_id=user_id, product_attr_id__in=guest_lines.values('product_attr_id'))
+            summed = shared.update(qty=Least(F('qty') + guest_qty, stock))
+            guest_lines.filter(
+                product_attr_id__in=Cart.objects.filter(user_id=user_id).values('product_attr_id')
+            ).delete()
+            moved = guest_lines.update(user_id=user_id, user_type=user_type, qty=Least(F('qty'), stock))
+            Cart.objects.filter(user_id=user_id, qty=0).delete()
+        return summed + moved
+
+
+class RedisCartBackend(BaseCartBackend):
+    """
+    Cart lines stored in Redis hashes, persisted to the ``cart`` table by ``flush``.
+
+    ``remove_line`` takes the product attribute id, since Redis lines have
+    no database id. Requires the ``redis`` package unless a ``client`` (for
+    example ``fakeredis.FakeRedis()``) is passed in.
+    """
+    USER_TYPE_FIELD = '_user_type'
+
+    def __init__(self, client=None, url=None, prefix=None, ttl=None):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url or settings.CART_REDIS_URL)
+        self.client = client
+        self.prefix = prefix or getattr(settings, 'CART_REDIS_PREFIX', 'cart')
+        self.ttl = ttl if ttl is not None else getattr(settings, 'CART_REDIS_TTL', 60 * 60 * 24 * 30)
+
+    def key(self, user_id):
+        return f'{self.prefix}:{user_id}'
+
+    @property
+    def dirty_key(self):
+        return f'{self.prefix}:dirty'
+
+    def _read(self, user_id):
+        """Return ``(user_type, {product_attr_id: qty})`` for one cart."""
+        return self._parse(self.client.hgetall(self.key(user_id)))
+
+    def _parse(self, raw):
+        user_type = 'Not-Reg'
+        quantities = {}
+        for field, value in raw.items():
+            field = field.decode() if isinstance(field, bytes) else field
+            value = value.decode() if isinstance(value, bytes) else value
+            if field == self.USER_TYPE_FIELD:
+                user_type = value
+            elif int(value) > 0:
+                quantities[int(field)] = int(value)
+        return user_type, quantities
+
+    def _touch(self, pipe, user_id):
+        pipe.expire(self.key(user_id), self.ttl)
+        pipe.sadd(self.dirty_key, user_id)
+
+    def _build_lines(self, user_id, user_type, quantities):
+        attributes = ProductAttribute.objects.select_related(*ATTRIBUTE_RELATED).in_bulk(list(quantities))
+        return [
+            Cart(
+                user_id=user_id, user_type=user_type, qty=qty,
+                product=attributes[attr_id].product, product_attr=attributes[attr_id],
+            )
+            for attr_id, qty in sorted(quantities.items())
+            if attr_id in attributes
+        ]
+
+    def lines(self, user_id):
+        user_type, quantities = self._read(user_id)
+        return self._build_lines(user_id, user_type, quantities)
+
+    def summary(self, user_id):
+        _, quantities = self._read(user_id)
+        prices = dict(ProductAttribute.objects.filter(pk__in=list(quantities)).values_list('id', 'price')) if quantities else {}
+        quantities = {attr_id: qty for attr_id, qty in quantities.items() if attr_id in prices}
+        return {
+            'item_count': len(quantities),
+            'quantity': sum(quantities.values()),
+            'subtotal': sum((prices[attr_id] * qty for attr_id, qty in quantities.items()), Decimal('0.00')),
+        }
+
+    def add(self, user_id, product_id, product_attr_id, qty, user_type='Not-Reg'):
+        product_attr_id = int(product_attr_id)
+        attribute = ProductAttribute.objects.select_related(*ATTRIBUTE_RELATED).filter(pk=product_attr_id).first()
+        if attribute is None:
+            raise CartStockError(product_attr_id, None)
+        pipe = self.client.pipeline()
+        pipe.hincrby(self.key(user_id), product_attr_id, qty)
+        pipe.hsetnx(self.key(user_id), self.USER_TYPE_FIELD, user_type)
+        self._touch(pipe, user_id)
+        new_qty = pipe.execute()[0]
+        if new_qty > attribute.qty:
+            # HINCRBY is atomic, so undoing our own increment keeps concurrent adds consistent
+            self.client.hincrby(self.key(user_id), product_attr_id, -qty)
+            raise CartStockError(product_attr_id, attribute.qty)
+        return Cart(
+            user_id=user_id, user_type=user_type, qty=new_qty,
+            product=attribute.product, product_attr=attribute,
+        )
+
+    def set_qty(self, user_id, product_attr_id, qty):
+        if not self.client.hexists(self.key(user_id), product_attr_id):
+            raise CartItemNotFound(product_attr_id)
+        if qty <= 0:
+            self.remove(user_id, product_attr_id)
+            return None
+        pipe = self.client.pipeline()
+        pipe.hset(self.key(user_id), product_attr_id, qty)
+        pipe.hget(self.key(user_id), self.USER_TYPE_FIELD)
+        self._touch(pipe, user_id)
+        user_type = pipe.execute()[1]
+        user_type = user_type.decode() if isinstance(user_type, bytes) else (user_type or 'Not-Reg')
+        lines = self._build_lines(user_id, user_type, {int(product_attr_id): qty})
+        return lines[0] if lines else None
+
+    def remove(self, user_id, product_attr_id):
+        pipe = self.client.pipeline()
+        pipe.hdel(self.key(user_id), product_attr_id)
+        pipe.sadd(self.dirty_key, user_id)
+        return pipe.execute()[0] > 0
+
+    def remove_line(self, line_id, user_id=None):
+        if user_id is None:
+            return False
+        return self.remove(user_id, line_id)
+
+    def clear(self, user_id):
+        pipe = self.client.pipeline()
+        pipe.delete(self.key(user_id))
+        pipe.sadd(self.dirty_key, user_id)
+        pipe.execute()
+
+    def apply(self, user_id, operations, user_type='Not-Reg'):
+        """
+        Plan the batch against the hash read under ``WATCH`` and write it in
+        one ``MULTI``; a concurrent change to the cart retries the batch.
+        """
+        attributes = batch_attributes(operations)
+        key = self.key(user_id)
+
+        def write(pipe):
+            _, current = self._parse(pipe.hgetall(key))
+            quantities = plan_batch(current, operations, attributes)
+            removed = [attr_id for attr_id in current if attr_id not in quantities]
+            pipe.multi()
+            if removed:
+                pipe.hdel(key, *removed)
+            if quantities:
+                pipe.hset(key, mapping=quantities)
+            pipe.hsetnx(key, self.USER_TYPE_FIELD, user_type)
+            self._touch(pipe, user_id)
+
+        self.client.transaction(write, key)
+        return self.lines(user_id)
+
+    def merge(self, guest_user_id, user_id, user_type='Reg'):
+        """
+        Read both hashes under ``WATCH``, clamp against one stock query, and
+        write the merged hash and delete the guest hash in one ``MULTI``.
+        """
+        if guest_user_id == user_id:
+            return 0
+        self.check_guest(guest_user_id)
+        guest_key, key = self.key(guest_user_id), self.key(user_id)
+
+        def write(pipe):
+            guest_type, guest = self._parse(pipe.hgetall(guest_key))
+            if not guest or guest_type != 'Not-Reg':
+                return 0
+            _, current = self._parse(pipe.hgetall(key))
+            stock = dict(ProductAttribute.objects.filter(pk__in=list(guest)).values_list('id', 'qty'))
+            merged = {
+                attr_id: min(current.get(attr_id, 0) + qty, stock[attr_id])
+                for attr_id, qty in guest.items()
+                if attr_id in stock
+            }
+            dropped = [attr_id for attr_id, qty in merged.items() if qty <= 0]
+            merged = {attr_id: qty for attr_id, qty in merged.items() if qty > 0}
+            pipe.multi()
+            if dropped:
+                pipe.hdel(key, *dropped)
+            if merged:
+                pipe.hset(key, mapping=merged)
+            pipe.hset(key, self.USER_TYPE_FIELD, user_type)
+            pipe.delete(guest_key)
+            pipe.sadd(self.dirty_key, guest_user_id)
+            self._touch(pipe, user_id)
+            return len(guest)
+
+        return self.client.transaction(write, guest_key, key, value_from_callable=True)
+
+    def flush(self, batch_size=500):
+        """
+        Write dirty carts to the ``cart`` table, ``batch_size`` carts per
+        transaction. A cart changed while it is being flushed is marked dirty
+        again and written on the next pass.
+        """
+        flushed = 0
+        while True:
+            user_ids = [
+                user_id.decode() if isinstance(user_id, bytes) else user_id
+                for user_id in (self.client.spop(self.dirty_key, batch_size) or [])
+            ]
+            if not user_ids:
+                return flushed
+
+            pipe = self.client.pipeline()
+            for user_id in user_ids:
+                pipe.hgetall(self.key(user_id))
+            carts = {user_id: self._parse(raw) for user_id, raw in zip(user_ids, pipe.execute())}
+
+            attr_ids = {attr_id for _, quantities in carts.values() for attr_id in quantities}
+            products = dict(ProductAttribute.objects.filter(pk__in=attr_ids).values_list('id', 'product_id'))
+            rows = [
+                Cart(user_id=user_id, user_type=user_type, qty=qty, product_id=products[attr_id], product_attr_id=attr_id)
+                for user_id, (user_type, quantities) in carts.items()
+                for attr_id, qty in quantities.items()
+                if attr_id in products
+            ]
+            try:
+                with transaction.atomic():
+                    Cart.objects.filter(user_id__in=user_ids).delete()
+                    Cart.objects.bulk_create(rows)
+            except Exception:
+                self.client.sadd(self.dirty_key, *user_ids)
+                raise
+            flushed += len(user_ids)
+
+
+_backend = None
+
+
+def get_cart_backend():
+    """
+    Return the configured cart backend (created once per process).
+    """
+    global _backend
+    if _backend is None:
+        _backend = import_string(getattr(settings, 'CART_BACKEND', 'orders.cart.DatabaseCartBackend'))()
+    return _backend
+
+
+@receiver(setting_changed)
+def reset_cart_backend(setting, **kwargs):
+    global _backend
+    if setting.startswith('CART_'):
+        _backend = None
@@ -0,0 +1,84 @@
+"""
+Append-only order event log.
+
+Every status or payment change inserts an ``OrderEvent`` row; nothing is
+updated in place. Timelines are read with the ``(order, created_at)`` index,
+and time-in-status reports are aggregated in SQL.
+"""
+
+from django.db.models import Avg, Count, DurationField, F, OuterRef, Q, Subquery
+
+from core.models import OrderStatus
+from .models import OrderEvent
+
+
+def status_event(order_id, order_status, source, track_details=None):
+    """
+    Build an unsaved status-change event (for ``bulk_create``).
+    """
+    return OrderEvent(order_id=order_id, order_status=order_status, track_details=track_details, source=source)
+
+
+def record_status_event(order, source, track_details=None):
+    """
+    Insert an event for the order's current status.
+    """
+    return OrderEvent.objects.create(
+        order_id=order.pk, order_status_id=order.order_status_id, track_details=track_details, source=source
+    )
+
+
+def record_payment_event(order_id, payment_status, source='webhook'):
+    """
+    Insert a payment status event for ``order_id``.
+    """
+    return OrderEvent.objects.create(order_id=order_id, payment_status=payment_status, source=source)
+
+
+def order_timeline(order_id):
+    return OrderEvent.objects.filter(order_id=order_id).select_related('order_status').order_by('created_at', 'id')
+
+
+def average_status_durations(events=None):
+    """
+    Average time spent in each status before moving to the next one.
+
+    Each status event is paired with the previous status event of the same
+    order through a correlated subquery (an index seek on
+    ``(order, created_at)``), and durations are averaged per transition in
+    the database. Returns rows of ``from_status``, ``to_status``,
+    ``from_status_name``, ``to_status_name``, ``transitions`` and
+    ``avg_duration`` (``timedelta``).
+    """
+    events = OrderEvent.objects.all() if events is None else events
+    previous = (
+        OrderEvent.objects
+        .filter(order_id=OuterRef('order_id'), order_status__isnull=False)
+        .filter(
+            Q(created_at__lt=OuterRef('created_at'))
+            | Q(created_at=OuterRef('created_at'), id__lt=OuterRef('id'))
+        )
+        .order_by('-created_at', '-id')
+    )
+    rows = list(
+        events
+        .filter(order_status__isnull=False)
+        .annotate(
+            from_status=Subquery(previous.values('order_status')[:1]),
+            entered_at=Subquery(previous.values('created_at')[:1]),
+        )
+        .filter(from_status__isnull=False)
+        .exclude(from_status=F('order_status'))
+        .values('from_status', to_status=F('order_status'))
+        .annotate(
+            transitions=Count('id'),
+            avg_duration=Avg(F('created_at') - F('entered_at'), output_field=DurationField()),
+        )
+        .order_by('from_status', 'to_status')
+    )
+
+    names = dict(OrderStatus.objects.values_list('id', 'orders_status'))
+    for row in rows:
+        row['from_status_name'] = names.get(row['from_status'])
+        row['to_status_name'] = names.get(row['to_status'])
+    return rows
@@ -0,0 +1,117 @@
+"""
+Streaming order exports (CSV / NDJSON).
+
+Orders are read with ``QuerySet.iterator(chunk_size=...)`` and their details
+are prefetched one chunk at a time, so memory stays constant no matter how
+many rows are exported. Rows are yielded as encoded text, ready for a
+``StreamingHttpResponse`` or a file.
+"""
+
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+
+from .models import OrderDetail
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+DEFAULT_CHUNK_SIZE = 2000
+
+ORDER_FIELDS = [
+    'id', 'user_id', 'name', 'email', 'mobile', 'address', 'city', 'state', 'pincode',
+    'coupon_code', 'coupon_value', 'order_status', 'payment_type', 'payment_status',
+    'payment_id', 'txn_id', 'total_amt', 'track_details', 'added_on',
+]
+LINE_FIELDS = ['product_id', 'product_name', 'product_attr_id', 'sku', 'price', 'qty']
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class Echo:
+    """
+    File-like object whose ``write`` returns the value, for streaming ``csv.writer`` output.
+    """
+
+    def write(self, value):
+        return value
+
+
+def export_queryset(queryset):
+    """
+    Prepare ``queryset`` for export: stable order, status joined and details
+    (with their product name and SKU snapshot) prefetched per iterator chunk.
+    """
+    return (
+        queryset
+        .select_related('order_status')
+        .prefetch_related(
+            Prefetch(
+                'order_details',
+                queryset=OrderDetail.objects.only(
+                    'order', 'product', 'product_name', 'product_attr', 'sku', 'price', 'qty',
+                ),
+            )
+        )
+        .order_by('pk')
+    )
+
+
+def order_values(order):
+    values = {field: getattr(order, field) for field in ORDER_FIELDS if field != 'order_status'}
+    values['order_status'] = order.order_status.orders_status if order.order_status_id else None
+    return values
+
+
+def line_values(detail):
+    return {
+        'product_id': detail.product_id,
+        'product_name': detail.product_name,
+        'product_attr_id': detail.product_attr_id,
+        'sku': detail.sku,
+        'price': detail.price,
+        'qty': detail.qty,
+    }
+
+
+def iter_orders(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    return export_queryset(queryset).iterator(chunk_size=chunk_size)
+
+
+def iter_csv(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield CSV lines: one row per order detail, order columns repeated.
+    Orders without details produce a single row with empty line columns.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(ORDER_FIELDS + LINE_FIELDS)
+    for order in iter_orders(queryset, chunk_size):
+        values = order_values(order)
+        order_row = [values[field] for field in ORDER_FIELDS]
+        details = order.order_details.all()
+        if not details:
+            yield writer.writerow(order_row + [''] * len(LINE_FIELDS))
+        for detail in details:
+            line = line_values(detail)
+            yield writer.writerow(order_row + [line[field] for field in LINE_FIELDS])
+
+
+def iter_ndjson(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield one JSON document per order, with its details under ``lines``.
+    """
+    for order in iter_orders(queryset, chunk_size):
+        values = order_values(order)
+        values['lines'] = [line_values(detail) for detail in order.order_details.all()]
+        yield json.dumps(values, cls=DjangoJSONEncoder) + '\n'
+
+
+def iter_export(queryset, export_format='csv', chunk_size=DEFAULT_CHUNK_SIZE):
+    if export_format == 'csv':
+        return iter_csv(queryset, chunk_size)
+    if export_format == 'ndjson':
+        return iter_ndjson(queryset, chunk_size)
+    raise ValueError(f"Unsupported export format '{export_format}'. Use one of: {', '.join(EXPORT_FORMATS)}.")
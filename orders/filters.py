@@ -0,0 +1,17 @@
+import django_filters
+from .models import Order, ArchivedOrder
+
+
+class OrderFilter(django_filters.FilterSet):
+    date_from = django_filters.DateFilter(field_name="added_on", lookup_expr="date__gte")
+    date_to = django_filters.DateFilter(field_name="added_on", lookup_expr="date__lte")
+
+    class Meta:
+        model = Order
+        fields = ["order_status", "payment_type", "payment_status", "date_from", "date_to"]
+
+
+class ArchivedOrderFilter(OrderFilter):
+
+    class Meta(OrderFilter.Meta):
+        model = ArchivedOrder
@@ -0,0 +1,46 @@
+"""
+Django management command to move historical orders into the archive tables.
+Each chunk of orders and their details is moved in its own transaction.
+Run: python manage.py archive_orders --older-than-days 365 --chunk-size 1000
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.archive import archive_cutoff, archive_horizon_days, archive_orders, DEFAULT_ARCHIVE_CHUNK_SIZE
+from orders.models import Order
+
+
+class Command(BaseCommand):
+    help = "Move orders older than the archive horizon (and their details) into the archive tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than-days", type=int, default=None,
+            help="Archive orders added more than this many days ago (defaults to ORDER_ARCHIVE_HORIZON_DAYS)",
+        )
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_ARCHIVE_CHUNK_SIZE, help="Orders moved per transaction")
+        parser.add_argument("--dry-run", action="store_true", help="Only report how many orders would be archived")
+
+    def handle(self, *args, **options):
+        days = options["older_than_days"]
+        days = archive_horizon_days() if days is None else days
+        if days < 0:
+            raise CommandError("--older-than-days must not be negative")
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive")
+
+        cutoff = archive_cutoff(days)
+        if options["dry_run"]:
+            pending = Order.objects.filter(added_on__lt=cutoff).count()
+            self.stdout.write(f"{pending} orders added before {cutoff:%Y-%m-%d %H:%M} would be archived")
+            return
+
+        total_orders = total_details = 0
+        for orders_moved, details_moved in archive_orders(cutoff, options["chunk_size"]):
+            total_orders += orders_moved
+            total_details += details_moved
+            self.stdout.write(f"Archived {orders_moved} orders ({details_moved} details)")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {total_orders} orders and {total_details} details added before {cutoff:%Y-%m-%d %H:%M}"
+        ))
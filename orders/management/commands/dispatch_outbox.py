@@ -0,0 +1,34 @@
+"""
+Django management command to deliver due outbox messages (see orders.outbox).
+Run: python manage.py dispatch_outbox --interval 2
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders.outbox import DEFAULT_BATCH_SIZE, dispatch_pending
+
+
+class Command(BaseCommand):
+    help = "Deliver due outbox messages in batches (once, or every --interval seconds)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, default=0, help="Seconds between polls; 0 drains the outbox once and exits")
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Messages claimed per batch")
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            sent = failed = 0
+            while True:
+                result = dispatch_pending(batch_size=options["batch_size"])
+                sent += result["sent"]
+                failed += result["failed"]
+                if result["sent"] + result["failed"] < options["batch_size"]:
+                    break
+            if sent or failed or not options["interval"]:
+                self.stdout.write(f"Sent {sent} messages, {failed} failed, in {time.monotonic() - started:.3f}s")
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,52 @@
+"""
+Django management command to export orders with their lines as CSV or NDJSON.
+Rows are streamed in chunks so memory stays constant for large exports.
+Run: python manage.py export_orders --format ndjson --date-from 2025-01-01 --output orders.ndjson
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.exports import iter_export, EXPORT_FORMATS, DEFAULT_CHUNK_SIZE
+from orders.filters import OrderFilter
+from orders.models import Order
+
+
+class Command(BaseCommand):
+    help = "Stream orders and their details to a CSV or NDJSON file (or stdout)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv", help="Export format")
+        parser.add_argument("--output", help="Output file path (defaults to stdout)")
+        parser.add_argument("--order-status", help="Filter by order status id")
+        parser.add_argument("--payment-type", help="Filter by payment type (COD, Gateway)")
+        parser.add_argument("--payment-status", help="Filter by payment status (Pending, Success, Failed)")
+        parser.add_argument("--date-from", help="Only orders added on or after this date (YYYY-MM-DD)")
+        parser.add_argument("--date-to", help="Only orders added on or before this date (YYYY-MM-DD)")
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Orders fetched per chunk")
+
+    def handle(self, *args, **options):
+        params = {
+            "order_status": options["order_status"],
+            "payment_type": options["payment_type"],
+            "payment_status": options["payment_status"],
+            "date_from": options["date_from"],
+            "date_to": options["date_to"],
+        }
+        order_filter = OrderFilter(
+            {key: value for key, value in params.items() if value},
+            queryset=Order.objects.all(),
+        )
+        if not order_filter.is_valid():
+            raise CommandError(order_filter.errors.as_json())
+
+        rows = iter_export(order_filter.qs, options["format"], chunk_size=options["chunk_size"])
+        if options["output"]:
+            written = 0
+            with open(options["output"], "w", newline="", encoding="utf-8") as output:
+                for row in rows:
+                    output.write(row)
+                    written += 1
+            self.stderr.write(self.style.SUCCESS(f"Wrote {written} rows to {options['output']}"))
+        else:
+            for row in rows:
+                self.stdout.write(row, ending="")
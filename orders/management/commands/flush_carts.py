@@ -0,0 +1,30 @@
+"""
+Django management command to persist carts from the cart backend to the cart table.
+Only does work for write-behind backends (orders.cart.RedisCartBackend).
+Run: python manage.py flush_carts --interval 5
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders.cart import get_cart_backend
+
+
+class Command(BaseCommand):
+    help = "Write changed carts from the cart backend to the cart table (once, or every --interval seconds)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, default=0, help="Seconds between flushes; 0 flushes once and exits")
+        parser.add_argument("--batch-size", type=int, default=500, help="Carts written per transaction")
+
+    def handle(self, *args, **options):
+        backend = get_cart_backend()
+        while True:
+            started = time.monotonic()
+            flushed = backend.flush(batch_size=options["batch_size"])
+            if flushed or not options["interval"]:
+                self.stdout.write(f"Flushed {flushed} carts in {time.monotonic() - started:.3f}s")
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,51 @@
+"""
+Django management command to purge stale guest and registered carts.
+Deletes in primary-key windows so no statement holds long locks.
+Run: python manage.py sweep_carts --guest-days 30 --registered-days 180 --chunk-size 5000
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.sweeper import cart_retention_days, sweep_carts, DEFAULT_SWEEP_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = "Delete (or archive and delete) carts whose newest line is older than the retention for their type"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--guest-days", type=int, default=None,
+            help="Retention for guest (Not-Reg) carts; defaults to CART_RETENTION_GUEST_DAYS, 0 keeps them",
+        )
+        parser.add_argument(
+            "--registered-days", type=int, default=None,
+            help="Retention for registered (Reg) carts; defaults to CART_RETENTION_REGISTERED_DAYS, 0 keeps them",
+        )
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_SWEEP_CHUNK_SIZE, help="Primary-key window per delete")
+        parser.add_argument("--pause", type=float, default=0, help="Seconds to sleep between windows")
+        parser.add_argument("--archive", help="Append stale lines to this JSON-lines file before deleting them")
+        parser.add_argument("--dry-run", action="store_true", help="Only count the lines that would be removed")
+
+    def handle(self, *args, **options):
+        retention = cart_retention_days()
+        if options["guest_days"] is not None:
+            retention['Not-Reg'] = options["guest_days"]
+        if options["registered_days"] is not None:
+            retention['Reg'] = options["registered_days"]
+        if any(days < 0 for days in retention.values()):
+            raise CommandError("Retention days must not be negative")
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive")
+
+        kwargs = dict(retention=retention, chunk_size=options["chunk_size"], dry_run=options["dry_run"], pause=options["pause"])
+        if options["archive"] and not options["dry_run"]:
+            with open(options["archive"], "a", encoding="utf-8") as archive:
+                stats = sweep_carts(archive=archive, **kwargs)
+        else:
+            stats = sweep_carts(**kwargs)
+
+        verb = "Would remove" if options["dry_run"] else "Removed"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {stats['removed'].get('Not-Reg', 0)} guest and {stats['removed'].get('Reg', 0)} registered cart lines "
+            f"in {stats['chunks']} chunks ({stats['seconds']:.3f}s)"
+        ))
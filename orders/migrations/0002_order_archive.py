@@ -0,0 +1,86 @@
+# Generated by Django 4.2.16 on 2026-10-18 23:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def partition_archive_table(apps, schema_editor):
+    """
+    On PostgreSQL, recreate ``orders_archive`` as a table range-partitioned
+    on ``added_on``. Partitions are created on demand by ``archive_orders``.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexdef FROM pg_indexes WHERE tablename = 'orders_archive' AND indexname NOT LIKE '%%_pkey'"
+        )
+        index_definitions = [row[0] for row in cursor.fetchall()]
+        cursor.execute("ALTER TABLE orders_archive RENAME TO orders_archive_unpartitioned")
+        cursor.execute(
+            "CREATE TABLE orders_archive (LIKE orders_archive_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            "PARTITION BY RANGE (added_on)"
+        )
+        cursor.execute("DROP TABLE orders_archive_unpartitioned")
+        # The partition key must be part of the primary key
+        cursor.execute("ALTER TABLE orders_archive ADD PRIMARY KEY (id, added_on)")
+        for index_definition in index_definitions:
+            cursor.execute(index_definition)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('products', '0003_alter_product_brand_alter_product_model_and_more'),
+        ('core', '0004_populate_products_with_images'),
+        ('orders', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100)),
+                ('email', models.EmailField(max_length=254)),
+                ('mobile', models.CharField(max_length=15)),
+                ('address', models.TextField()),
+                ('city', models.CharField(max_length=50)),
+                ('state', models.CharField(max_length=50)),
+                ('pincode', models.CharField(max_length=10)),
+                ('coupon_code', models.CharField(blank=True, max_length=50, null=True)),
+                ('coupon_value', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('payment_type', models.CharField(choices=[('COD', 'Cash on Delivery'), ('Gateway', 'Payment Gateway')], max_length=10)),
+                ('payment_status', models.CharField(choices=[('Pending', 'Pending'), ('Success', 'Success'), ('Failed', 'Failed')], max_length=10)),
+                ('payment_id', models.CharField(blank=True, max_length=100, null=True)),
+                ('txn_id', models.CharField(blank=True, max_length=100, null=True)),
+                ('total_amt', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('track_details', models.TextField(blank=True, null=True)),
+                ('added_on', models.DateTimeField(db_index=True)),
+                ('archived_on', models.DateTimeField(auto_now_add=True)),
+                ('order_status', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, to='core.orderstatus')),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='archived_orders', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'orders_archive',
+                'ordering': ['-added_on'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderDetail',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('qty', models.PositiveIntegerField()),
+                ('order', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='order_details', to='orders.archivedorder')),
+                ('product', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, to='products.product')),
+                ('product_attr', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, to='products.productattribute')),
+            ],
+            options={
+                'db_table': 'orders_details_archive',
+            },
+        ),
+        migrations.RunPython(partition_archive_table, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.16 on 2026-10-18 23:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_order_event'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderevent',
+            name='payment_status',
+            field=models.CharField(blank=True, choices=[('Pending', 'Pending'), ('Success', 'Success'), ('Failed', 'Failed')], max_length=10, null=True),
+        ),
+        migrations.AlterField(
+            model_name='orderevent',
+            name='source',
+            field=models.CharField(choices=[('checkout', 'Checkout'), ('api', 'Status update'), ('bulk', 'Bulk update'), ('webhook', 'Payment webhook')], max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='orderevent',
+            index=models.Index(fields=['order', 'created_at'], name='orders_event_order_created_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.16 on 2026-10-18 23:14
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+TRIGRAM_INDEXES = {
+    # Matches the UPPER(col::text) LIKE UPPER('%...%') that Django emits for icontains
+    'orders_name_trgm_idx': 'UPPER(name) gin_trgm_ops',
+    'orders_email_trgm_idx': 'UPPER(email) gin_trgm_ops',
+    # mobile is searched by prefix with startswith (case-sensitive LIKE)
+    'orders_mobile_trgm_idx': 'mobile gin_trgm_ops',
+}
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """
+    On PostgreSQL, add GIN trigram indexes for fuzzy order search.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for name, expression in TRIGRAM_INDEXES.items():
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON orders USING gin ({expression})")
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for name in TRIGRAM_INDEXES:
+            cursor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_order_event_log'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['payment_id'], name='orders_payment_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['txn_id'], name='orders_txn_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['mobile'], name='orders_mobile_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='orders_email_lower_idx'),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,141 @@
+# Generated by Django 4.2.16 on 2026-10-18 23:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+SNAPSHOT_FIELDS = ['product_name', 'sku', 'size', 'color', 'image', 'mrp', 'tax_rate']
+BATCH_SIZE = 2000
+
+
+def backfill_snapshots(apps, schema_editor):
+    """
+    Copy the current catalog values onto existing order lines, in batches.
+    """
+    ProductAttribute = apps.get_model('products', 'ProductAttribute')
+    for model_name in ('OrderDetail', 'ArchivedOrderDetail'):
+        model = apps.get_model('orders', model_name)
+        last_pk = 0
+        while True:
+            details = list(model.objects.filter(pk__gt=last_pk, product_attr__isnull=False).order_by('pk')[:BATCH_SIZE])
+            if not details:
+                break
+            attributes = ProductAttribute.objects.select_related('product__tax', 'size', 'color').in_bulk(
+                {detail.product_attr_id for detail in details}
+            )
+            for detail in details:
+                attr = attributes.get(detail.product_attr_id)
+                if attr is None:
+                    continue
+                tax = attr.product.tax
+                detail.product_name = attr.product.name
+                detail.sku = attr.sku
+                detail.size = attr.size.size if attr.size else ''
+                detail.color = attr.color.color if attr.color else ''
+                detail.image = attr.product.image.name or ''
+                detail.mrp = attr.mrp
+                detail.tax_rate = tax.tax_value if tax is not None and tax.status else 0
+            model.objects.bulk_update(details, SNAPSHOT_FIELDS)
+            last_pk = details[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_alter_product_brand_alter_product_model_and_more'),
+        ('orders', '0005_order_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedorderdetail',
+            name='color',
+            field=models.CharField(blank=True, default='', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='archivedorderdetail',
+            name='image',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='archivedorderdetail',
+            name='mrp',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedorderdetail',
+            name='product_name',
+            field=models.CharField(blank=True, default='', max_length=200),
+        ),
+        migrations.AddField(
+            model_name='archivedorderdetail',
+            name='size',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='archivedorderdetail',
+            name='sku',
+            field=models.CharField(blank=True, default='', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='archivedorderdetail',
+            name='tax_rate',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=5),
+        ),
+        migrations.AddField(
+            model_name='orderdetail',
+            name='color',
+            field=models.CharField(blank=True, default='', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='orderdetail',
+            name='image',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='orderdetail',
+            name='mrp',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='orderdetail',
+            name='product_name',
+            field=models.CharField(blank=True, default='', max_length=200),
+        ),
+        migrations.AddField(
+            model_name='orderdetail',
+            name='size',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='orderdetail',
+            name='sku',
+            field=models.CharField(blank=True, default='', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='orderdetail',
+            name='tax_rate',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=5),
+        ),
+        migrations.AlterField(
+            model_name='archivedorderdetail',
+            name='product',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, to='products.product'),
+        ),
+        migrations.AlterField(
+            model_name='archivedorderdetail',
+            name='product_attr',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, to='products.productattribute'),
+        ),
+        migrations.AlterField(
+            model_name='orderdetail',
+            name='product',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='products.product'),
+        ),
+        migrations.AlterField(
+            model_name='orderdetail',
+            name='product_attr',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='products.productattribute'),
+        ),
+        migrations.RunPython(backfill_snapshots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.16 on 2026-10-18 23:26
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_lines(apps, schema_editor):
+    """
+    Collapse duplicate (user_id, product_attr) cart rows into the oldest one,
+    summing their quantities, so the unique constraint can be added.
+    """
+    Cart = apps.get_model('orders', 'Cart')
+    duplicates = (
+        Cart.objects.values('user_id', 'product_attr_id')
+        .annotate(rows=Count('id'), keep_id=Min('id'), total_qty=Sum('qty'))
+        .filter(rows__gt=1)
+    )
+    for duplicate in duplicates:
+        Cart.objects.filter(pk=duplicate['keep_id']).update(qty=duplicate['total_qty'])
+        Cart.objects.filter(
+            user_id=duplicate['user_id'], product_attr_id=duplicate['product_attr_id'],
+        ).exclude(pk=duplicate['keep_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_order_detail_snapshot'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_lines, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cart',
+            constraint=models.UniqueConstraint(fields=('user_id', 'product_attr'), name='cart_user_product_attr_uniq'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-18 23:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_cart_unique_line'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cart',
+            index=models.Index(fields=['user_type', 'added_on'], name='cart_type_added_on_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.16 on 2026-10-18 23:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0009_outbox'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='orderevent',
+            name='source',
+            field=models.CharField(choices=[('checkout', 'Checkout'), ('api', 'Status update'), ('bulk', 'Bulk update'), ('webhook', 'Payment webhook'), ('reconcile', 'Payment reconciliation')], max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('payment_status', 'Pending'), ('payment_type', 'Gateway')), fields=['id'], name='orders_pending_gateway_idx'),
+        ),
+    ]
@@ -3,6 +3,7 @@ Order models for the ecommerce application.
 """
 
 from django.db import models
+from django.db.models.functions import Lower
 from django.conf import settings
 from core.models import OrderStatus
 from products.models import Product, ProductAttribute
@@ -50,25 +51,138 @@ class Order(models.Model):
     class Meta:
         db_table = 'orders'
         ordering = ['-added_on']
+        # Support lookups (see orders.search); trigram indexes for fuzzy
+        # name/email/mobile search are added on PostgreSQL by migration 0005.
+        indexes = [
+            models.Index(fields=['payment_id'], name='orders_payment_id_idx'),
+            models.Index(fields=['txn_id'], name='orders_txn_id_idx'),
+            models.Index(fields=['mobile'], name='orders_mobile_idx'),
+            models.Index(Lower('email'), name='orders_email_lower_idx'),
+            # Pending gateway orders, paged by id (see integrations.stripe.reconcile)
+            models.Index(
+                fields=['id'], name='orders_pending_gateway_idx',
+                condition=models.Q(payment_type='Gateway', payment_status='Pending'),
+            ),
+        ]
 
 
 class OrderDetail(models.Model):
     """
     Order details model for individual items in an order.
+
+    The product columns (name, SKU, size, color, image path, MRP and tax rate)
+    are a snapshot taken when the order is placed, so order reads never need
+    the live catalog and stay correct after products change or are deleted.
     """
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='order_details')
-    product = models.ForeignKey(Product, on_delete=models.CASCADE)
-    product_attr = models.ForeignKey(ProductAttribute, on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, blank=True)
+    product_attr = models.ForeignKey(ProductAttribute, on_delete=models.SET_NULL, null=True, blank=True)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     qty = models.PositiveIntegerField()
+    product_name = models.CharField(max_length=200, blank=True, default='')
+    sku = models.CharField(max_length=50, blank=True, default='')
+    size = models.CharField(max_length=20, blank=True, default='')
+    color = models.CharField(max_length=50, blank=True, default='')
+    image = models.CharField(max_length=255, blank=True, default='')
+    mrp = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    tax_rate = models.DecimalField(max_digits=5, decimal_places=2, default=0)
 
     def __str__(self):
-        return f"Order #{self.order.id} - {self.product.name}"
+        return f"Order #{self.order_id} - {self.product_name}"
 
     class Meta:
         db_table = 'orders_details'
 
 
+class OrderEvent(models.Model):
+    """
+    Append-only order history: one row per status or payment change.
+
+    ``orders.track_details`` / ``order_status`` only hold the latest values;
+    the full timeline lives here. The order reference is not enforced at the
+    database level so events survive when their order is moved to the archive.
+    """
+    SOURCE_CHOICES = [
+        ('checkout', 'Checkout'),
+        ('api', 'Status update'),
+        ('bulk', 'Bulk update'),
+        ('webhook', 'Payment webhook'),
+        ('reconcile', 'Payment reconciliation'),
+    ]
+
+    order = models.ForeignKey(Order, on_delete=models.DO_NOTHING, related_name='events', db_constraint=False)
+    order_status = models.ForeignKey(OrderStatus, on_delete=models.SET_NULL, blank=True, null=True)
+    payment_status = models.CharField(max_length=10, choices=Order.PAYMENT_STATUS_CHOICES, blank=True, null=True)
+    track_details = models.TextField(blank=True, null=True)
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Order #{self.order_id} - {self.order_status_id or self.payment_status} ({self.source})"
+
+    class Meta:
+        db_table = 'orders_events'
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(fields=['order', 'created_at'], name='orders_event_order_created_idx'),
+        ]
+
+
+class OutboxMessage(models.Model):
+    """
+    A side effect of an order change, written in the same transaction as the
+    change and delivered afterwards by ``orders.outbox.dispatch_pending``
+    (at least once).
+    """
+    PENDING = 'pending'
+    SENT = 'sent'
+    DEAD = 'dead'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (SENT, 'Sent'),
+        (DEAD, 'Gave up'),
+    ]
+
+    topic = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(help_text="Not delivered (or redelivered) before this time")
+    last_error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.topic} #{self.pk} ({self.status})"
+
+    class Meta:
+        db_table = 'orders_outbox'
+        ordering = ['id']
+        indexes = [
+            # The dispatcher's queue: due pending messages
+            models.Index(fields=['status', 'available_at'], name='orders_outbox_due_idx'),
+        ]
+
+
+class DailySalesRollup(models.Model):
+    """
+    Per-day order totals, recomputed from ``orders`` by the outbox dispatcher
+    whenever an order of that day is placed.
+    """
+    date = models.DateField(unique=True)
+    orders = models.PositiveIntegerField(default=0)
+    items = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.date}: {self.orders} orders"
+
+    class Meta:
+        db_table = 'orders_daily_sales'
+        ordering = ['-date']
+
+
 class Cart(models.Model):
     """
     Shopping cart model.
@@ -89,4 +203,73 @@ class Cart(models.Model):
         return f"Cart - {self.user_id} - {self.product.name}"
 
     class Meta:
-        db_table = 'cart'
\ No newline at end of file
+        db_table = 'cart'
+        constraints = [
+            # One line per product attribute per cart; also serves lookups by user_id
+            models.UniqueConstraint(fields=['user_id', 'product_attr'], name='cart_user_product_attr_uniq'),
+        ]
+        indexes = [
+            # Stale-cart sweeps (orders.sweeper)
+            models.Index(fields=['user_type', 'added_on'], name='cart_type_added_on_idx'),
+        ]
+
+class ArchivedOrder(models.Model):
+    """
+    Historical order moved out of the live ``orders`` table by ``archive_orders``.
+
+    Keeps the original primary key and columns. On PostgreSQL the table is
+    range-partitioned on ``added_on``, so foreign keys are not enforced at the
+    database level.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_orders', db_constraint=False)
+    name = models.CharField(max_length=100)
+    email = models.EmailField()
+    mobile = models.CharField(max_length=15)
+    address = models.TextField()
+    city = models.CharField(max_length=50)
+    state = models.CharField(max_length=50)
+    pincode = models.CharField(max_length=10)
+    coupon_code = models.CharField(max_length=50, blank=True, null=True)
+    coupon_value = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    order_status = models.ForeignKey(OrderStatus, on_delete=models.DO_NOTHING, db_constraint=False)
+    payment_type = models.CharField(max_length=10, choices=Order.PAYMENT_TYPE_CHOICES)
+    payment_status = models.CharField(max_length=10, choices=Order.PAYMENT_STATUS_CHOICES)
+    payment_id = models.CharField(max_length=100, blank=True, null=True)
+    txn_id = models.CharField(max_length=100, blank=True, null=True)
+    total_amt = models.DecimalField(max_digits=10, decimal_places=2)
+    track_details = models.TextField(blank=True, null=True)
+    added_on = models.DateTimeField(db_index=True)
+    archived_on = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Archived order #{self.id} - {self.name}"
+
+    class Meta:
+        db_table = 'orders_archive'
+        ordering = ['-added_on']
+
+
+class ArchivedOrderDetail(models.Model):
+    """
+    Line of an archived order.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='order_details', db_constraint=False)
+    product = models.ForeignKey(Product, on_delete=models.DO_NOTHING, null=True, blank=True, db_constraint=False)
+    product_attr = models.ForeignKey(ProductAttribute, on_delete=models.DO_NOTHING, null=True, blank=True, db_constraint=False)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    qty = models.PositiveIntegerField()
+    product_name = models.CharField(max_length=200, blank=True, default='')
+    sku = models.CharField(max_length=50, blank=True, default='')
+    size = models.CharField(max_length=20, blank=True, default='')
+    color = models.CharField(max_length=50, blank=True, default='')
+    image = models.CharField(max_length=255, blank=True, default='')
+    mrp = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    tax_rate = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"Archived order #{self.order_id} - line {self.id}"
+
+    class Meta:
+        db_table = 'orders_details_archive'
@@ -0,0 +1,216 @@
+"""
+Transactional outbox for order side effects.
+
+Checkout writes the order and one ``OutboxMessage`` per side effect in the
+same transaction, so either both exist or neither does. The dispatcher
+(``dispatch_outbox`` command or Celery task) then delivers due messages in
+batches, grouped by topic, and marks them sent. Delivery is at least once:
+a message is leased before its handler runs, and a crash before it is marked
+sent lets the lease expire and the message be delivered again. Handlers must
+therefore be idempotent.
+
+Topics:
+
+* ``payment_intent.create`` - create the Stripe payment intent of an order
+  and record its id (skipped when the order already has one)
+* ``cart.clear``            - remove the purchased lines from the buyer's cart
+* ``sales_rollup.refresh``  - recompute ``DailySalesRollup`` for a day
+* ``email.order_placed``    - send the order confirmation email
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from core.enums import PaymentStatus
+from .cart import get_cart_backend
+from .models import DailySalesRollup, Order, OrderDetail, OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 100
+MAX_ATTEMPTS = 8
+# A claimed message is redelivered if it is not marked sent within this time
+LEASE = timedelta(minutes=5)
+
+HANDLERS = {}
+
+
+def handler(topic):
+    """
+    Register ``func(messages)`` as the batch handler of ``topic``. It returns
+    ``{message_id: error}`` for messages to retry; the rest are marked sent.
+    """
+    def register(func):
+        HANDLERS[topic] = func
+        return func
+    return register
+
+
+def enqueue(topic, payload):
+    """
+    Add a message; call inside the transaction that makes the change.
+    """
+    return OutboxMessage.objects.create(topic=topic, payload=payload, available_at=timezone.now())
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(2 ** attempts, 15 * 60))
+
+
+def claim(batch_size, now=None):
+    """
+    Lease up to ``batch_size`` due messages. Concurrent dispatchers skip
+    each other's rows on PostgreSQL (``SKIP LOCKED``).
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        ids = list(
+            OutboxMessage.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=OutboxMessage.PENDING, available_at__lte=now)
+            .order_by('available_at', 'id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        OutboxMessage.objects.filter(id__in=ids).update(available_at=now + LEASE, attempts=F('attempts') + 1)
+    return list(OutboxMessage.objects.filter(id__in=ids).order_by('id'))
+
+
+def deliver(messages):
+    """
+    Run the handlers for already-claimed ``messages`` and record the
+    outcome. Returns ``{message_id: error}`` for the ones that failed.
+    """
+    by_topic = {}
+    for message in messages:
+        by_topic.setdefault(message.topic, []).append(message)
+
+    failures = {}
+    for topic, batch in by_topic.items():
+        func = HANDLERS.get(topic)
+        if func is None:
+            failures.update({message.pk: f'No handler for topic {topic!r}' for message in batch})
+            continue
+        try:
+            failures.update(func(batch) or {})
+        except Exception as e:
+            logger.exception("Outbox handler for %s failed", topic)
+            failures.update({message.pk: f'{type(e).__name__}: {e}' for message in batch})
+
+    now = timezone.now()
+    sent = [message.pk for message in messages if message.pk not in failures]
+    OutboxMessage.objects.filter(id__in=sent).update(status=OutboxMessage.SENT, sent_at=now, last_error=None)
+    for message in messages:
+        if message.pk in failures:
+            dead = message.attempts >= MAX_ATTEMPTS
+            OutboxMessage.objects.filter(pk=message.pk).update(
+                status=OutboxMessage.DEAD if dead else OutboxMessage.PENDING,
+                available_at=now + retry_delay(message.attempts),
+                last_error=str(failures[message.pk]),
+            )
+    return failures
+
+
+def dispatch_pending(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Claim and deliver one batch. Returns ``{'sent', 'failed'}``.
+    """
+    messages = claim(batch_size)
+    failures = deliver(messages)
+    return {'sent': len(messages) - len(failures), 'failed': len(failures)}
+
+
+def deliver_now(message):
+    """
+    Claim one just-committed message and deliver it in this process (the
+    checkout fast path). Returns the error, or ``None`` once it is sent.
+    Left for the dispatcher if another process already holds it.
+    """
+    now = timezone.now()
+    claimed = OutboxMessage.objects.filter(
+        pk=message.pk, status=OutboxMessage.PENDING, available_at__lte=now,
+    ).update(available_at=now + LEASE, attempts=F('attempts') + 1)
+    if not claimed:
+        return 'Message is already being delivered.'
+    message.refresh_from_db()
+    return deliver([message]).get(message.pk)
+
+
+# Handlers
+
+@handler('payment_intent.create')
+def create_payment_intents(messages):
+    from integrations.stripe.client import StripeError, get_stripe_client
+
+    orders = Order.objects.in_bulk([message.payload['order_id'] for message in messages])
+    client = get_stripe_client()
+    failures = {}
+    for message in messages:
+        order = orders.get(message.payload['order_id'])
+        if order is None or order.payment_id or order.payment_status == PaymentStatus.FAILED.value:
+            continue
+        try:
+            intent = client.create_payment_intent(
+                amount=message.payload['amount'],
+                currency=message.payload['currency'],
+                metadata=message.payload.get('metadata'),
+                # Stable per message, so a redelivery returns the same intent
+                idempotency_key=f'outbox-{message.pk}',
+            )
+        except StripeError as e:
+            if e.retryable:
+                failures[message.pk] = str(e)
+            else:
+                Order.objects.filter(pk=order.pk).update(payment_status=PaymentStatus.FAILED.value)
+                message.payload['error'] = str(e)
+            continue
+        Order.objects.filter(pk=order.pk, payment_id__isnull=True).update(payment_id=intent.id)
+        message.payload['intent'] = {'id': intent.id, 'client_secret': intent.client_secret}
+    return failures
+
+
+@handler('cart.clear')
+def clear_carts(messages):
+    backend = get_cart_backend()
+    for message in messages:
+        backend.apply(message.payload['user_id'], [
+            {'op': 'remove', 'product_attr': attr_id} for attr_id in message.payload['product_attr_ids']
+        ])
+
+
+@handler('sales_rollup.refresh')
+def refresh_sales_rollups(messages):
+    # Recomputing the whole day is idempotent, and each day is done once per batch
+    for day in sorted({message.payload['date'] for message in messages}):
+        orders = Order.objects.filter(added_on__date=day)
+        totals = orders.aggregate(orders=Count('id'), revenue=Sum('total_amt'))
+        items = OrderDetail.objects.filter(order__in=orders).aggregate(items=Sum('qty'))['items']
+        DailySalesRollup.objects.update_or_create(date=day, defaults={
+            'orders': totals['orders'], 'revenue': totals['revenue'] or 0, 'items': items or 0,
+        })
+
+
+@handler('email.order_placed')
+def send_order_emails(messages):
+    orders = Order.objects.in_bulk([message.payload['order_id'] for message in messages])
+    emails = [
+        EmailMessage(
+            subject=f"Order #{order.pk} received",
+            body=(
+                f"Hi {order.name},\n\nThanks for your order #{order.pk} of {order.total_amt}. "
+                f"We will let you know when it ships.\n"
+            ),
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[order.email],
+        )
+        for order in orders.values()
+        if order.email
+    ]
+    if emails:
+        # One connection for the whole batch
+        get_connection().send_messages(emails)
@@ -0,0 +1,222 @@
+"""
+Server-side pricing engine for carts and checkout.
+
+All prices, tax rates and coupon rules are read from the database in bulk
+(one query for every referenced attribute with its product and tax, one for
+the coupon), and totals are computed with ``Decimal`` arithmetic. Client
+supplied prices are never trusted.
+"""
+
+from collections import Counter
+from dataclasses import dataclass, field
+from decimal import Decimal, ROUND_HALF_UP
+
+from core.models import Coupon
+from products.models import ProductAttribute
+from .models import Order
+from .cart import get_cart_backend
+
+CENT = Decimal('0.01')
+ZERO = Decimal('0.00')
+HUNDRED = Decimal('100')
+
+
+def quantize(amount):
+    return Decimal(amount).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+class PricingError(ValueError):
+    """
+    Raised when submitted lines cannot be priced.
+    """
+
+
+@dataclass(frozen=True)
+class LineItem:
+    """
+    A requested line: attribute and quantity, optionally the product it belongs to.
+    """
+    product_attr_id: int
+    qty: int
+    product_id: int = None
+
+
+@dataclass
+class PricedLine:
+    """
+    A line priced from the current catalog.
+    """
+    product_attr: ProductAttribute
+    qty: int
+    unit_price: Decimal
+    tax_rate: Decimal
+    subtotal: Decimal
+    tax: Decimal
+
+    @property
+    def product(self):
+        return self.product_attr.product
+
+    def to_dict(self):
+        return {
+            'product': self.product_attr.product_id,
+            'product_attr': self.product_attr.pk,
+            'qty': self.qty,
+            'unit_price': self.unit_price,
+            'tax_rate': self.tax_rate,
+            'subtotal': self.subtotal,
+            'tax': self.tax,
+        }
+
+
+@dataclass
+class Quote:
+    """
+    Authoritative totals for a set of lines.
+    """
+    lines: list = field(default_factory=list)
+    subtotal: Decimal = ZERO
+    tax: Decimal = ZERO
+    discount: Decimal = ZERO
+    total: Decimal = ZERO
+    coupon: Coupon = None
+    coupon_error: str = None
+
+    @property
+    def total_in_minor_units(self):
+        """Total in the smallest currency unit (paisa), as expected by Stripe."""
+        return int((self.total * HUNDRED).to_integral_value(rounding=ROUND_HALF_UP))
+
+    def to_dict(self):
+        return {
+            'lines': [line.to_dict() for line in self.lines],
+            'item_count': len(self.lines),
+            'subtotal': self.subtotal,
+            'tax': self.tax,
+            'discount': self.discount,
+            'total': self.total,
+            'coupon_code': self.coupon.code if self.coupon else None,
+            'coupon_error': self.coupon_error,
+        }
+
+
+def parse_line_items(raw_items):
+    """
+    Normalize checkout ``cart_items`` payload entries into ``LineItem`` objects.
+    """
+    items = []
+    for item in raw_items:
+        # Handle product_id - it might be an object or a simple ID
+        product_id = item.get('product_id', item.get('product'))
+        if isinstance(product_id, dict):
+            product_id = product_id.get('id')
+        try:
+            items.append(LineItem(
+                product_attr_id=int(item.get('product_attr_id', item.get('product_attr'))),
+                qty=int(item.get('quantity', item.get('qty', 1))),
+                product_id=int(product_id) if product_id is not None else None,
+            ))
+        except (TypeError, ValueError):
+            raise PricingError(f'Invalid cart item: {item}')
+    return items
+
+
+def coupon_discount(coupon, subtotal, user=None):
+    """
+    Return ``(discount, error)`` for applying ``coupon`` to ``subtotal``.
+    """
+    if not coupon.status:
+        return ZERO, 'Invalid coupon code'
+    if subtotal < coupon.min_order_amt:
+        return ZERO, f'Minimum order amount is {coupon.min_order_amt} PKR'
+    if coupon.is_one_time and user is not None and user.is_authenticated:
+        if Order.objects.filter(user=user, coupon_code=coupon.code).exists():
+            return ZERO, 'This coupon has already been used and can only be used once.'
+
+    if coupon.type == 'Value':
+        discount = coupon.value
+    else:  # Percentage
+        discount = subtotal * coupon.value / HUNDRED
+    return min(quantize(discount), subtotal), None
+
+
+def price_lines(items, coupon_code=None, user=None, check_stock=True):
+    """
+    Price ``items`` (``LineItem`` objects) against the live catalog.
+
+    Tax is computed per line from ``Product.tax`` on the pre-discount line
+    subtotal; the coupon discount is applied to the order subtotal and capped
+    at it. Raises ``PricingError`` for unknown attributes, bad quantities or
+    insufficient stock.
+    """
+    items = list(items)
+    attributes = (
+        ProductAttribute.objects
+        .select_related('product__tax', 'size', 'color')
+        .in_bulk({item.product_attr_id for item in items})
+    )
+    return price_items(items, attributes, coupon_code=coupon_code, user=user, check_stock=check_stock)
+
+
+def price_items(items, attributes, coupon_code=None, user=None, check_stock=True):
+    """
+    Price ``items`` against already loaded ``attributes`` (``{id: ProductAttribute}``
+    with ``product__tax``), without querying the catalog again.
+    """
+    requested = Counter()
+    for item in items:
+        requested[item.product_attr_id] += item.qty
+
+    quote = Quote()
+    for item in items:
+        product_attr = attributes.get(item.product_attr_id)
+        if product_attr is None or (item.product_id is not None and product_attr.product_id != item.product_id):
+            raise PricingError(f'Product attribute {item.product_attr_id} does not exist.')
+        if item.qty <= 0:
+            raise PricingError(f'Invalid quantity for product attribute {product_attr.pk}.')
+        if check_stock and product_attr.qty < requested[product_attr.pk]:
+            raise PricingError(f'Product attribute {product_attr.pk} is out of stock.')
+
+        tax = product_attr.product.tax
+        tax_rate = tax.tax_value if tax is not None and tax.status else ZERO
+        subtotal = quantize(product_attr.price * item.qty)
+        line_tax = quantize(subtotal * tax_rate / HUNDRED)
+        quote.lines.append(PricedLine(
+            product_attr=product_attr,
+            qty=item.qty,
+            unit_price=product_attr.price,
+            tax_rate=tax_rate,
+            subtotal=subtotal,
+            tax=line_tax,
+        ))
+        quote.subtotal += subtotal
+        quote.tax += line_tax
+
+    if coupon_code:
+        coupon = Coupon.objects.filter(code=coupon_code).first()
+        if coupon is None:
+            quote.coupon_error = 'Invalid coupon code'
+        else:
+            quote.discount, quote.coupon_error = coupon_discount(coupon, quote.subtotal, user)
+            if quote.coupon_error is None:
+                quote.coupon = coupon
+
+    quote.total = max(quote.subtotal + quote.tax - quote.discount, ZERO)
+    return quote
+
+
+def price_cart(user_id, coupon_code=None, user=None):
+    """
+    Price the stored cart of ``user_id``.
+    """
+    return price_cart_lines(get_cart_backend().lines(user_id), coupon_code=coupon_code, user=user)
+
+
+def price_cart_lines(lines, coupon_code=None, user=None):
+    """
+    Price cart lines loaded by the cart backend (attribute, product and tax
+    already joined), so no further catalog query is needed.
+    """
+    items = [LineItem(product_attr_id=line.product_attr_id, qty=line.qty, product_id=line.product_id) for line in lines]
+    attributes = {line.product_attr_id: line.product_attr for line in lines}
+    return price_items(items, attributes, coupon_code=coupon_code, user=user, check_stock=False)
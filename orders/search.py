@@ -0,0 +1,79 @@
+"""
+Order search for support staff.
+
+The query is classified first and each kind of input is answered by the
+index built for it, instead of OR-ing a ``LIKE`` over every column:
+
+* ``#123`` or a short number   -> primary key
+* ``pi_...`` / ``txn_...``     -> exact ``payment_id`` / ``txn_id`` (B-tree)
+* a complete email address     -> exact match on ``lower(email)``
+* a bare number of 7+ digits   -> primary key or ``mobile`` prefix
+* a phone number (7+ digits)   -> ``mobile`` prefix (trigram on PostgreSQL)
+* anything else (3+ chars)     -> ``icontains`` on name/email (trigram on PostgreSQL)
+"""
+
+import re
+
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+MIN_TEXT_LENGTH = 3
+MIN_PHONE_DIGITS = 7
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+GATEWAY_REF_RE = re.compile(r'^[A-Za-z]{2,}_[A-Za-z0-9_]+$')
+PHONE_RE = re.compile(r'^\+?[\d\s\-()]+$')
+ORDER_ID_RE = re.compile(r'^#?\d+$')
+
+
+class OrderSearchError(ValueError):
+    """
+    Raised when a search query is too short or vague to run efficiently.
+    """
+
+
+def classify_query(query):
+    """
+    Return ``(strategy, value)`` for a raw search string.
+    """
+    query = (query or '').strip()
+    if EMAIL_RE.match(query):
+        return 'email', query.lower()
+    if GATEWAY_REF_RE.match(query):
+        return 'payment_ref', query
+    if query.startswith('#') and ORDER_ID_RE.match(query):
+        return 'order_id', int(query[1:])
+    if PHONE_RE.match(query):
+        digits = re.sub(r'[^\d+]', '', query)
+        if len(digits.lstrip('+')) >= MIN_PHONE_DIGITS:
+            # A long bare number may be either an order id or a phone number
+            if digits == query:
+                return 'phone_or_order_id', digits
+            return 'phone', digits
+    if ORDER_ID_RE.match(query):
+        return 'order_id', int(query)
+    if len(query) < MIN_TEXT_LENGTH:
+        raise OrderSearchError(f'Search query must be at least {MIN_TEXT_LENGTH} characters.')
+    return 'text', query
+
+
+def search_orders(queryset, query):
+    """
+    Filter ``queryset`` with the strategy matching ``query``.
+
+    Returns ``(strategy, queryset)``.
+    """
+    strategy, value = classify_query(query)
+    if strategy == 'order_id':
+        return strategy, queryset.filter(pk=value)
+    if strategy == 'payment_ref':
+        return strategy, queryset.filter(Q(payment_id=value) | Q(txn_id=value))
+    if strategy == 'email':
+        return strategy, queryset.alias(email_lower=Lower('email')).filter(email_lower=value)
+    if strategy == 'phone':
+        return strategy, queryset.filter(mobile__startswith=value)
+    if strategy == 'phone_or_order_id':
+        return strategy, queryset.filter(Q(pk=int(value)) | Q(mobile__startswith=value))
+    return strategy, queryset.filter(Q(name__icontains=value) | Q(email__icontains=value))
@@ -3,17 +3,34 @@ Order serializers for the ecommerce application.
 """
 
 from dataclasses import fields
+from django.core.files.storage import default_storage
+from django.db.models import Prefetch
+from core.models import OrderStatus
 from products.models import Product
 from rest_framework import serializers
-from .models import Order, OrderDetail, Cart
+from .filters import OrderFilter
+from .models import Order, OrderDetail, OrderEvent, Cart, ArchivedOrder, ArchivedOrderDetail
 from products.serializers import ProductListSerializer, ProductAttributeSerializer
 
 
+def image_url(path, request=None):
+    """
+    Public URL for a stored image path (absolute when a request is available).
+    """
+    if not path:
+        return None
+    url = default_storage.url(path)
+    return request.build_absolute_uri(url) if request else url
+
+
 class OrderDetailSerializer(serializers.ModelSerializer):
     """
     Order detail serializer.
+
+    Reads product data from the live catalog and falls back to the line's
+    snapshot when the product no longer exists.
     """
-    product_name = serializers.CharField(source='product.name', read_only=True)
+    product_name = serializers.SerializerMethodField()
     product_image = serializers.SerializerMethodField()
     product_attr = ProductAttributeSerializer(read_only=True)
 
@@ -21,13 +38,29 @@ class OrderDetailSerializer(serializers.ModelSerializer):
         model = OrderDetail
         fields = '__all__'
 
+    def get_product_name(self, obj):
+        return obj.product.name if obj.product is not None else obj.product_name
+
     def get_product_image(self, obj):
-        if obj.product.image:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.product.image.url)
-            return obj.product.image.url
-        return None
+        path = obj.product.image.name if obj.product is not None else obj.image
+        return image_url(path, self.context.get('request'))
+
+
+class OrderDetailSnapshotSerializer(serializers.ModelSerializer):
+    """
+    Order detail rendered only from the snapshot stored on the line.
+    """
+    product_image = serializers.SerializerMethodField()
+
+    class Meta:
+        model = OrderDetail
+        fields = [
+            'id', 'product', 'product_attr', 'product_name', 'sku', 'size', 'color',
+            'product_image', 'mrp', 'tax_rate', 'price', 'qty',
+        ]
+
+    def get_product_image(self, obj):
+        return image_url(obj.image, self.context.get('request'))
 
 class OrderSerializer(serializers.ModelSerializer):
     """
@@ -42,6 +75,22 @@ class OrderSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ['customer', 'added_on']
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Apply the prefetch plan required to serialize orders without N+1 queries:
+        the order row joins user and status, and all details (with product,
+        attribute, size and color) are loaded in one extra query per page.
+        """
+        return queryset.select_related('user', 'order_status').prefetch_related(
+            Prefetch(
+                'order_details',
+                queryset=OrderDetail.objects.select_related(
+                    'product', 'product_attr__size', 'product_attr__color'
+                ),
+            )
+        )
+
     def get_customer(self, instance):
         return {
             "name": instance.user.first_name or "" + instance.user.last_name or "",
@@ -50,6 +99,109 @@ class OrderSerializer(serializers.ModelSerializer):
         }
 
 
+class OrderSnapshotSerializer(serializers.ModelSerializer):
+    """
+    Order serializer that reads only the order tables (and the status name).
+
+    Customer details come from the contact data stored on the order and
+    lines from their product snapshot, so past orders render as placed even
+    after catalog or profile changes. Works for live and archived orders.
+    """
+    order_details = OrderDetailSnapshotSerializer(many=True, read_only=True)
+    customer = serializers.SerializerMethodField()
+    order_status_name = serializers.CharField(source='order_status.orders_status', read_only=True)
+
+    class Meta:
+        model = Order
+        fields = '__all__'
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        One query for the orders (with status) and one single-table query
+        for the details of the page.
+        """
+        return queryset.select_related('order_status').prefetch_related('order_details')
+
+    def get_customer(self, instance):
+        return {
+            "name": instance.name,
+            "phone": instance.mobile,
+            "email": instance.email
+        }
+
+
+class ArchivedOrderDetailSerializer(OrderDetailSerializer):
+    """
+    Archived order detail serializer.
+    """
+    class Meta:
+        model = ArchivedOrderDetail
+        fields = '__all__'
+
+
+class ArchivedOrderSerializer(OrderSerializer):
+    """
+    Archived order serializer (same shape as ``OrderSerializer``).
+    """
+    order_details = ArchivedOrderDetailSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = ArchivedOrder
+        fields = '__all__'
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('user', 'order_status').prefetch_related(
+            Prefetch(
+                'order_details',
+                queryset=ArchivedOrderDetail.objects.select_related(
+                    'product', 'product_attr__size', 'product_attr__color'
+                ),
+            )
+        )
+
+
+class OrderSearchResultSerializer(serializers.ModelSerializer):
+    """
+    Compact order row for search results.
+    """
+    order_status_name = serializers.CharField(source='order_status.orders_status', read_only=True)
+
+    class Meta:
+        model = Order
+        fields = [
+            'id', 'name', 'email', 'mobile', 'payment_id', 'txn_id', 'payment_type',
+            'payment_status', 'order_status', 'order_status_name', 'total_amt', 'added_on',
+        ]
+
+
+class OrderEventSerializer(serializers.ModelSerializer):
+    """
+    Order event (timeline entry) serializer.
+    """
+    order_status_name = serializers.CharField(source='order_status.orders_status', read_only=True, default=None)
+
+    class Meta:
+        model = OrderEvent
+        fields = ['id', 'order_status', 'order_status_name', 'payment_status', 'track_details', 'source', 'created_at']
+
+
+class StatusDurationSerializer(serializers.Serializer):
+    """
+    Average time between two order statuses.
+    """
+    from_status = serializers.IntegerField()
+    from_status_name = serializers.CharField(allow_null=True)
+    to_status = serializers.IntegerField()
+    to_status_name = serializers.CharField(allow_null=True)
+    transitions = serializers.IntegerField()
+    avg_seconds = serializers.SerializerMethodField()
+
+    def get_avg_seconds(self, obj):
+        return round(obj['avg_duration'].total_seconds(), 3) if obj['avg_duration'] is not None else None
+
+
 class CartProductSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -84,3 +236,53 @@ class CartAddSerializer(serializers.ModelSerializer):
         fields = ['user_id', 'user_type', 'qty', 'product', 'product_attr']
 
 
+class CartOperationSerializer(serializers.Serializer):
+    """
+    One operation of a cart batch. ``set`` with ``qty`` 0 removes the line.
+    """
+    op = serializers.ChoiceField(choices=['add', 'set', 'remove'])
+    product_attr = serializers.IntegerField(min_value=1)
+    qty = serializers.IntegerField(min_value=0, default=1)
+
+    def validate(self, attrs):
+        if attrs['op'] == 'add' and attrs['qty'] < 1:
+            raise serializers.ValidationError({'qty': 'Must be positive for add.'})
+        return attrs
+
+
+class CartBatchSerializer(serializers.Serializer):
+    """
+    Input for the cart batch endpoint: operations applied in order to one cart.
+    """
+    MAX_OPERATIONS = 100
+
+    user_id = serializers.CharField(max_length=20)
+    user_type = serializers.ChoiceField(choices=Cart.USER_TYPE_CHOICES, default='Not-Reg')
+    operations = serializers.ListField(child=CartOperationSerializer(), allow_empty=False, max_length=MAX_OPERATIONS)
+
+
+class OrderBulkStatusSerializer(serializers.Serializer):
+    """
+    Input for the bulk status update: either ``ids`` or an order ``filter``
+    (same keys as the order list filters), plus the target status.
+    """
+    MAX_IDS = 10000
+
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=False, max_length=MAX_IDS)
+    filter = serializers.DictField(required=False, allow_empty=False)
+    order_status = serializers.PrimaryKeyRelatedField(queryset=OrderStatus.objects.all())
+    track_details = serializers.CharField(required=False, allow_blank=True)
+
+    def validate_filter(self, value):
+        # django-filter ignores unknown keys and blank values; here either would widen the update to every order
+        unknown = sorted(set(value) - set(OrderFilter.base_filters))
+        if unknown:
+            raise serializers.ValidationError(f"Unknown filter keys: {', '.join(unknown)}.")
+        if all(item in (None, '') for item in value.values()):
+            raise serializers.ValidationError('Provide at least one non-empty filter value.')
+        return value
+
+    def validate(self, attrs):
+        if ('ids' in attrs) == ('filter' in attrs):
+            raise serializers.ValidationError('Provide either ids or filter.')
+        return attrs
@@ -0,0 +1,169 @@
+"""
+Order placement services for the ecommerce application.
+"""
+
+from django.db import transaction
+from django.utils import timezone
+
+from core.enums import PaymentStatus, PaymentType
+from core.models import OrderStatus
+from .models import Order, OrderDetail, OrderEvent, OutboxMessage
+from .events import status_event, record_status_event
+from .pricing import parse_line_items, price_lines
+
+
+BULK_STATUS_CHUNK_SIZE = 500
+
+
+class OrderPlacementError(ValueError):
+    """
+    Raised when an order cannot be placed from the submitted lines.
+    """
+
+
+def product_snapshot(product_attr, tax_rate):
+    """
+    Catalog values copied onto an ``OrderDetail`` when the order is placed.
+    ``product_attr`` should have ``product``, ``size`` and ``color`` loaded.
+    """
+    product = product_attr.product
+    return {
+        'product_name': product.name,
+        'sku': product_attr.sku,
+        'size': product_attr.size.size if product_attr.size_id else '',
+        'color': product_attr.color.color if product_attr.color_id else '',
+        'image': product.image.name or '',
+        'mrp': product_attr.mrp,
+        'tax_rate': tax_rate,
+    }
+
+
+def build_order(user, order_data, quote):
+    """
+    Build an unsaved ``Order`` from the checkout ``order_data`` payload and its priced ``quote``.
+    """
+    contact_info = order_data.get("contact_info", {})
+    shipping_address = order_data.get("shipping_address", {})
+
+    return Order(
+        user=user,
+        name=f"{contact_info.get('firstName', '')} {contact_info.get('lastName', '')}".strip() or "Guest User",
+        email=contact_info.get("emailAddress", ""),
+        mobile=contact_info.get("phoneNumber", ""),
+        address=shipping_address.get("streetAddress", ""),
+        city=shipping_address.get("townCity", ""),
+        state=shipping_address.get("state", ""),
+        pincode=shipping_address.get("zipCode", ""),
+        coupon_code=quote.coupon.code if quote.coupon else None,
+        coupon_value=quote.discount,
+        order_status=OrderStatus.objects.filter(is_default=True).first(),
+        payment_type=PaymentType.GATEWAY.value,
+        payment_status=PaymentStatus.PENDING.value,
+        total_amt=quote.total,
+    )
+
+
+def place_order(user, order_data, currency='pkr'):
+    """
+    Price and create an order with all of its details in a single transaction.
+
+    Lines are priced server-side by ``orders.pricing`` (one bulk query for
+    attributes, products and taxes) and details are written with
+    ``bulk_create``, so the number of queries does not depend on the number
+    of lines. The side effects (payment intent, cart clearing, sales rollup,
+    confirmation email) are written to the outbox in the same transaction
+    and delivered by ``orders.outbox``; nothing external runs while the
+    transaction is open.
+
+    Returns ``(order, quote, payment_message)``.
+    """
+    items = parse_line_items(order_data.get("cart_items", []))
+    if not items:
+        raise OrderPlacementError("Cart is empty.")
+
+    quote = price_lines(items, coupon_code=order_data.get("coupon_code"), user=user)
+    if quote.coupon_error:
+        raise OrderPlacementError(quote.coupon_error)
+
+    with transaction.atomic():
+        order = build_order(user, order_data, quote)
+        order.save()
+        OrderDetail.objects.bulk_create([
+            OrderDetail(
+                order=order,
+                product=line.product,
+                product_attr=line.product_attr,
+                price=line.unit_price,
+                qty=line.qty,
+                **product_snapshot(line.product_attr, line.tax_rate),
+            )
+            for line in quote.lines
+        ])
+        record_status_event(order, 'checkout')
+        payment_message, *_ = OutboxMessage.objects.bulk_create(order_outbox_messages(order, quote, currency))
+    return order, quote, payment_message
+
+
+def order_outbox_messages(order, quote, currency):
+    """
+    Unsaved outbox messages for the side effects of a newly placed order.
+    """
+    now = timezone.now()
+    payloads = [
+        ('payment_intent.create', {
+            'order_id': order.pk,
+            'amount': quote.total_in_minor_units,
+            'currency': currency,
+            'metadata': {'order_id': order.pk, 'user_id': str(order.user_id), 'email': order.email},
+        }),
+        ('cart.clear', {
+            'user_id': str(order.user_id),
+            'product_attr_ids': sorted({line.product_attr.pk for line in quote.lines}),
+        }),
+        ('sales_rollup.refresh', {'date': timezone.localdate(order.added_on).isoformat()}),
+        ('email.order_placed', {'order_id': order.pk}),
+    ]
+    return [OutboxMessage(topic=topic, payload=payload, available_at=now) for topic, payload in payloads]
+
+
+def bulk_update_status(order_ids, order_status, track_details=None, source='bulk', chunk_size=BULK_STATUS_CHUNK_SIZE):
+    """
+    Move many orders to ``order_status`` with one ``UPDATE`` per chunk.
+
+    Each chunk runs in its own transaction: the existing ids are read, the
+    orders are updated in a single statement and one ``OrderEvent`` per order
+    is written with ``bulk_create``. ``track_details`` is only overwritten
+    when given.
+
+    Returns ``{order_id: 'updated' | 'not_found'}`` in input order.
+    """
+    order_ids = list(dict.fromkeys(order_ids))
+    changes = {'order_status': order_status}
+    if track_details is not None:
+        changes['track_details'] = track_details
+
+    results = {}
+    for start in range(0, len(order_ids), chunk_size):
+        chunk = order_ids[start:start + chunk_size]
+        with transaction.atomic():
+            found = list(Order.objects.filter(pk__in=chunk).values_list('pk', flat=True))
+            if found:
+                Order.objects.filter(pk__in=found).update(**changes)
+                OrderEvent.objects.bulk_create([
+                    status_event(order_id, order_status, source, track_details) for order_id in found
+                ])
+        found = set(found)
+        results.update({order_id: 'updated' if order_id in found else 'not_found' for order_id in chunk})
+    return results
+
+
+def update_order_status(order, order_status_id, track_details='', source='api'):
+    """
+    Set an order's current status and append the change to its event log.
+    """
+    with transaction.atomic():
+        order.order_status_id = order_status_id
+        order.track_details = track_details
+        order.save(update_fields=['order_status', 'track_details'])
+        record_status_event(order, source, track_details)
+    return order
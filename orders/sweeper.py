@@ -0,0 +1,100 @@
+"""
+Stale cart sweeper.
+
+Guest (``Not-Reg``) and registered (``Reg``) carts are purged from the
+``cart`` table once their newest line is older than the retention for their
+type (``CART_RETENTION_GUEST_DAYS`` / ``CART_RETENTION_REGISTERED_DAYS``;
+0 keeps them forever). The table is walked in primary-key windows and each
+window is one short ``DELETE``, so no statement scans or locks more than
+``chunk_size`` ids. Stale lines can be written to a JSON-lines file before
+they are deleted.
+
+Each run logs ``rows_removed``, ``chunks`` and ``seconds`` on the
+``orders.sweeper`` logger.
+"""
+
+import json
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .models import Cart
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SWEEP_CHUNK_SIZE = 5000
+
+CART_COLUMNS = ['id', 'user_id', 'user_type', 'qty', 'product_id', 'product_attr_id', 'added_on']
+
+
+def cart_retention_days():
+    """
+    Retention in days per ``user_type``.
+    """
+    return {
+        'Not-Reg': getattr(settings, 'CART_RETENTION_GUEST_DAYS', 30),
+        'Reg': getattr(settings, 'CART_RETENTION_REGISTERED_DAYS', 180),
+    }
+
+
+def stale_lines(user_type, cutoff):
+    """
+    Lines of ``user_type`` carts with no line added since ``cutoff``.
+    """
+    active_carts = Cart.objects.filter(user_type=user_type, added_on__gte=cutoff).values('user_id')
+    return Cart.objects.filter(user_type=user_type, added_on__lt=cutoff).exclude(user_id__in=active_carts)
+
+
+def sweep_carts(retention=None, chunk_size=DEFAULT_SWEEP_CHUNK_SIZE, archive=None, dry_run=False, pause=0, now=None):
+    """
+    Delete stale cart lines one primary-key window at a time.
+
+    ``retention`` maps ``user_type`` to days (defaults to the settings).
+    ``archive`` is an optional text file; stale lines are written to it as
+    JSON lines before each delete. ``pause`` sleeps between windows.
+
+    Returns ``{'removed': {user_type: rows}, 'rows_removed', 'chunks', 'seconds'}``.
+    """
+    started = time.monotonic()
+    now = now or timezone.now()
+    retention = cart_retention_days() if retention is None else retention
+    cutoffs = {user_type: now - timedelta(days=days) for user_type, days in retention.items() if days}
+    removed = {user_type: 0 for user_type in cutoffs}
+    chunks = 0
+
+    bounds = Cart.objects.aggregate(low=Min('pk'), high=Max('pk'))
+    if cutoffs and bounds['low'] is not None:
+        for start in range(bounds['low'], bounds['high'] + 1, chunk_size):
+            window = {'pk__gte': start, 'pk__lt': start + chunk_size}
+            for user_type, cutoff in cutoffs.items():
+                lines = stale_lines(user_type, cutoff).filter(**window)
+                if dry_run:
+                    removed[user_type] += lines.count()
+                    continue
+                with transaction.atomic():
+                    if archive is not None:
+                        for line in lines.order_by('pk').values(*CART_COLUMNS):
+                            archive.write(json.dumps(line, cls=DjangoJSONEncoder) + '\n')
+                    removed[user_type] += lines.delete()[0]
+            chunks += 1
+            if pause:
+                time.sleep(pause)
+
+    stats = {
+        'removed': removed,
+        'rows_removed': sum(removed.values()),
+        'chunks': chunks,
+        'seconds': round(time.monotonic() - started, 3),
+    }
+    logger.info(
+        "cart sweep%s: %s rows removed in %s chunks (%.3fs)",
+        " (dry run)" if dry_run else "", stats['rows_removed'], chunks, stats['seconds'],
+        extra={'cart_sweep': stats},
+    )
+    return stats
@@ -0,0 +1,24 @@
+"""
+Celery tasks for the orders app (loaded by the Celery worker only).
+"""
+
+from celery import shared_task
+
+from .outbox import dispatch_pending
+from .sweeper import sweep_carts
+
+
+@shared_task
+def sweep_stale_carts():
+    """
+    Purge stale carts with the configured retention (``sweep_carts`` command).
+    """
+    return sweep_carts()
+
+
+@shared_task
+def dispatch_outbox():
+    """
+    Deliver one batch of due outbox messages (``dispatch_outbox`` command).
+    """
+    return dispatch_pending()
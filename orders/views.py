@@ -4,17 +4,36 @@ Order views for the ecommerce application.
 
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import OrderingFilter
 from rest_framework.views import APIView
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 
-from .models import Order, OrderDetail, Cart
-from .serializers import OrderSerializer, OrderDetailSerializer, CartSerializer, CartAddSerializer
+from .models import Order, OrderDetail, Cart, ArchivedOrder
+from .serializers import (
+    OrderSerializer, OrderDetailSerializer, CartSerializer, CartBatchSerializer, ArchivedOrderSerializer,
+    OrderSnapshotSerializer,
+    OrderBulkStatusSerializer, OrderEventSerializer, StatusDurationSerializer, OrderSearchResultSerializer,
+)
 from products.models import ProductAttribute
+from .pricing import price_cart_lines
+from .cart import get_cart_backend, CartItemNotFound, CartStockError, CartBatchError, CartMergeError
+from .services import bulk_update_status, update_order_status
+from .events import order_timeline, average_status_durations
+from .search import search_orders, OrderSearchError, DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT
+from .filters import OrderFilter, ArchivedOrderFilter
+from .archive import OrderHistory, wants_archive
+from .exports import iter_export, EXPORT_FORMATS, CONTENT_TYPES, DEFAULT_CHUNK_SIZE
+from core.permissions import IsAdminUserType
 
 from core.serializers import OrderStatusOverviewSerializer
 
+# The only order in which live orders can be followed by archived ones (see OrderHistory)
+ARCHIVE_ORDERING = '-added_on'
+
 
 class OrderViewSet(viewsets.ModelViewSet):
     """
@@ -23,7 +42,7 @@ class OrderViewSet(viewsets.ModelViewSet):
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, OrderingFilter]
-    filterset_fields = ['order_status', 'payment_type', 'payment_status']
+    filterset_class = OrderFilter
     ordering = ['-added_on']
 
     def get_queryset(self):
@@ -32,12 +51,71 @@ class OrderViewSet(viewsets.ModelViewSet):
             return Order.objects.none()
             
         if hasattr(self.request.user, 'user_type') and self.request.user.user_type == 'admin':
-            return Order.objects.all()
-        # For customers, only show their own orders
-        try:
-            return Order.objects.filter(user=self.request.user)
-        except:
-            return Order.objects.none()
+            queryset = Order.objects.all()
+        else:
+            # For customers, only show their own orders
+            try:
+                queryset = Order.objects.filter(user=self.request.user)
+            except:
+                return Order.objects.none()
+        if self.snapshot_mode():
+            return OrderSnapshotSerializer.setup_eager_loading(queryset)
+        return OrderSerializer.setup_eager_loading(queryset)
+
+    def snapshot_mode(self):
+        """
+        ``?snapshot=1`` renders orders from the order tables only (see ``OrderSnapshotSerializer``).
+        """
+        return self.request.query_params.get('snapshot') in ('1', 'true')
+
+    def get_serializer_class(self):
+        if self.action in ('list', 'retrieve', 'my_orders') and self.snapshot_mode():
+            return OrderSnapshotSerializer
+        return super().get_serializer_class()
+
+    def get_archived_queryset(self):
+        if self.request.user.user_type == 'admin':
+            queryset = ArchivedOrder.objects.all()
+        else:
+            queryset = ArchivedOrder.objects.filter(user=self.request.user)
+        if self.snapshot_mode():
+            return OrderSnapshotSerializer.setup_eager_loading(queryset)
+        return ArchivedOrderSerializer.setup_eager_loading(queryset)
+
+    def with_archive(self, queryset):
+        """
+        Append archived orders when an explicit date filter reaches past the
+        archive horizon; otherwise only the live table is read. The combined
+        list is newest first only, so any other ``ordering`` is rejected
+        rather than silently dropping the archived orders.
+        """
+        order_filter = ArchivedOrderFilter(self.request.query_params, queryset=self.get_archived_queryset())
+        if not order_filter.is_valid():
+            return queryset
+        dates = order_filter.form.cleaned_data
+        if not wants_archive(dates.get('date_from'), dates.get('date_to')):
+            return queryset
+        if self.request.query_params.get('ordering', ARCHIVE_ORDERING) != ARCHIVE_ORDERING:
+            raise ValidationError({
+                'ordering': f"Only {ARCHIVE_ORDERING} is supported when the date range includes archived orders."
+            })
+        return OrderHistory(queryset, order_filter.qs)
+
+    def serialize_orders(self, orders):
+        context = self.get_serializer_context()
+        if self.snapshot_mode():
+            return OrderSnapshotSerializer(orders, many=True, context=context).data
+        return [
+            (ArchivedOrderSerializer if isinstance(order, ArchivedOrder) else OrderSerializer)(order, context=context).data
+            for order in orders
+        ]
+
+    def list(self, request, *args, **kwargs):
+        orders = self.with_archive(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(orders)
+        if page is not None:
+            return self.get_paginated_response(self.serialize_orders(page))
+        return Response(self.serialize_orders(orders))
 
     def perform_create(self, serializer):
         serializer.save()
@@ -50,30 +128,143 @@ class OrderViewSet(viewsets.ModelViewSet):
         track_details = request.data.get('track_details', '')
         
         if new_status:
-            order.order_status_id = new_status
-            order.track_details = track_details
-            order.save()
-            
+            update_order_status(order, new_status, track_details)
+
             serializer = self.get_serializer(order)
             return Response(serializer.data)
         
         return Response({'error': 'Order status is required'}, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=True, methods=['get'])
+    def timeline(self, request, pk=None):
+        """
+        Status and payment events of an order, oldest first. Works for
+        archived orders too.
+        """
+        try:
+            order_id = int(pk)
+        except (TypeError, ValueError):
+            return Response({'error': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
+        visible = (
+            self.get_queryset().filter(pk=order_id).exists()
+            or self.get_archived_queryset().filter(pk=order_id).exists()
+        )
+        if not visible:
+            return Response({'error': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(OrderEventSerializer(order_timeline(order_id), many=True).data)
+
+    @action(detail=False, methods=['get'], url_path='status-durations', permission_classes=[IsAdminUserType])
+    def status_durations(self, request):
+        """
+        Average time between consecutive statuses across all orders (admin only).
+        """
+        return Response(StatusDurationSerializer(average_status_durations(), many=True).data)
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUserType])
+    def search(self, request):
+        """
+        Find orders by order id, customer email, phone, name, payment_id or
+        txn_id (admin only).
+
+        Query params: q, limit (default 20, max 100). The response names the
+        strategy that was used for the query.
+        """
+        query = request.query_params.get('q', '')
+        try:
+            limit = min(int(request.query_params.get('limit', DEFAULT_SEARCH_LIMIT)), MAX_SEARCH_LIMIT)
+            strategy, orders = search_orders(Order.objects.select_related('order_status'), query)
+        except (ValueError, OrderSearchError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        orders = orders.order_by('-added_on')[:max(limit, 1)]
+        return Response({
+            'query': query,
+            'strategy': strategy,
+            'results': OrderSearchResultSerializer(orders, many=True).data,
+        })
+
+    @action(detail=False, methods=['post'], url_path='bulk-status', permission_classes=[IsAdminUserType])
+    def bulk_status(self, request):
+        """
+        Move many orders to one status (admin only).
+
+        Body: ``ids`` (list of order ids) or ``filter`` (order_status,
+        payment_type, payment_status, date_from, date_to), plus
+        ``order_status`` and optional ``track_details``. Returns one compact
+        result per order instead of the serialized orders.
+        """
+        serializer = OrderBulkStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        if 'ids' in data:
+            order_ids = data['ids']
+        else:
+            order_filter = OrderFilter(data['filter'], queryset=Order.objects.all())
+            if not order_filter.is_valid():
+                return Response(order_filter.errors, status=status.HTTP_400_BAD_REQUEST)
+            # Same cap as an explicit id list
+            max_ids = OrderBulkStatusSerializer.MAX_IDS
+            order_ids = list(order_filter.qs.order_by('pk').values_list('pk', flat=True)[:max_ids + 1])
+            if len(order_ids) > max_ids:
+                return Response(
+                    {'filter': [f"Matches more than {max_ids} orders; narrow the filter."]},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+        results = bulk_update_status(order_ids, data['order_status'], track_details=data.get('track_details'))
+        updated = sum(1 for result in results.values() if result == 'updated')
+        return Response({
+            'order_status': data['order_status'].id,
+            'updated': updated,
+            'not_found': len(results) - updated,
+            'results': [{'id': order_id, 'result': result} for order_id, result in results.items()],
+        })
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUserType])
+    def export(self, request):
+        """
+        Stream all matching orders with their lines as CSV or NDJSON (admin only).
+
+        Query params: export_format (csv|ndjson), order_status, payment_type,
+        payment_status, date_from, date_to (YYYY-MM-DD).
+        """
+        export_format = request.query_params.get('export_format', 'csv').lower()
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {'error': f"export_format must be one of: {', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        order_filter = OrderFilter(request.query_params, queryset=Order.objects.all())
+        if not order_filter.is_valid():
+            return Response(order_filter.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(
+            iter_export(order_filter.qs, export_format, chunk_size=DEFAULT_CHUNK_SIZE),
+            content_type=CONTENT_TYPES[export_format],
+        )
+        filename = f"orders-{timezone.now():%Y%m%d%H%M%S}.{export_format}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
     @action(detail=False, methods=['get'], url_path="my-orders")
     def my_orders(self, request):
         """Get current user's orders."""
-        orders = self.get_queryset()
+        orders = self.with_archive(self.get_queryset())
         page = self.paginate_queryset(orders)
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        serializer = self.get_serializer(orders, many=True)
-        return Response(serializer.data)
+            return self.get_paginated_response(self.serialize_orders(page))
+        return Response(self.serialize_orders(orders))
 
 
-class CartViewSet(viewsets.ModelViewSet):
+class CartViewSet(viewsets.GenericViewSet):
     """
     Shopping cart viewset.
+
+    Cart lines are read and written through the configured cart backend
+    (``CART_BACKEND``, see ``orders.cart``), so there are no generic
+    create/update/destroy routes writing the ``Cart`` table directly.
     """
     serializer_class = CartSerializer
     permission_classes = [permissions.AllowAny] 
@@ -85,52 +276,86 @@ class CartViewSet(viewsets.ModelViewSet):
             return Cart.objects.filter(user_id=user_id)
         return Cart.objects.none()
 
-    def get_serializer_class(self):
-        if self.action == 'create':
-            return CartAddSerializer
-        return CartSerializer
+    def list(self, request, *args, **kwargs):
+        user_id = request.query_params.get('user_id')
+        lines = get_cart_backend().lines(user_id) if user_id else []
+        return Response(CartSerializer(lines, many=True, context=self.get_serializer_context()).data)
 
     @action(detail=False, methods=['get'])
     def total(self, request):
-        """Get cart total."""
+        """
+        Get cart total.
+
+        ``?summary_only=1`` returns only line count, quantity and subtotal
+        from a single aggregate (for the mini-cart badge).
+        """
         user_id = request.query_params.get('user_id')
         if not user_id:
             return Response({'error': 'user_id is required'}, status=status.HTTP_400_BAD_REQUEST)
-            
-        cart_items = Cart.objects.filter(user_id=user_id)
-        total = sum(item.product_attr.price * item.qty for item in cart_items)
-        item_count = cart_items.count()
-        
-        return Response({
-            'total': total,
-            'item_count': item_count,
+
+        if request.query_params.get('summary_only') in ('1', 'true'):
+            summary = get_cart_backend().summary(user_id)
+            return Response({
+                'total': summary['subtotal'],
+                'item_count': summary['item_count'],
+                'quantity': summary['quantity'],
+            })
+
+        # Lines are loaded once (with attribute, product and tax) and priced in memory
+        cart_items = get_cart_backend().lines(user_id)
+        return Response(self.cart_totals(cart_items, request.query_params.get('coupon_code')))
+
+    def cart_totals(self, cart_items, coupon_code=None):
+        quote = price_cart_lines(cart_items, coupon_code=coupon_code, user=self.request.user)
+        return {
+            'total': quote.subtotal,
+            'tax': quote.tax,
+            'discount': quote.discount,
+            'grand_total': quote.total,
+            'item_count': len(quote.lines),
             'items': CartSerializer(cart_items, many=True).data
-        })
+        }
+
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """
+        Apply several ``add`` / ``set`` / ``remove`` operations to one cart
+        in a single transaction and return the resulting cart with totals.
+        Either every operation is applied or none is.
+        """
+        serializer = CartBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        try:
+            cart_items = get_cart_backend().apply(data['user_id'], data['operations'], user_type=data['user_type'])
+        except CartBatchError as e:
+            return Response({'error': 'Cart operations rejected', 'operations': e.errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.cart_totals(cart_items, request.data.get('coupon_code')))
 
     @action(detail=False, methods=['post'], url_path="add-item")
     def add_item(self, request):
-        """Add item to cart or update quantity if exists."""
+        """Add item to cart or increase its quantity, atomically and within stock."""
         user_id = request.data.get('user_id')
         product_id = request.data.get('product')
         product_attr_id = request.data.get('product_attr')
         qty = int(request.data.get('qty', 1))
         
-        # Check if item already exists in cart
-        cart_item, created = Cart.objects.get_or_create(
-            user_id=user_id,
-            product_id=product_id,
-            product_attr_id=product_attr_id,
-            defaults={
-                'user_type': request.data.get('user_type', 'Not-Reg'),
-                'qty': qty
-            }
-        )
-
+        if qty <= 0:
+            return Response({'error': 'qty must be positive'}, status=status.HTTP_400_BAD_REQUEST)
 
-        if not created:
-            # Update quantity if item already exists
-            cart_item.qty += qty
-            cart_item.save()
+        try:
+            cart_item = get_cart_backend().add(
+                user_id, product_id, product_attr_id, qty,
+                user_type=request.data.get('user_type', 'Not-Reg'),
+            )
+        except CartStockError as e:
+            if e.available is None:
+                return Response({'error': 'Product attribute not found'}, status=status.HTTP_404_NOT_FOUND)
+            return Response({
+                "error":"out of stock",
+                "available_stock":e.available
+            }, status=status.HTTP_400_BAD_REQUEST)
             
         serializer = CartSerializer(cart_item)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -142,29 +367,43 @@ class CartViewSet(viewsets.ModelViewSet):
         product_attr_id = request.data.get('product_attr')
         qty = int(request.data.get('qty', 1))
 
-        print(user_id, product_attr_id, qty)
+        if qty > 0:
+            product_attr = ProductAttribute.objects.get(id=product_attr_id)
+            if product_attr.qty < qty:
+                return Response({
+                    "error":"out of stock",
+                    "available_stock":product_attr.qty
+                }, status=status.HTTP_400_BAD_REQUEST)
+
         try:
-            cart_item = Cart.objects.get(user_id=user_id, product_attr_id=product_attr_id)
-            if qty <= 0:
-                cart_item.delete()
-                return Response({'message': 'Item removed from cart'})
-            else:
-
-                product_attr = ProductAttribute.objects.get(id=product_attr_id)
-                if product_attr.qty < qty:
-                    return Response({
-                        "error":"out of stock",
-                        "available_stock":product_attr.qty
-                    }, status=status.HTTP_400_BAD_REQUEST)
-
-
-                cart_item.qty = qty
-                cart_item.save()
-                serializer = CartSerializer(cart_item)
-                return Response(serializer.data)
-        except Cart.DoesNotExist:
+            cart_item = get_cart_backend().set_qty(user_id, product_attr_id, qty)
+        except CartItemNotFound:
             return Response({'error': 'Item not found in cart'}, status=status.HTTP_404_NOT_FOUND)
 
+        if cart_item is None:
+            return Response({'message': 'Item removed from cart'})
+        serializer = CartSerializer(cart_item)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated])
+    def merge(self, request):
+        """
+        Merge the guest cart ``guest_user_id`` into the signed-in user's cart
+        and return the merged cart with totals. Quantities of shared lines
+        are summed and clamped to stock.
+        """
+        guest_user_id = request.data.get('guest_user_id')
+        if not guest_user_id:
+            return Response({'error': 'guest_user_id is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        backend = get_cart_backend()
+        user_id = str(request.user.id)
+        try:
+            merged = backend.merge(str(guest_user_id), user_id)
+        except CartMergeError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'merged_lines': merged, **self.cart_totals(backend.lines(user_id))})
+
     @action(detail=False, methods=['delete'])
     def clear_cart(self, request):
         """Clear all items from cart."""
@@ -172,17 +411,15 @@ class CartViewSet(viewsets.ModelViewSet):
         if not user_id:
             return Response({'error': 'user_id is required'}, status=status.HTTP_400_BAD_REQUEST)
             
-        Cart.objects.filter(user_id=user_id).delete()
+        get_cart_backend().clear(user_id)
         return Response({'message': 'Cart cleared successfully'})
 
     @action(detail=True, methods=["delete"], url_path="remove-item")
     def remove_item(self, request, pk):
-        "remove item from cart"
-
-        try:
-            cart =  Cart.objects.get(id=pk)
-            cart.delete()
+        """
+        Remove item from cart. With the Redis cart backend ``pk`` is the
+        product attribute id and ``user_id`` must be passed as a query param.
+        """
+        if get_cart_backend().remove_line(pk, user_id=request.query_params.get('user_id')):
             return Response({"message":"item deteled"}, status=status.HTTP_204_NO_CONTENT)
-        except Cart.DoesNotExist:
-            return Response({"error":"Object not found."}, status=status.HTTP_404_NOT_FOUND)
-
+        return Response({"error":"Object not found."}, status=status.HTTP_404_NOT_FOUND)
@@ -1,6 +1,8 @@
 from django.urls import path
-from .views import create_payment_intent
+from .views import create_payment_intent, order_payment_intent, checkout_quote
 
 urlpatterns = [
-    path("create-payment-intent/", create_payment_intent, name="create-payment-intent")
+    path("create-payment-intent/", create_payment_intent, name="create-payment-intent"),
+    path("quote/", checkout_quote, name="checkout-quote"),
+    path("orders/<int:order_id>/payment-intent/", order_payment_intent, name="order-payment-intent"),
 ]
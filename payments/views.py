@@ -1,104 +1,103 @@
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
-from orders.models import Order
-from core.models import OrderStatus
-from integrations.stripe.client import StripeClient
+from integrations.stripe.client import StripeError, get_stripe_client
 from django.contrib.auth import get_user_model
-from products.models import Product, ProductAttribute
-from orders.models import OrderDetail, Cart
-from core.models import Coupon
-from core.enums import PaymentStatus, PaymentType
+from core.enums import PaymentStatus
+from orders.models import Order
+from orders.outbox import deliver_now
+from orders.services import place_order
+from orders.pricing import parse_line_items, price_lines, price_cart
 
 User = get_user_model()
-stripe_client = StripeClient()
+
 
 @api_view(["POST"])
 def create_payment_intent(request):
+    """
+    Place the order and create its Stripe payment intent.
+
+    The order and its outbox messages are written in one transaction; the
+    payment intent is then created right away so the client gets its
+    ``client_secret``. If Stripe is unreachable the order is kept, the
+    response is 202 and the outbox dispatcher creates the intent later
+    (poll ``orders/<id>/payment-intent/``).
+    """
     try:
-        # Extract data from request
-        amount = int(request.data.get("amount"))
+        # Extract data from request; the amount is computed server-side and any client amount is ignored
         currency = request.data.get("currency", "pkr")
         order_data = request.data.get("order_data", {})
-        
-        # Get contact info and shipping address
-        contact_info = order_data.get("contact_info", {})
-        shipping_address = order_data.get("shipping_address", {})
-        # Get or create pending order status
-        order_status = OrderStatus.objects.filter(is_default=True).first()
-        
-        # Handle coupon code 
-        coupon_code = order_data.get("coupon_code")
-        coupon_value = 0
-        if coupon_code:
-            try:
-                coupon = Coupon.objects.get(code=coupon_code)
-                coupon_value = coupon.value
-            except Coupon.DoesNotExist:
-                coupon_value = 0
-        
-        # Create order with all required fields and convert from paisa to rupees
-        order = Order.objects.create(
-            user=request.user,
-            name=f"{contact_info.get('firstName', '')} {contact_info.get('lastName', '')}".strip() or "Guest User",
-            email=contact_info.get("emailAddress", ""),
-            mobile=contact_info.get("phoneNumber", ""),
-            address=shipping_address.get("streetAddress", ""),
-            city=shipping_address.get("townCity", ""),
-            state=shipping_address.get("state", ""),
-            pincode=shipping_address.get("zipCode", ""),
-            coupon_code=order_data.get("coupon_code"),
-            coupon_value=coupon_value,
-            order_status=order_status,
-            payment_type=PaymentType.GATEWAY.value,
-            payment_status=PaymentStatus.PENDING.value,
-            total_amt=amount / 100,  # Convert from paisa to rupees
-        )
-
-        # Create Stripe payment intent
-        intent = stripe_client.create_payment_intent(
-            amount=amount,
-            currency=currency,
-            metadata={
-                "order_id": order.id,
-                "user_id": str(request.user.id),
-                "email": contact_info.get("emailAddress", ""),
-            },
-        )
 
-        order.payment_id = intent.id
-        order.save()
+        # Price and create the order, its details and outbox messages in one transaction
+        order, quote, payment_message = place_order(request.user, order_data, currency=currency)
+        amount = quote.total_in_minor_units
+    except Exception as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        cart_items = order_data.get("cart_items", [])
-        for item in cart_items:
-            try:
-                # Handle product_id - it might be an object or a simple ID
-                product_id = item.get("product_id")
-                if isinstance(product_id, dict):
-                    product_id = product_id.get("id")
-                
-                product = Product.objects.get(id=product_id)
-                product_attr = ProductAttribute.objects.get(id=item.get("product_attr_id"))
-                  
-                OrderDetail.objects.create(
-                    order=order,
-                    product=product,
-                    product_attr=product_attr,
-                    price=item.get("price", 0),
-                    qty=item.get("quantity", 1),
-                )
-            except (Product.DoesNotExist, ProductAttribute.DoesNotExist) as e:
-                print(f"Error creating order detail for item {item}: {e}")
-                continue
-        
-        Cart.objects.filter(user_id=request.user.id).delete()
-        
+    # Deliver the payment intent message now, outside the order transaction
+    deliver_now(payment_message)
+    intent = payment_message.payload.get("intent")
+    if intent is None:
+        if "error" in payment_message.payload:
+            return Response({"error": payment_message.payload["error"], "order_id": order.id}, status=status.HTTP_400_BAD_REQUEST)
         return Response({
-            "client_secret": intent.client_secret,
             "order_id": order.id,
-            "payment_intent_id": intent.id
-        }, status=status.HTTP_200_OK)
+            "payment_status": "pending",
+            "amount": amount,
+            "quote": quote.to_dict(),
+        }, status=status.HTTP_202_ACCEPTED)
 
-    except Exception as e:
+    return Response({
+        "client_secret": intent["client_secret"],
+        "order_id": order.id,
+        "payment_intent_id": intent["id"],
+        "amount": amount,
+        "quote": quote.to_dict(),
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+def order_payment_intent(request, order_id):
+    """
+    Payment intent of one of the caller's orders, once the outbox has created it.
+    """
+    order = Order.objects.filter(pk=order_id, user=request.user).first()
+    if order is None:
+        return Response({"error": "Order not found"}, status=status.HTTP_404_NOT_FOUND)
+    if order.payment_status == PaymentStatus.FAILED.value:
+        return Response({"error": "Payment could not be initiated", "order_id": order.id}, status=status.HTTP_400_BAD_REQUEST)
+    if not order.payment_id:
+        return Response({"order_id": order.id, "payment_status": "pending"}, status=status.HTTP_202_ACCEPTED)
+
+    try:
+        intent = get_stripe_client().retrieve_payment_intent(order.payment_id)
+    except StripeError as e:
+        return Response({"error": str(e), "order_id": order.id}, status=status.HTTP_502_BAD_GATEWAY)
+    return Response({
+        "client_secret": intent.client_secret,
+        "order_id": order.id,
+        "payment_intent_id": intent.id,
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(["POST"])
+def checkout_quote(request):
+    """
+    Price a cart or a list of lines server-side.
+
+    Send either ``user_id`` (stored cart) or ``cart_items`` (same format as
+    checkout), plus an optional ``coupon_code``.
+    """
+    try:
+        coupon_code = request.data.get("coupon_code")
+        cart_items = request.data.get("cart_items")
+        if cart_items is not None:
+            quote = price_lines(parse_line_items(cart_items), coupon_code=coupon_code, user=request.user)
+        elif request.data.get("user_id"):
+            quote = price_cart(request.data.get("user_id"), coupon_code=coupon_code, user=request.user)
+        else:
+            return Response({"error": "user_id or cart_items is required"}, status=status.HTTP_400_BAD_REQUEST)
+    except ValueError as e:
         return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    return Response(quote.to_dict(), status=status.HTTP_200_OK)
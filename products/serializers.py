@@ -2,7 +2,9 @@
 Product serializers for the ecommerce application.
 """
 
+from django.db.models import Q
 from rest_framework import serializers
+from core.kpis import KPISerializer, KPICount
 from .models import Product, ProductAttribute, ProductImage, ProductReview
 from core.serializers import BrandSerializer, CategorySerializer, ColorSerializer, SizeSerializer, TaxSerializer
 
@@ -450,25 +452,14 @@ class ProductCreateUpdateSerializer(serializers.ModelSerializer):
         return data
 
 
-class ProductKPISerializer(serializers.ModelSerializer):
-    feature_count = serializers.SerializerMethodField()
-    total_count = serializers.SerializerMethodField()
-    promo_count = serializers.SerializerMethodField()
-    discounted_count = serializers.SerializerMethodField()
-
-    def get_feature_count(self, obj):
-        return Product.objects.filter(is_featured=True).count()
-
-    def get_total_count(self, obj):
-        return Product.objects.count()
-
-    def get_promo_count(self, obj):
-        return Product.objects.filter(is_promo=True).count()
-
-    def get_discounted_count(self, obj):
-        return Product.objects.filter(is_discounted=True).count()
+class ProductKPISerializer(KPISerializer):
+    """
+    Product KPIs computed in a single aggregate query.
+    """
+    feature_count = KPICount(filter=Q(is_featured=True))
+    total_count = KPICount()
+    promo_count = KPICount(filter=Q(is_promo=True))
+    discounted_count = KPICount(filter=Q(is_discounted=True))
 
     class Meta:
         model = Product
-        fields = ["feature_count", "total_count", "promo_count", "discounted_count"]
-
@@ -3,9 +3,15 @@ API tests for authentication endpoints.
 """
 
 import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.urls import reverse
 from rest_framework import status
 from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.authentication import CachedJWTAuthentication, UserCache
+from accounts.tokens import AccountRefreshToken
+from customers.models import Customer
 
 User = get_user_model()
 
@@ -115,24 +121,199 @@ class TestAuthAPI:
         assert customer_user.mobile == '9999999999'
 
     def test_logout(self, authenticated_client, customer_user):
-        """Test user logout endpoint."""
-        # Get a refresh token for the authenticated user
-        from rest_framework_simplejwt.tokens import RefreshToken
-        
-        refresh = RefreshToken.for_user(customer_user)
-        
-        url = reverse('logout')
-        data = {
-            'refresh': str(refresh)
-        }
-        
-        response = authenticated_client.post(url, data, format='json')
-        
-        # Logout might fail if blacklisting is not configured, but endpoint should exist
-        assert response.status_code in [status.HTTP_200_OK, status.HTTP_400_BAD_REQUEST]
-        
-        if response.status_code == status.HTTP_200_OK:
-            assert 'message' in response.data
-        else:
-            # Blacklisting might not be configured, which is fine for testing
-            assert 'error' in response.data
+        """Logout revokes the refresh token, so it can no longer be refreshed."""
+        refresh = AccountRefreshToken.for_user(customer_user)
+
+        response = authenticated_client.post(reverse('logout'), {'refresh': str(refresh)}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert 'message' in response.data
+        response = authenticated_client.post(reverse('token_refresh'), {'refresh': str(refresh)}, format='json')
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_logout_other_users_token(self, authenticated_client, admin_user):
+        """A refresh token of another user is not revoked."""
+        refresh = AccountRefreshToken.for_user(admin_user)
+
+        response = authenticated_client.post(reverse('logout'), {'refresh': str(refresh)}, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not refresh.is_revoked()
+
+    def test_rotated_refresh_token_is_revoked(self, api_client, customer_user):
+        """Refreshing rotates the token; the old one cannot be used again."""
+        refresh = str(AccountRefreshToken.for_user(customer_user))
+        url = reverse('token_refresh')
+
+        first = api_client.post(url, {'refresh': refresh}, format='json')
+        reuse = api_client.post(url, {'refresh': refresh}, format='json')
+
+        assert first.status_code == status.HTTP_200_OK and first.data['refresh'] != refresh
+        assert reuse.status_code == status.HTTP_401_UNAUTHORIZED
+        assert api_client.post(url, {'refresh': first.data['refresh']}, format='json').status_code == status.HTTP_200_OK
+
+    def test_logout_all_revokes_every_token(self, api_client, customer_user):
+        """Logging out everywhere rejects older access and refresh tokens, not new ones."""
+        old = AccountRefreshToken.for_user(customer_user)
+        api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {old.access_token}')
+        api_client.get(reverse('profile'))
+
+        assert api_client.post(reverse('logout_all')).status_code == status.HTTP_200_OK
+
+        assert api_client.get(reverse('profile')).status_code == status.HTTP_401_UNAUTHORIZED
+        response = api_client.post(reverse('token_refresh'), {'refresh': str(old)}, format='json')
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        customer_user.refresh_from_db()
+        api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccountRefreshToken.for_user(customer_user).access_token}')
+        assert api_client.get(reverse('profile')).status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+class TestProvisionAPI:
+    """Test the admin bulk provisioning endpoint."""
+
+    @pytest.fixture(autouse=True)
+    def cheap_hashing(self, settings):
+        settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+    def test_requires_admin(self, authenticated_client):
+        response = authenticated_client.post(reverse('provision_users'), {'users': []}, format='json')
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_provision_from_json(self, admin_client, customer_user):
+        users = [{'email': 'bulk@example.com', 'password': 'bulk-pass', 'name': 'Bulk'}, {'email': customer_user.email}]
+
+        response = admin_client.post(reverse('provision_users'), {'users': users}, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert (response.data['created'], response.data['skipped']) == (1, 1)
+        assert Customer.objects.get(user__email='bulk@example.com').name == 'Bulk'
+
+    def test_provision_from_csv_upload(self, admin_client):
+        upload = SimpleUploadedFile('users.csv', b'email,password\nup1@example.com,pw\nup2@example.com,pw\n')
+
+        response = admin_client.post(reverse('provision_users'), {'file': upload}, format='multipart')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert User.objects.filter(email__startswith='up').count() == 2
+
+    def test_row_limit(self, admin_client, settings):
+        settings.PROVISION_API_MAX_ROWS = 1
+        users = [{'email': 'a@example.com'}, {'email': 'b@example.com'}]
+
+        response = admin_client.post(reverse('provision_users'), {'users': users}, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'provision_users' in response.data['error']
+
+
+@pytest.mark.django_db
+class TestCachedAuthentication:
+    """Test the cached JWT user lookup and its invalidation."""
+
+    def bearer(self, api_client, user):
+        api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccountRefreshToken.for_user(user).access_token}')
+        return api_client
+
+    def test_login_tokens_carry_user_type(self, api_client, customer_user):
+        """Issued access tokens include the user_type claim."""
+        response = api_client.post(reverse('login'), {'email': customer_user.email, 'password': 'testpass123'})
+
+        assert AccessToken(response.data['tokens']['access'])['user_type'] == 'customer'
+
+    def test_user_save_invalidates(self, api_client, customer_user, user_cache):
+        """Changes saved through the model are seen on the next request."""
+        client = self.bearer(api_client, customer_user)
+        client.get(reverse('profile'))
+        assert user_cache.get(customer_user.id, 0) is not None
+
+        customer_user.mobile = '5550000'
+        customer_user.save()
+
+        assert client.get(reverse('profile')).data['mobile'] == '5550000'
+
+    def test_password_change_and_deactivation_invalidate(self, api_client, customer_user, user_cache):
+        """A deactivated user is rejected at once, not after the cache expires."""
+        client = self.bearer(api_client, customer_user)
+        client.get(reverse('profile'))
+
+        customer_user.set_password('new-password-1')
+        customer_user.save()
+        assert user_cache.get(customer_user.id, 0) is None
+
+        client.get(reverse('profile'))
+        customer_user.is_active = False
+        customer_user.save()
+        assert client.get(reverse('profile')).status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_cached_inactive_user_is_rejected(self, api_client, customer_user, user_cache):
+        """A cache entry from another worker that already saw the deactivation is still checked."""
+        client = self.bearer(api_client, customer_user)
+        customer_user.is_active = False
+        user_cache.set(customer_user.id, 0, customer_user)
+
+        assert client.get(reverse('profile')).status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_customer_profile_is_cached_and_invalidated(self, api_client, customer_user, user_cache):
+        """customer_profile is loaded with the user and dropped when the profile is saved."""
+        customer = Customer.objects.create(user=customer_user, name='Before')
+        client = self.bearer(api_client, customer_user)
+        client.get(reverse('customer-profile'))
+        assert user_cache.get(customer_user.id, 0).customer_profile.name == 'Before'
+
+        customer.name = 'After'
+        customer.save()
+
+        assert client.get(reverse('customer-profile')).data['name'] == 'After'
+
+
+class TestUserCache:
+    """Test the two cache tiers."""
+
+    def test_lru_evicts_oldest(self):
+        cache = UserCache(max_size=2)
+        for user_id in (1, 2, 3):
+            cache.set(user_id, 0, User(id=user_id, email=f'{user_id}@example.com'))
+
+        assert cache.get(1, 0) is None
+        assert cache.get(3, 0).email == '3@example.com'
+
+    def test_entries_expire_and_versions_are_separate(self):
+        cache = UserCache(ttl=0)
+        cache.set(1, 0, User(id=1))
+        assert cache.get(1, 0) is None
+
+        cache = UserCache()
+        cache.set(1, 0, User(id=1))
+        assert cache.get(1, 1) is None
+
+    @pytest.mark.django_db
+    def test_copies_do_not_share_the_profile(self, customer_user):
+        """Unsaved changes to one request's user or profile never reach the next request."""
+        Customer.objects.create(user=customer_user, name='Saved')
+        cache = UserCache()
+        user = User.objects.select_related('customer_profile').get(pk=customer_user.pk)
+        cache.set(user.pk, 0, user)
+        user.customer_profile.name = 'changed on the original'
+
+        first = cache.get(user.pk, 0)
+        first.customer_profile.name = 'changed on a copy'
+        first.first_name = 'changed'
+
+        second = cache.get(user.pk, 0)
+        assert second.customer_profile.name == 'Saved'
+        assert second.first_name == customer_user.first_name
+
+    def test_redis_tier_is_shared(self):
+        """A user cached by one worker is served from Redis to another; invalidation clears both."""
+        fakeredis = pytest.importorskip('fakeredis')
+        server = fakeredis.FakeServer()
+        first = UserCache(redis_client=fakeredis.FakeRedis(server=server))
+        second = UserCache(redis_client=fakeredis.FakeRedis(server=server))
+
+        first.set(7, 0, User(id=7, email='shared@example.com'))
+        assert second.get(7, 0).email == 'shared@example.com'
+
+        first.invalidate(7)
+        second.clear()
+        assert second.get(7, 0) is None
@@ -2,11 +2,23 @@
 API tests for order endpoints.
 """
 
+import csv
+import io
+import json
+from datetime import timedelta
+
 import pytest
+from django.core.management import call_command
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 
-from orders.models import Cart, Order, OrderDetail
+from core.models import OrderStatus
+from orders.cart import get_cart_backend
+from orders.models import ArchivedOrder, Cart, Order, OrderDetail, OrderEvent
+from orders.services import update_order_status
+from orders.search import classify_query
+from products.models import ProductAttribute
 
 
 @pytest.mark.django_db
@@ -33,6 +45,22 @@ class TestCartAPI:
         assert len(response.data['results']) == 1
         assert response.data['results'][0]['qty'] == 2
 
+    def test_no_direct_table_writes(self, api_client, product, product_attribute):
+        """Cart writes only go through the backend actions, not generic model routes."""
+        cart_item = Cart.objects.create(
+            user_id='test_user_123', user_type='Not-Reg', qty=2, product=product, product_attr=product_attribute,
+        )
+
+        response = api_client.post(reverse('cart-list'), {
+            'user_id': 'test_user_123', 'product': product.id, 'product_attr': product_attribute.id, 'qty': 5,
+        }, format='json')
+        assert response.status_code == status.HTTP_405_METHOD_NOT_ALLOWED
+
+        response = api_client.patch(f"{reverse('cart-list')}{cart_item.id}/", {'qty': 9}, format='json')
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+        assert Cart.objects.get().qty == 2
+
     def test_get_cart_total(self, api_client, product, product_attribute):
         """Test getting cart total."""
         # Create cart items
@@ -190,6 +218,164 @@ class TestCartAPI:
         assert 'user_id is required' in response.data['error']
 
 
+@pytest.mark.django_db
+class TestCartBatchAPI:
+    """Test the cart batch endpoint."""
+
+    def make_attribute(self, product_attribute, sku, qty=10):
+        return ProductAttribute.objects.create(
+            product=product_attribute.product, sku=sku, mrp=product_attribute.mrp, price=product_attribute.price,
+            qty=qty, size=product_attribute.size, color=product_attribute.color,
+        )
+
+    def test_batch_applies_operations_in_order(self, api_client, product_attribute):
+        """Adds, sets and removes are applied in order and the cart comes back with totals."""
+        second = self.make_attribute(product_attribute, 'SKU-2')
+        third = self.make_attribute(product_attribute, 'SKU-3')
+        Cart.objects.create(user_id='guest-1', user_type='Not-Reg', qty=1, product=second.product, product_attr=second)
+        Cart.objects.create(user_id='guest-1', user_type='Not-Reg', qty=4, product=third.product, product_attr=third)
+
+        response = api_client.post(reverse('cart-batch'), {
+            'user_id': 'guest-1',
+            'operations': [
+                {'op': 'add', 'product_attr': product_attribute.id, 'qty': 2},
+                {'op': 'add', 'product_attr': product_attribute.id, 'qty': 1},
+                {'op': 'set', 'product_attr': second.id, 'qty': 5},
+                {'op': 'remove', 'product_attr': third.id},
+            ],
+        }, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert dict(Cart.objects.filter(user_id='guest-1').values_list('product_attr_id', 'qty')) == {
+            product_attribute.id: 3, second.id: 5,
+        }
+        assert response.data['item_count'] == 2
+        assert response.data['total'] == product_attribute.price * 8
+        assert {item['product_attr']['id'] for item in response.data['items']} == {product_attribute.id, second.id}
+
+    def test_batch_is_all_or_nothing(self, api_client, product_attribute):
+        """One out-of-stock or unknown line rejects the whole batch."""
+        Cart.objects.create(
+            user_id='guest-1', user_type='Not-Reg', qty=2, product=product_attribute.product, product_attr=product_attribute,
+        )
+
+        response = api_client.post(reverse('cart-batch'), {
+            'user_id': 'guest-1',
+            'operations': [
+                {'op': 'remove', 'product_attr': product_attribute.id},
+                {'op': 'add', 'product_attr': product_attribute.id, 'qty': product_attribute.qty + 1},
+                {'op': 'set', 'product_attr': product_attribute.id + 999, 'qty': 1},
+            ],
+        }, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data['operations'] == [
+            {'index': 1, 'product_attr': product_attribute.id, 'error': 'out of stock', 'available_stock': product_attribute.qty},
+            {'index': 2, 'product_attr': product_attribute.id + 999, 'error': 'Product attribute not found', 'available_stock': None},
+        ]
+        assert Cart.objects.get(user_id='guest-1').qty == 2
+
+    def test_batch_validation(self, api_client, product_attribute):
+        """Unknown operations and non-positive adds are rejected by the serializer."""
+        response = api_client.post(reverse('cart-batch'), {
+            'user_id': 'guest-1',
+            'operations': [
+                {'op': 'merge', 'product_attr': product_attribute.id},
+                {'op': 'add', 'product_attr': product_attribute.id, 'qty': 0},
+            ],
+        }, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'operations' in response.data
+        assert not Cart.objects.exists()
+
+
+@pytest.mark.django_db
+class TestCartMergeAPI:
+    """Test merging a guest cart into the account cart."""
+
+    def make_attribute(self, product_attribute, sku, qty=10):
+        return ProductAttribute.objects.create(
+            product=product_attribute.product, sku=sku, mrp=product_attribute.mrp, price=product_attribute.price,
+            qty=qty, size=product_attribute.size, color=product_attribute.color,
+        )
+
+    def add_line(self, user_id, attr, qty, user_type='Not-Reg'):
+        Cart.objects.create(user_id=user_id, user_type=user_type, qty=qty, product=attr.product, product_attr=attr)
+
+    def test_merge_sums_clamps_and_moves(self, product_attribute):
+        """Shared lines are summed up to stock, guest-only lines move over, sold-out lines go."""
+        guest_only = self.make_attribute(product_attribute, 'SKU-2')
+        sold_out = self.make_attribute(product_attribute, 'SKU-3', qty=0)
+        self.add_line('7', product_attribute, 6, 'Reg')
+        self.add_line('guest-1', product_attribute, 7)
+        self.add_line('guest-1', guest_only, 2)
+        self.add_line('guest-1', sold_out, 1)
+
+        assert get_cart_backend().merge('guest-1', '7') == 3
+
+        assert not Cart.objects.filter(user_id='guest-1').exists()
+        assert dict(Cart.objects.filter(user_id='7').values_list('product_attr_id', 'qty')) == {
+            product_attribute.id: product_attribute.qty, guest_only.id: 2,
+        }
+        assert set(Cart.objects.filter(user_id='7').values_list('user_type', flat=True)) == {'Reg'}
+
+    def test_login_merges_guest_cart(self, api_client, customer_user, product_attribute):
+        """Logging in with guest_user_id merges that cart into the user's cart."""
+        self.add_line('guest-1', product_attribute, 2)
+
+        response = api_client.post(reverse('login'), {
+            'email': customer_user.email, 'password': 'testpass123', 'guest_user_id': 'guest-1',
+        }, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['cart'] == {'user_id': str(customer_user.id), 'merged_lines': 1}
+        assert Cart.objects.get(user_id=str(customer_user.id)).qty == 2
+
+    def test_merge_endpoint(self, api_client, customer_user, product_attribute):
+        """The explicit endpoint merges into the signed-in user's cart and returns it."""
+        self.add_line('guest-1', product_attribute, 3)
+        api_client.force_authenticate(user=customer_user)
+
+        response = api_client.post(reverse('cart-merge'), {'guest_user_id': 'guest-1'}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['merged_lines'] == 1
+        assert response.data['item_count'] == 1
+        assert response.data['total'] == product_attribute.price * 3
+
+    def test_merge_rejects_registered_user_cart(self, api_client, customer_user, user, product_attribute):
+        """Passing another user's id as guest_user_id neither takes nor deletes their cart."""
+        self.add_line(str(user.id), product_attribute, 2, 'Reg')
+        api_client.force_authenticate(user=customer_user)
+
+        response = api_client.post(reverse('cart-merge'), {'guest_user_id': str(user.id)}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        api_client.force_authenticate(user=None)
+        response = api_client.post(reverse('login'), {
+            'email': customer_user.email, 'password': 'testpass123', 'guest_user_id': str(user.id),
+        }, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert 'access' in response.data['tokens']
+        assert 'error' in response.data['cart']
+
+        assert Cart.objects.get(user_id=str(user.id)).qty == 2
+        assert not Cart.objects.filter(user_id=str(customer_user.id)).exists()
+
+    def test_merge_only_moves_guest_lines(self, product_attribute):
+        """Registered lines are never a merge source, whatever their cart id."""
+        self.add_line('someone', product_attribute, 2, 'Reg')
+
+        assert get_cart_backend().merge('someone', '7') == 0
+        assert Cart.objects.get(user_id='someone').qty == 2
+
+    def test_merge_endpoint_requires_login(self, api_client):
+        """Anonymous callers cannot merge carts."""
+        response = api_client.post(reverse('cart-merge'), {'guest_user_id': 'guest-1'}, format='json')
+        assert response.status_code in (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN)
+
+
 @pytest.mark.django_db
 class TestOrderAPI:
     """Test order API endpoints."""
@@ -366,3 +552,418 @@ class TestOrderAPI:
         assert response.status_code == status.HTTP_200_OK
         assert len(response.data['results']) == 1
         assert response.data['results'][0]['name'] == 'Test Customer 1'
+
+
+@pytest.mark.django_db
+class TestOrderExportAPI:
+    """Test the streaming order export endpoint."""
+
+    def test_export_requires_admin(self, authenticated_client):
+        """Customers cannot export orders."""
+        url = reverse('order-export')
+
+        response = authenticated_client.get(url)
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_export_csv(self, admin_client, order_factory):
+        """CSV export has one row per order line."""
+        order_factory(count=2, lines=3)
+        url = reverse('order-export')
+
+        response = admin_client.get(url, {'export_format': 'csv'})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'] == 'text/csv'
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        assert len(rows) == 6
+        assert rows[0]['sku']
+
+    def test_export_ndjson_with_filters(self, admin_client, order_factory):
+        """NDJSON export emits one document per order and honours filters."""
+        order_factory(count=2, lines=2, payment_type='COD')
+        order_factory(count=1, lines=1, payment_type='Gateway')
+        url = reverse('order-export')
+
+        response = admin_client.get(url, {'export_format': 'ndjson', 'payment_type': 'Gateway'})
+
+        documents = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        assert len(documents) == 1
+        assert documents[0]['payment_type'] == 'Gateway'
+        assert len(documents[0]['lines']) == 1
+
+    def test_export_date_range(self, admin_client, order_factory):
+        """Orders outside the date range are excluded."""
+        old_order, = order_factory(count=1)
+        Order.objects.filter(pk=old_order.pk).update(added_on=timezone.now() - timedelta(days=30))
+        order_factory(count=1)
+        url = reverse('order-export')
+        date_from = (timezone.now() - timedelta(days=1)).date().isoformat()
+
+        response = admin_client.get(url, {'export_format': 'ndjson', 'date_from': date_from})
+
+        documents = b''.join(response.streaming_content).decode().splitlines()
+        assert len(documents) == 1
+
+    def test_export_command(self, order_factory):
+        """The export_orders command writes the same stream to stdout."""
+        order_factory(count=3, lines=1)
+        out = io.StringIO()
+
+        call_command('export_orders', '--format', 'ndjson', '--chunk-size', '2', stdout=out)
+
+        assert len(out.getvalue().splitlines()) == 3
+
+
+@pytest.mark.django_db
+class TestOrderArchive:
+    """Test archiving old orders and reading them back through the order list."""
+
+    @pytest.fixture
+    def archived_order(self, order_factory):
+        """An order (with two lines) older than the archive horizon, moved into the archive."""
+        old_order, = order_factory(count=1, lines=2)
+        Order.objects.filter(pk=old_order.pk).update(added_on=timezone.now() - timedelta(days=400))
+        call_command('archive_orders', '--older-than-days', '365', stdout=io.StringIO())
+        return old_order
+
+    def test_archive_command_moves_old_orders(self, order_factory, archived_order):
+        """Old orders and their details leave the live tables; recent ones stay."""
+        recent_order, = order_factory(count=1)
+        archived = ArchivedOrder.objects.get(pk=archived_order.pk)
+
+        assert not Order.objects.filter(pk=archived_order.pk).exists()
+        assert not OrderDetail.objects.filter(order_id=archived_order.pk).exists()
+        assert archived.order_details.count() == 2
+        assert archived.total_amt == archived_order.total_amt
+        assert Order.objects.filter(pk=recent_order.pk).exists()
+
+    def test_archive_command_dry_run(self, order_factory):
+        """--dry-run only reports the number of orders to archive."""
+        old_order, = order_factory(count=1)
+        Order.objects.filter(pk=old_order.pk).update(added_on=timezone.now() - timedelta(days=400))
+        out = io.StringIO()
+
+        call_command('archive_orders', '--dry-run', stdout=out)
+
+        assert out.getvalue().startswith('1 orders')
+        assert Order.objects.filter(pk=old_order.pk).exists()
+
+    def test_list_without_date_filter_skips_archive(self, admin_client, order_factory, archived_order):
+        """The default order list only reads the live table."""
+        order_factory(count=1)
+        url = reverse('order-list')
+
+        response = admin_client.get(url)
+
+        assert response.data['count'] == 1
+
+    def test_list_with_old_date_from_includes_archive(self, admin_client, order_factory, archived_order):
+        """A date filter reaching past the horizon appends archived orders."""
+        order_factory(count=1)
+        url = reverse('order-list')
+        date_from = (timezone.now() - timedelta(days=500)).date().isoformat()
+
+        response = admin_client.get(url, {'date_from': date_from})
+
+        assert response.data['count'] == 2
+        assert response.data['results'][-1]['id'] == archived_order.pk
+        assert len(response.data['results'][-1]['order_details']) == 2
+
+    def test_archive_range_rejects_other_ordering(self, admin_client, order_factory, archived_order):
+        """Archived orders are never dropped silently because of ?ordering=."""
+        order_factory(count=1)
+        url = reverse('order-list')
+        date_from = (timezone.now() - timedelta(days=500)).date().isoformat()
+
+        response = admin_client.get(url, {'date_from': date_from, 'ordering': 'total_amt'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'ordering' in response.data
+
+        response = admin_client.get(url, {'date_from': date_from, 'ordering': '-added_on'})
+        assert response.data['count'] == 2
+
+    def test_my_orders_includes_own_archived_orders(self, authenticated_client, archived_order):
+        """Customers see their own archived orders when asking for old dates."""
+        url = reverse('order-my-orders')
+        date_to = (timezone.now() - timedelta(days=390)).date().isoformat()
+
+        response = authenticated_client.get(url, {'date_to': date_to})
+
+        assert [order['id'] for order in response.data['results']] == [archived_order.pk]
+
+
+@pytest.mark.django_db
+class TestOrderBulkStatusAPI:
+    """Test the bulk order status update endpoint."""
+
+    @pytest.fixture
+    def shipped(self):
+        return OrderStatus.objects.create(orders_status='Shipped')
+
+    def test_bulk_status_requires_admin(self, authenticated_client, shipped):
+        """Customers cannot bulk update orders."""
+        url = reverse('order-bulk-status')
+
+        response = authenticated_client.post(url, {'ids': [1], 'order_status': shipped.id}, format='json')
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_bulk_status_by_ids(self, admin_client, order_factory, shipped):
+        """Listed orders are updated, unknown ids are reported, history is written."""
+        orders = order_factory(count=3)
+        ids = [order.id for order in orders] + [999999]
+        url = reverse('order-bulk-status')
+
+        response = admin_client.post(
+            url, {'ids': ids, 'order_status': shipped.id, 'track_details': 'TRK-1'}, format='json'
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['updated'] == 3
+        assert response.data['not_found'] == 1
+        assert response.data['results'][-1] == {'id': 999999, 'result': 'not_found'}
+        assert Order.objects.filter(order_status=shipped, track_details='TRK-1').count() == 3
+        assert OrderEvent.objects.filter(order_status=shipped, source='bulk').count() == 3
+
+    def test_bulk_status_by_filter(self, admin_client, order_factory, shipped):
+        """A filter selects the orders to update."""
+        order_factory(count=2, payment_type='Gateway')
+        cod_order, = order_factory(count=1, payment_type='COD', track_details='keep')
+        url = reverse('order-bulk-status')
+
+        response = admin_client.post(
+            url, {'filter': {'payment_type': 'Gateway'}, 'order_status': shipped.id}, format='json'
+        )
+
+        assert response.data['updated'] == 2
+        cod_order.refresh_from_db()
+        assert cod_order.order_status_id != shipped.id
+        assert cod_order.track_details == 'keep'
+
+    def test_bulk_status_filter_is_capped(self, admin_client, order_factory, shipped, monkeypatch):
+        """A filter matching more orders than an id list may hold is rejected."""
+        monkeypatch.setattr('orders.serializers.OrderBulkStatusSerializer.MAX_IDS', 2)
+        order_factory(count=3, payment_type='Gateway')
+        url = reverse('order-bulk-status')
+
+        response = admin_client.post(
+            url, {'filter': {'payment_type': 'Gateway'}, 'order_status': shipped.id}, format='json'
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'filter' in response.data
+        assert not Order.objects.filter(order_status=shipped).exists()
+
+    @pytest.mark.parametrize('order_filter', [{'orderstatus': 999}, {'payment_type': ''}])
+    def test_bulk_status_rejects_unknown_or_empty_filter(self, admin_client, order_factory, shipped, order_filter):
+        """A typo or blank filter must not select every order."""
+        order_factory(count=3)
+        url = reverse('order-bulk-status')
+
+        response = admin_client.post(url, {'filter': order_filter, 'order_status': shipped.id}, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'filter' in response.data
+        assert not Order.objects.filter(order_status=shipped).exists()
+
+    def test_bulk_status_invalid_filter_value(self, admin_client, order_factory, shipped):
+        """Filter values that do not validate are a 400, not an unfiltered update."""
+        order_factory(count=2)
+        url = reverse('order-bulk-status')
+
+        response = admin_client.post(
+            url, {'filter': {'date_from': 'not-a-date'}, 'order_status': shipped.id}, format='json'
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not Order.objects.filter(order_status=shipped).exists()
+
+    def test_bulk_status_requires_ids_or_filter(self, admin_client, shipped):
+        """Either ids or a non-empty filter must be given."""
+        url = reverse('order-bulk-status')
+
+        response = admin_client.post(url, {'order_status': shipped.id}, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestOrderEventsAPI:
+    """Test the append-only order event log and its read endpoints."""
+
+    @pytest.fixture
+    def shipped(self):
+        return OrderStatus.objects.create(orders_status='Shipped')
+
+    def test_update_status_appends_event(self, admin_client, order_factory, shipped):
+        """Each status update inserts an event; earlier tracking is kept."""
+        order, = order_factory(count=1)
+        url = reverse('order-update-status', kwargs={'pk': order.pk})
+
+        admin_client.patch(url, {'order_status': shipped.id, 'track_details': 'TRK-1'}, format='json')
+        admin_client.patch(url, {'order_status': shipped.id, 'track_details': 'TRK-2'}, format='json')
+
+        response = admin_client.get(reverse('order-timeline', kwargs={'pk': order.pk}))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [event['track_details'] for event in response.data] == ['TRK-1', 'TRK-2']
+        assert response.data[0]['order_status_name'] == 'Shipped'
+        assert response.data[0]['source'] == 'api'
+
+    def test_timeline_hidden_from_other_customers(self, authenticated_client, order_factory, admin_user):
+        """Customers cannot read the timeline of someone else's order."""
+        order, = order_factory(count=1, user=admin_user)
+
+        response = authenticated_client.get(reverse('order-timeline', kwargs={'pk': order.pk}))
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_timeline_non_numeric_id(self, authenticated_client):
+        """A malformed order id is not found, like the detail route."""
+        response = authenticated_client.get(reverse('order-timeline', kwargs={'pk': 'abc'}))
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_timeline_survives_archival(self, authenticated_client, order_factory, shipped):
+        """Events of archived orders remain readable."""
+        order, = order_factory(count=1)
+        update_order_status(order, shipped.id, 'TRK-1')
+        Order.objects.filter(pk=order.pk).update(added_on=timezone.now() - timedelta(days=400))
+        call_command('archive_orders', stdout=io.StringIO())
+
+        response = authenticated_client.get(reverse('order-timeline', kwargs={'pk': order.pk}))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [event['track_details'] for event in response.data] == ['TRK-1']
+
+    def test_status_durations(self, admin_client, order_factory, order_status, shipped):
+        """Average time between statuses is aggregated per transition."""
+        orders = order_factory(count=2)
+        start = timezone.now() - timedelta(days=3)
+        for order, hours in zip(orders, (2, 4)):
+            placed = OrderEvent.objects.create(order=order, order_status=order_status, source='checkout')
+            done = OrderEvent.objects.create(order=order, order_status=shipped, source='api')
+            OrderEvent.objects.filter(pk=placed.pk).update(created_at=start)
+            OrderEvent.objects.filter(pk=done.pk).update(created_at=start + timedelta(hours=hours))
+
+        response = admin_client.get(reverse('order-status-durations'))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == [{
+            'from_status': order_status.id,
+            'from_status_name': order_status.orders_status,
+            'to_status': shipped.id,
+            'to_status_name': 'Shipped',
+            'transitions': 2,
+            'avg_seconds': 3 * 3600.0,
+        }]
+
+
+@pytest.mark.django_db
+class TestOrderSearchAPI:
+    """Test the admin order search endpoint."""
+
+    @pytest.fixture
+    def orders(self, order_factory):
+        first, = order_factory(count=1, name='Ayesha Khan', email='Ayesha@Example.com', mobile='03001234567', payment_id='pi_3AbC')
+        second, = order_factory(count=1, name='Bilal Ahmed', email='bilal@example.com', mobile='03219876543', txn_id='txn_778')
+        return first, second
+
+    @pytest.mark.parametrize('query, strategy', [
+        ('ayesha@example.com', 'email'),
+        ('pi_3AbC', 'payment_ref'),
+        ('txn_778', 'payment_ref'),
+        ('0300-1234', 'phone'),
+        ('#42', 'order_id'),
+        ('#1234567', 'order_id'),
+        ('1234567', 'phone_or_order_id'),
+        ('khan', 'text'),
+    ])
+    def test_query_classification(self, query, strategy):
+        """Each kind of input is routed to its own lookup."""
+        assert classify_query(query)[0] == strategy
+
+    @pytest.mark.parametrize('query, expected', [
+        ('AYESHA@example.com', 0),
+        ('pi_3AbC', 0),
+        ('txn_778', 1),
+        ('0321 987', 1),
+        ('ahmed', 1),
+        ('example.com', None),
+    ])
+    def test_search(self, admin_client, orders, query, expected):
+        """Searches match by email, gateway reference, phone prefix and name."""
+        response = admin_client.get(reverse('order-search'), {'q': query})
+
+        assert response.status_code == status.HTTP_200_OK
+        ids = [order['id'] for order in response.data['results']]
+        if expected is None:
+            assert sorted(ids) == sorted(order.id for order in orders)
+        else:
+            assert ids == [orders[expected].id]
+
+    def test_search_by_order_id(self, admin_client, orders):
+        """A '#' prefixed number looks up the order id."""
+        response = admin_client.get(reverse('order-search'), {'q': f'#{orders[1].id}'})
+
+        assert response.data['strategy'] == 'order_id'
+        assert [order['id'] for order in response.data['results']] == [orders[1].id]
+
+    def test_long_bare_number_searches_ids_and_phones(self, admin_client, orders, order_factory):
+        """A 7+ digit number finds the order with that id as well as phone prefixes."""
+        big, = order_factory(count=1, id=1234567)
+
+        for query in ('1234567', '#1234567'):
+            response = admin_client.get(reverse('order-search'), {'q': query})
+            assert [order['id'] for order in response.data['results']] == [big.id]
+
+        response = admin_client.get(reverse('order-search'), {'q': '03001234567'})
+        assert [order['id'] for order in response.data['results']] == [orders[0].id]
+
+    def test_search_rejects_short_text(self, admin_client):
+        """Free text shorter than three characters is rejected."""
+        response = admin_client.get(reverse('order-search'), {'q': 'ab'})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_search_requires_admin(self, authenticated_client):
+        """Customers cannot search all orders."""
+        response = authenticated_client.get(reverse('order-search'), {'q': 'khan'})
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+class TestOrderSnapshot:
+    """Test that order lines keep their product snapshot."""
+
+    def test_snapshot_mode_renders_from_order_tables(self, authenticated_client, order_factory, product_attribute):
+        """?snapshot=1 returns the stored line data and contact details."""
+        order, = order_factory(count=1)
+        url = reverse('order-detail', kwargs={'pk': order.pk})
+
+        response = authenticated_client.get(url, {'snapshot': 1})
+
+        assert response.status_code == status.HTTP_200_OK
+        line = response.data['order_details'][0]
+        assert line['product_name'] == product_attribute.product.name
+        assert line['sku'] == product_attribute.sku
+        assert line['product_attr'] == product_attribute.id
+        assert response.data['customer']['email'] == order.email
+
+    def test_lines_survive_product_changes(self, authenticated_client, order_factory, product_attribute):
+        """Renaming or deleting the product does not change past orders."""
+        order, = order_factory(count=1)
+        name, sku = product_attribute.product.name, product_attribute.sku
+        product_attribute.product.name = 'Renamed'
+        product_attribute.product.save()
+        product_attribute.product.delete()
+        url = reverse('order-detail', kwargs={'pk': order.pk})
+
+        snapshot = authenticated_client.get(url, {'snapshot': 1}).data['order_details'][0]
+        default = authenticated_client.get(url).data['order_details'][0]
+
+        assert (snapshot['product_name'], snapshot['sku'], snapshot['product']) == (name, sku, None)
+        assert default['product_name'] == name
+        assert default['product_attr'] is None
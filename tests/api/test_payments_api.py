@@ -0,0 +1,324 @@
+"""
+API tests for payment endpoints.
+"""
+
+import hashlib
+import hmac
+import io
+import json
+import time
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from core.enums import PaymentStatus
+from core.models import Coupon
+from integrations.models import StripeEvent
+from integrations.stripe.events import HANDLERS, process_event, process_pending
+from orders.models import Cart, Order, OrderDetail, OrderEvent, OutboxMessage
+from orders.outbox import dispatch_pending
+
+
+def checkout_payload(product_attribute, lines=1, qty=1):
+    """Build a create-payment-intent payload with ``lines`` cart items."""
+    return {
+        'amount': int(product_attribute.price * 100) * lines * qty,
+        'currency': 'pkr',
+        'order_data': {
+            'contact_info': {
+                'firstName': 'Test',
+                'lastName': 'Buyer',
+                'emailAddress': 'buyer@example.com',
+                'phoneNumber': '03000000000',
+            },
+            'shipping_address': {
+                'streetAddress': 'Street 1',
+                'townCity': 'Lahore',
+                'state': 'Punjab',
+                'zipCode': '54000',
+            },
+            'cart_items': [
+                {
+                    'product_id': product_attribute.product_id,
+                    'product_attr_id': product_attribute.id,
+                    'price': str(product_attribute.price),
+                    'quantity': qty,
+                }
+                for _ in range(lines)
+            ],
+        },
+    }
+
+
+@pytest.mark.django_db
+class TestCreatePaymentIntentAPI:
+    """Test the checkout payment intent endpoint."""
+
+    def test_create_payment_intent(self, authenticated_client, customer_user, product_attribute, fake_stripe):
+        """Order, details and payment id are stored and the cart is cleared by the outbox."""
+        Cart.objects.create(
+            user_id=str(customer_user.id), user_type='Reg', qty=1,
+            product=product_attribute.product, product_attr=product_attribute,
+        )
+        url = reverse('create-payment-intent')
+
+        response = authenticated_client.post(url, checkout_payload(product_attribute, lines=2), format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        order = Order.objects.get(id=response.data['order_id'])
+        assert order.payment_id == response.data['payment_intent_id']
+        assert OrderDetail.objects.filter(order=order).count() == 2
+        detail = OrderDetail.objects.filter(order=order).first()
+        assert (detail.product_name, detail.sku, detail.tax_rate) == (
+            product_attribute.product.name, product_attribute.sku, Decimal('18.00')
+        )
+        assert fake_stripe[0]['metadata']['order_id'] == str(order.id)
+
+        dispatch_pending()
+        assert not Cart.objects.filter(user_id=str(customer_user.id)).exists()
+
+    def test_invalid_attribute_creates_nothing(self, authenticated_client, product_attribute, fake_stripe):
+        """An unknown attribute rejects the whole order before Stripe is called."""
+        payload = checkout_payload(product_attribute)
+        payload['order_data']['cart_items'][0]['product_attr_id'] = 999999
+        url = reverse('create-payment-intent')
+
+        response = authenticated_client.post(url, payload, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not Order.objects.exists()
+        assert fake_stripe == []
+
+    def test_stripe_failure_marks_order_failed(self, authenticated_client, product_attribute, fake_stripe_server):
+        """A gateway error leaves the order flagged as failed."""
+        fake_stripe_server.fail_next(status=402)
+        url = reverse('create-payment-intent')
+
+        response = authenticated_client.post(url, checkout_payload(product_attribute), format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        order = Order.objects.get(id=response.data['order_id'])
+        assert order.payment_status == PaymentStatus.FAILED.value
+
+    def test_stripe_outage_defers_payment_intent(self, authenticated_client, product_attribute, fake_stripe_server, settings):
+        """When Stripe is down the order is kept (202) and the outbox creates the intent later."""
+        settings.STRIPE_MAX_RETRIES = 0
+        fake_stripe_server.fail_next(status=503)
+        url = reverse('create-payment-intent')
+
+        response = authenticated_client.post(url, checkout_payload(product_attribute), format='json')
+
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        order_id = response.data['order_id']
+        poll_url = reverse('order-payment-intent', args=[order_id])
+        assert authenticated_client.get(poll_url).status_code == status.HTTP_202_ACCEPTED
+
+        OutboxMessage.objects.update(available_at=timezone.now())
+        dispatch_pending()
+
+        response = authenticated_client.get(poll_url)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['payment_intent_id'] == Order.objects.get(id=order_id).payment_id
+        assert len(fake_stripe_server.intents) == 1
+
+    def test_poll_other_users_order(self, api_client, admin_user, order_factory):
+        """Only the buyer can poll an order's payment intent."""
+        order, = order_factory()
+        api_client.force_authenticate(user=admin_user)
+
+        response = api_client.get(reverse('order-payment-intent', args=[order.id]))
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestCheckoutQuoteAPI:
+    """Test the server-side pricing quote endpoint."""
+
+    def test_quote_applies_tax(self, authenticated_client, product_attribute):
+        """Line prices come from the catalog and product tax is added."""
+        url = reverse('checkout-quote')
+        data = {'cart_items': [{'product_attr_id': product_attribute.id, 'quantity': 2, 'price': '1.00'}]}
+
+        response = authenticated_client.post(url, data, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['subtotal'] == Decimal('1600.00')
+        assert response.data['tax'] == Decimal('288.00')  # 18%
+        assert response.data['total'] == Decimal('1888.00')
+
+    def test_quote_for_stored_cart(self, authenticated_client, product_attribute):
+        """A stored cart is priced by user_id."""
+        Cart.objects.create(
+            user_id='guest-1', user_type='Not-Reg', qty=1,
+            product=product_attribute.product, product_attr=product_attribute,
+        )
+        url = reverse('checkout-quote')
+
+        response = authenticated_client.post(url, {'user_id': 'guest-1'}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['item_count'] == 1
+        assert response.data['subtotal'] == Decimal('800.00')
+
+    @pytest.mark.parametrize('coupon_type, value, expected_discount', [
+        ('Per', Decimal('10.00'), Decimal('160.00')),
+        ('Value', Decimal('100.00'), Decimal('100.00')),
+    ])
+    def test_quote_coupon_rules(self, authenticated_client, product_attribute, coupon_type, value, expected_discount):
+        """Percentage and fixed coupons are applied according to their type."""
+        Coupon.objects.create(
+            title='Test', code='QUOTE1', value=value, type=coupon_type,
+            min_order_amt=Decimal('100.00'), status=True,
+        )
+        url = reverse('checkout-quote')
+        data = {
+            'coupon_code': 'QUOTE1',
+            'cart_items': [{'product_attr_id': product_attribute.id, 'quantity': 2}],
+        }
+
+        response = authenticated_client.post(url, data, format='json')
+
+        assert response.data['discount'] == expected_discount
+        assert response.data['total'] == Decimal('1888.00') - expected_discount
+
+    def test_quote_coupon_minimum_not_met(self, authenticated_client, product_attribute):
+        """A coupon below its minimum order amount is reported and not applied."""
+        Coupon.objects.create(
+            title='Big', code='BIGONLY', value=Decimal('10.00'), type='Per',
+            min_order_amt=Decimal('100000.00'), status=True,
+        )
+        url = reverse('checkout-quote')
+        data = {'coupon_code': 'BIGONLY', 'cart_items': [{'product_attr_id': product_attribute.id, 'quantity': 1}]}
+
+        response = authenticated_client.post(url, data, format='json')
+
+        assert response.data['discount'] == Decimal('0.00')
+        assert 'Minimum order amount' in response.data['coupon_error']
+
+    def test_checkout_uses_server_side_total(self, authenticated_client, product_attribute, fake_stripe):
+        """Checkout ignores the client amount and line price."""
+        payload = checkout_payload(product_attribute)
+        payload['amount'] = 1
+        payload['order_data']['cart_items'][0]['price'] = '1.00'
+        url = reverse('create-payment-intent')
+
+        response = authenticated_client.post(url, payload, format='json')
+
+        order = Order.objects.get(id=response.data['order_id'])
+        assert order.total_amt == Decimal('944.00')
+        assert order.order_details.get().price == product_attribute.price
+        assert fake_stripe[0]['amount'] == 94400
+
+
+def post_webhook_event(client, monkeypatch, event_type, order_id, event_id='evt_1', intent_id='pi_1', created=1700000000):
+    """Deliver a signed-looking Stripe event for ``order_id`` to the webhook."""
+    event = {
+        'id': event_id, 'type': event_type, 'created': created,
+        'data': {'object': {'id': intent_id, 'object': 'payment_intent', 'metadata': {'order_id': str(order_id)}}},
+    }
+    monkeypatch.setattr('integrations.stripe.client.StripeClient.construct_event', lambda self, payload, sig: event)
+    return client.post(reverse('stripe-webhook'), data=b'{}', content_type='application/json', HTTP_STRIPE_SIGNATURE='t=1,v1=x')
+
+
+@pytest.mark.django_db
+class TestStripeWebhook:
+    """Test the Stripe webhook event store and worker."""
+
+    def post_event(self, client, monkeypatch, event_type, order_id, **fields):
+        return post_webhook_event(client, monkeypatch, event_type, order_id, **fields)
+
+    def test_webhook_stores_event_once(self, api_client, order_factory, monkeypatch):
+        """The view only stores the event; a retried delivery is ignored."""
+        order, = order_factory(count=1, payment_type='Gateway')
+
+        for _ in range(2):
+            response = self.post_event(api_client, monkeypatch, 'payment_intent.succeeded', order.id)
+            assert response.status_code == status.HTTP_200_OK
+
+        stored = StripeEvent.objects.get()
+        assert (stored.event_id, stored.payment_intent, stored.status) == ('evt_1', 'pi_1', StripeEvent.PENDING)
+        order.refresh_from_db()
+        assert order.payment_status == PaymentStatus.PENDING.value
+
+    def test_signed_webhook_is_stored(self, api_client, order_factory, settings):
+        """A payload with a real Stripe signature is verified and stored as sent."""
+        settings.STRIPE_WEBHOOK_SECRET = 'whsec_test'
+        order, = order_factory(count=1, payment_type='Gateway')
+        payload = json.dumps({
+            'id': 'evt_signed', 'object': 'event', 'type': 'payment_intent.succeeded', 'created': 1700000000,
+            'data': {'object': {'id': 'pi_signed', 'object': 'payment_intent', 'metadata': {'order_id': str(order.id)}}},
+        })
+        timestamp = int(time.time())
+        signature = hmac.new(b'whsec_test', f'{timestamp}.{payload}'.encode(), hashlib.sha256).hexdigest()
+
+        response = api_client.post(
+            reverse('stripe-webhook'), data=payload, content_type='application/json',
+            HTTP_STRIPE_SIGNATURE=f't={timestamp},v1={signature}',
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        stored = StripeEvent.objects.get()
+        assert (stored.event_id, stored.payment_intent) == ('evt_signed', 'pi_signed')
+        assert stored.payload == json.loads(payload)
+
+    def test_payment_succeeded_appends_event(self, api_client, order_factory, monkeypatch):
+        """Processing a successful payment updates the order and inserts a payment event."""
+        order, = order_factory(count=1, payment_type='Gateway')
+        self.post_event(api_client, monkeypatch, 'payment_intent.succeeded', order.id)
+
+        assert process_pending() == {'processed': 1, 'failed': 0, 'deferred': 0}
+
+        order.refresh_from_db()
+        assert order.payment_status == PaymentStatus.SUCCESS.value
+        event = OrderEvent.objects.get(order=order)
+        assert (event.payment_status, event.source) == (PaymentStatus.SUCCESS.value, 'webhook')
+        assert StripeEvent.objects.get().status == StripeEvent.PROCESSED
+
+    def test_unknown_order_writes_no_event(self, api_client, monkeypatch):
+        """Events for unknown orders are processed without writing history."""
+        response = self.post_event(api_client, monkeypatch, 'payment_intent.payment_failed', 999999)
+        process_pending()
+
+        assert response.status_code == status.HTTP_200_OK
+        assert not OrderEvent.objects.exists()
+
+    def test_event_is_applied_once_across_workers(self, api_client, order_factory, monkeypatch):
+        """A worker holding a stale copy of an event another worker applied does not apply it again."""
+        order, = order_factory(count=1, payment_type='Gateway')
+        self.post_event(api_client, monkeypatch, 'payment_intent.succeeded', order.id)
+        stale = StripeEvent.objects.get()
+
+        assert process_pending() == {'processed': 1, 'failed': 0, 'deferred': 0}
+        assert process_event(stale) is None
+
+        assert OrderEvent.objects.filter(order=order).count() == 1
+
+    def test_events_apply_in_order_per_intent(self, api_client, order_factory, monkeypatch):
+        """A failing event holds back later events of its payment intent until replayed."""
+        order, = order_factory(count=1, payment_type='Gateway')
+        # Delivered out of order: the failure happened before the success
+        self.post_event(api_client, monkeypatch, 'payment_intent.succeeded', order.id, event_id='evt_2', created=1700000100)
+        self.post_event(api_client, monkeypatch, 'payment_intent.payment_failed', order.id, event_id='evt_1', created=1700000000)
+
+        handlers = dict(HANDLERS)
+        broken = dict(handlers, **{'payment_intent.payment_failed': lambda event: 1 / 0})
+        monkeypatch.setattr('integrations.stripe.events.HANDLERS', broken)
+        monkeypatch.setattr('integrations.stripe.events.MAX_ATTEMPTS', 1)
+        assert process_pending() == {'processed': 0, 'failed': 1, 'deferred': 1}
+        assert process_pending() == {'processed': 0, 'failed': 0, 'deferred': 0}
+        assert StripeEvent.objects.get(event_id='evt_1').status == StripeEvent.FAILED
+
+        monkeypatch.setattr('integrations.stripe.events.HANDLERS', handlers)
+        call_command('replay_stripe_events', stdout=io.StringIO())
+
+        order.refresh_from_db()
+        assert order.payment_status == PaymentStatus.SUCCESS.value
+        assert list(OrderEvent.objects.filter(order=order).values_list('payment_status', flat=True)) == [
+            PaymentStatus.FAILED.value, PaymentStatus.SUCCESS.value,
+        ]
+        assert set(StripeEvent.objects.values_list('status', flat=True)) == {StripeEvent.PROCESSED}
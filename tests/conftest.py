@@ -3,6 +3,7 @@ Pytest configuration and fixtures for the ecommerce API tests.
 """
 
 import os
+
 import django
 from django.conf import settings
 
@@ -19,10 +20,39 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from core.models import Brand, Category, Color, Size, Tax, OrderStatus
 from products.models import Product, ProductAttribute
 from customers.models import Customer
+from accounts.authentication import get_user_cache
+from accounts.revocation import RevocationStore
+from integrations.stripe.fake import FakeStripeServer
+from orders.models import Order, OrderDetail
 
 User = get_user_model()
 
 
+@pytest.fixture(scope='session')
+def django_db_modify_db_settings(django_db_modify_db_settings_parallel_suffix, tmp_path_factory):
+    """Use a file test database; threads cannot share in-memory SQLite (test_cart_concurrency)."""
+    database = settings.DATABASES['default']
+    if database['ENGINE'] == 'django.db.backends.sqlite3':
+        database.setdefault('TEST', {})['NAME'] = str(tmp_path_factory.mktemp('db') / 'test.sqlite3')
+
+
+@pytest.fixture(autouse=True)
+def user_cache():
+    """Start every test with an empty authenticated-user cache (ids are reused across tests)."""
+    cache = get_user_cache()
+    cache.clear()
+    yield cache
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def revocation_store(monkeypatch):
+    """A fresh in-process token revocation store per test."""
+    store = RevocationStore()
+    monkeypatch.setattr('accounts.revocation._store', store)
+    return store
+
+
 @pytest.fixture
 def api_client():
     """Return an API client instance."""
@@ -194,3 +224,68 @@ def product_attribute(product, size, color):
         size=size,
         color=color
     )
+
+
+@pytest.fixture
+def fake_stripe_server(settings):
+    """Run the offline fake Stripe API and point the Stripe client at it."""
+    with FakeStripeServer() as server:
+        settings.STRIPE_API_BASE = server.url
+        yield server
+
+
+@pytest.fixture
+def fake_stripe(fake_stripe_server):
+    """Payment intents created on the fake Stripe (amount, currency, metadata)."""
+    return fake_stripe_server.calls
+
+
+@pytest.fixture
+def order_factory(customer_user, order_status, product_attribute):
+    """Return a function that creates orders with ``lines`` details each."""
+    def create_orders(count=1, lines=1, user=None, **fields):
+        orders = []
+        for i in range(count):
+            values = {
+                'user': user or customer_user,
+                'name': f'Order {i}',
+                'email': (user or customer_user).email,
+                'mobile': '03000000000',
+                'address': 'Street 1',
+                'city': 'Lahore',
+                'state': 'Punjab',
+                'pincode': '54000',
+                'order_status': order_status,
+                'payment_type': 'COD',
+                'payment_status': 'Pending',
+                'total_amt': product_attribute.price * lines,
+            }
+            values.update(fields)
+            order = Order.objects.create(**values)
+            OrderDetail.objects.bulk_create([
+                OrderDetail(
+                    order=order,
+                    product=product_attribute.product,
+                    product_attr=product_attribute,
+                    price=product_attribute.price,
+                    qty=1,
+                    product_name=product_attribute.product.name,
+                    sku=product_attribute.sku,
+                    mrp=product_attribute.mrp,
+                )
+                for _ in range(lines)
+            ])
+            orders.append(order)
+        return orders
+    return create_orders
+
+
+@pytest.fixture
+def redis_cart(monkeypatch):
+    """Use the Redis cart backend against an in-memory fakeredis server."""
+    fakeredis = pytest.importorskip('fakeredis')
+    from orders import cart
+
+    backend = cart.RedisCartBackend(client=fakeredis.FakeRedis())
+    monkeypatch.setattr(cart, '_backend', backend)
+    return backend
@@ -0,0 +1,48 @@
+"""
+Concurrency tests for the cart add-item endpoint.
+
+Many threads add the same attribute to the same cart at once; the atomic
+upsert must neither create duplicate lines, lose increments nor exceed the
+available stock. The test database is a file (see conftest), since threads
+cannot share in-memory SQLite.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.db import connection
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from orders.models import Cart
+
+THREADS = 8
+REQUESTS = 40
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCartAddConcurrency:
+    """Hammer add-item from several threads."""
+
+    def add_item(self, product_attribute):
+        try:
+            response = APIClient().post(reverse('cart-add-item'), {
+                'user_id': 'guest-race',
+                'product': product_attribute.product_id,
+                'product_attr': product_attribute.id,
+                'qty': 1,
+            }, format='json')
+            return response.status_code
+        finally:
+            connection.close()
+
+    def test_concurrent_adds_respect_stock(self, product_attribute):
+        """Exactly ``stock`` increments succeed and one line holds them all."""
+        with ThreadPoolExecutor(max_workers=THREADS) as pool:
+            codes = list(pool.map(lambda _: self.add_item(product_attribute), range(REQUESTS)))
+
+        line = Cart.objects.get(user_id='guest-race')
+        assert line.qty == product_attribute.qty
+        assert codes.count(status.HTTP_201_CREATED) == product_attribute.qty
+        assert codes.count(status.HTTP_400_BAD_REQUEST) == REQUESTS - product_attribute.qty
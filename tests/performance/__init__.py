@@ -0,0 +1,3 @@
+"""
+Performance tests package (query counts and throughput benchmarks).
+"""
@@ -0,0 +1,39 @@
+"""
+Query-count regression tests for authentication.
+
+A request with a cached user must not query the database to authenticate,
+and a cold one loads the user and customer profile in a single query.
+"""
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from customers.models import Customer
+
+# User joined with customer_profile (1)
+COLD_AUTH_QUERY_BUDGET = 1
+WARM_AUTH_QUERY_BUDGET = 0
+
+
+@pytest.mark.django_db
+class TestAuthQueryCounts:
+    """Authentication cost of customer endpoints."""
+
+    def test_warm_requests_skip_auth_queries(self, authenticated_client, customer_user):
+        """The customer profile endpoint costs one query cold and none warm."""
+        Customer.objects.create(user=customer_user, name='Buyer')
+        url = reverse('customer-profile')
+        counts = {}
+
+        for run in ('cold', 'warm'):
+            with CaptureQueriesContext(connection) as queries:
+                response = authenticated_client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            counts[run] = len(queries)
+
+        print(f"Customer profile queries: {counts}")
+        assert counts['cold'] <= COLD_AUTH_QUERY_BUDGET
+        assert counts['warm'] <= WARM_AUTH_QUERY_BUDGET
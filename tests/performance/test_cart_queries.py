@@ -0,0 +1,107 @@
+"""
+Query-count regression tests for the cart summary.
+
+The cart total must load its lines once, whatever the number of lines, and
+the mini-cart summary must be a single aggregate.
+"""
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from orders.cart import get_cart_backend
+from orders.models import Cart
+from products.models import ProductAttribute
+
+
+# Lines with attribute, product, tax, size and color (1)
+CART_TOTAL_QUERY_BUDGET = 1
+# One aggregate over the cart joined to attribute prices
+CART_SUMMARY_QUERY_BUDGET = 1
+# Savepoint (2), stock (1), locked lines (1), delete (1), bulk update (1),
+# bulk insert (1), resulting lines (1)
+CART_BATCH_QUERY_BUDGET = 8
+# Registered-user check (1), savepoint (2), sum shared lines (1), delete shared
+# guest lines (1), re-key guest lines (1), drop sold-out lines (1)
+CART_MERGE_QUERY_BUDGET = 7
+
+
+def fill_cart(user_id, product_attribute, lines):
+    """Put ``lines`` distinct attributes of the fixture product in a cart."""
+    for i in range(lines):
+        attr = ProductAttribute.objects.create(
+            product=product_attribute.product, sku=f'{product_attribute.sku}-{i}',
+            mrp=product_attribute.mrp, price=product_attribute.price, qty=10,
+            size=product_attribute.size, color=product_attribute.color,
+        )
+        Cart.objects.create(user_id=user_id, user_type='Not-Reg', qty=2, product=attr.product, product_attr=attr)
+
+
+@pytest.mark.django_db
+class TestCartQueryCounts:
+    """Cap the number of queries for cart totals."""
+
+    def test_cart_total_query_count(self, api_client, product_attribute):
+        """Totals and the item list come from one query for 20 lines."""
+        fill_cart('guest-1', product_attribute, 20)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get(reverse('cart-total'), {'user_id': 'guest-1'})
+
+        print(f"Cart total with 20 lines: {len(queries)} queries")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['item_count'] == 20
+        assert response.data['total'] == product_attribute.price * 40
+        assert len(queries) <= CART_TOTAL_QUERY_BUDGET
+
+    def test_cart_summary_only_query_count(self, api_client, product_attribute):
+        """summary_only returns counts and subtotal from a single aggregate."""
+        fill_cart('guest-1', product_attribute, 20)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get(reverse('cart-total'), {'user_id': 'guest-1', 'summary_only': 1})
+
+        print(f"Cart summary with 20 lines: {len(queries)} queries")
+        assert response.data == {'total': product_attribute.price * 40, 'item_count': 20, 'quantity': 40}
+        assert len(queries) <= CART_SUMMARY_QUERY_BUDGET
+
+    def test_cart_batch_query_count(self, api_client, product_attribute):
+        """A 40-operation batch costs the same few queries as a single one."""
+        fill_cart('guest-1', product_attribute, 20)
+        lines = list(Cart.objects.filter(user_id='guest-1').order_by('id'))
+        new_attrs = [
+            ProductAttribute.objects.create(
+                product=product_attribute.product, sku=f'new-{i}', mrp=product_attribute.mrp,
+                price=product_attribute.price, qty=10, size=product_attribute.size, color=product_attribute.color,
+            )
+            for i in range(10)
+        ]
+        operations = (
+            [{'op': 'set', 'product_attr': line.product_attr_id, 'qty': 3} for line in lines[:10]]
+            + [{'op': 'remove', 'product_attr': line.product_attr_id} for line in lines[10:20]]
+            + [{'op': 'add', 'product_attr': attr.id, 'qty': 1} for attr in new_attrs] * 2
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.post(reverse('cart-batch'), {'user_id': 'guest-1', 'operations': operations}, format='json')
+
+        print(f"Cart batch with {len(operations)} operations: {len(queries)} queries")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['item_count'] == 20
+        assert len(queries) <= CART_BATCH_QUERY_BUDGET
+
+    def test_cart_merge_query_count(self, product_attribute):
+        """Merging a 20-line guest cart is a fixed number of set-based statements."""
+        fill_cart('guest-1', product_attribute, 20)
+        for line in Cart.objects.filter(user_id='guest-1')[:10]:
+            Cart.objects.create(user_id='7', user_type='Reg', qty=1, product_id=line.product_id, product_attr_id=line.product_attr_id)
+
+        with CaptureQueriesContext(connection) as queries:
+            merged = get_cart_backend().merge('guest-1', '7')
+
+        print(f"Cart merge of 20 guest lines: {len(queries)} queries")
+        assert merged == 20
+        assert sorted(Cart.objects.filter(user_id='7').values_list('qty', flat=True)) == [2] * 10 + [3] * 10
+        assert len(queries) <= CART_MERGE_QUERY_BUDGET
@@ -0,0 +1,77 @@
+"""
+Query-count regression tests for checkout.
+
+Placing an order must cost a constant number of queries regardless of how
+many lines it contains, and acknowledging a Stripe webhook must cost a single
+insert. Payment reconciliation costs a constant number of queries per chunk.
+"""
+
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from integrations.stripe.client import get_stripe_client
+from integrations.stripe.reconcile import reconcile_payments
+from orders.models import Order
+from tests.api.test_payments_api import checkout_payload, post_webhook_event
+
+# Insert-or-ignore of the event (1)
+WEBHOOK_QUERY_BUDGET = 1
+# Chunk read and end of scan (2), lock + update + event insert (3), savepoint (2)
+RECONCILE_QUERY_BUDGET = 7
+
+
+@pytest.mark.django_db
+class TestCheckoutQueryCounts:
+    """Checkout query budget does not depend on the number of lines."""
+
+    def test_checkout_queries_constant_in_lines(self, authenticated_client, product_attribute, fake_stripe):
+        """A 50-line order costs the same number of queries as a 1-line order."""
+        product_attribute.qty = 1000
+        product_attribute.save()
+        url = reverse('create-payment-intent')
+        counts = {}
+        # Warm the authenticated-user cache so both runs measure checkout alone
+        authenticated_client.get(reverse('profile'))
+
+        for lines in (1, 50):
+            with CaptureQueriesContext(connection) as queries:
+                response = authenticated_client.post(url, checkout_payload(product_attribute, lines=lines), format='json')
+            assert response.status_code == status.HTTP_200_OK
+            counts[lines] = len(queries)
+
+        print(f"Checkout queries by line count: {counts}")
+        assert counts[50] == counts[1]
+
+    def test_webhook_ack_is_one_insert(self, api_client, order_factory, monkeypatch):
+        """The webhook acknowledges with one statement, for new and duplicate events alike."""
+        order, = order_factory(count=1, payment_type='Gateway')
+
+        for attempt in ('first', 'retry'):
+            with CaptureQueriesContext(connection) as queries:
+                response = post_webhook_event(api_client, monkeypatch, 'payment_intent.succeeded', order.id)
+            print(f"Webhook {attempt} delivery: {len(queries)} queries")
+            assert response.status_code == status.HTTP_200_OK
+            assert len(queries) <= WEBHOOK_QUERY_BUDGET
+
+    def test_reconcile_queries_constant_in_orders(self, order_factory, fake_stripe_server):
+        """Settling 20 orders costs the same queries as settling one."""
+        client = get_stripe_client()
+        counts = {}
+        for count in (1, 20):
+            for order in order_factory(count=count, payment_type='Gateway'):
+                intent = client.create_payment_intent(amount=int(order.total_amt * 100))
+                fake_stripe_server.set_status(intent.id, 'succeeded')
+                Order.objects.filter(pk=order.pk).update(payment_id=intent.id)
+
+            with CaptureQueriesContext(connection) as queries:
+                stats = reconcile_payments(rate=1000, min_age=timedelta(0))
+            assert stats['updated'] == {'Success': count}
+            counts[count] = len(queries)
+
+        print(f"Reconciliation queries by order count: {counts}")
+        assert counts[20] == counts[1] <= RECONCILE_QUERY_BUDGET
@@ -0,0 +1,64 @@
+"""
+Query-count benchmarks for the KPI endpoint.
+
+Each KPI page must resolve its metrics with a fixed number of queries,
+independent of how many products, categories or orders exist.
+"""
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from core.enums import KPIPages
+from core.serializers import CategoryKpisSerializer
+
+
+# Authentication (1) + page queries. Update deliberately when a page changes.
+KPI_PAGE_QUERY_BUDGET = {
+    KPIPages.DASHBOARD.value: 6,
+    KPIPages.ORDER.value: 2,
+    KPIPages.PRODUCT.value: 2,
+}
+
+
+@pytest.mark.django_db
+class TestKPIQueryCounts:
+    """Benchmark the number of queries issued per KPI page."""
+
+    @pytest.mark.parametrize('page', [page.value for page in KPIPages])
+    def test_kpi_page_query_count(self, admin_client, product_attribute, order_status, page):
+        """Each KPI page stays within its query budget."""
+        url = reverse('kpis')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = admin_client.get(url, {'page': page})
+
+        print(f"KPI page '{page}': {len(queries)} queries")
+        assert response.status_code == status.HTTP_200_OK
+        assert len(queries) <= KPI_PAGE_QUERY_BUDGET[page]
+
+    def test_product_kpis_values(self, admin_client, product):
+        """Product KPIs reflect the catalog in a single aggregate."""
+        from products.models import Product
+
+        response = admin_client.get(reverse('kpis'), {'page': KPIPages.PRODUCT.value})
+
+        assert response.data['total_count'] == Product.objects.count()
+        assert response.data['feature_count'] == Product.objects.filter(is_featured=True).count()
+        assert response.data['promo_count'] == Product.objects.filter(is_promo=True).count()
+
+    def test_category_kpis_single_query(self, category, product):
+        """Category KPIs are computed with one query."""
+        from core.models import Category
+
+        with CaptureQueriesContext(connection) as queries:
+            data = CategoryKpisSerializer(instance={}).data
+
+        assert len(queries) == 1
+        assert data['active_categories_count'] == Category.objects.filter(status=True).count()
+        assert data['inactive_categories_count'] == Category.objects.filter(status=False).count()
+        assert data['category_with_products_count'] == (
+            Category.objects.filter(products__isnull=False).distinct().count()
+        )
@@ -0,0 +1,52 @@
+"""
+Throughput benchmark for password verification at login.
+
+Reports logins per second per core for the PBKDF2 baseline and for Argon2
+at the configured cost, inline on request threads and in the hashing
+process pool. Login throughput is bound by the hash, so the numbers show
+what a worker can sustain and how much request-thread time the pool frees.
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+
+from accounts.hashing import verify_password
+
+# Logins per run (raise LOGIN_BENCHMARK_LOGINS for steadier numbers)
+LOGINS = int(os.environ.get('LOGIN_BENCHMARK_LOGINS', 8))
+# Concurrent request threads
+THREADS = 4
+
+
+def logins_per_second(encoded):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=THREADS) as threads:
+        results = list(threads.map(lambda _: verify_password('benchmark-pass', encoded), range(LOGINS)))
+    elapsed = time.perf_counter() - started
+    assert all(valid for valid, must_update in results)
+    return LOGINS / elapsed
+
+
+class TestLoginThroughput:
+    """Logins per second per core, inline and pooled."""
+
+    def test_logins_per_second_per_core(self, settings):
+        cores = os.cpu_count() or 1
+        hashes = {
+            'pbkdf2': make_password('benchmark-pass', hasher='pbkdf2_sha256'),
+            'argon2': make_password('benchmark-pass', hasher='argon2'),
+        }
+        rates = {}
+
+        for workers in (0, cores):
+            settings.PASSWORD_HASH_WORKERS = workers
+            for name, encoded in hashes.items():
+                rate = logins_per_second(encoded)
+                mode = 'pool' if workers else 'inline'
+                rates[(name, mode)] = rate
+                print(f"{name:7} {mode:6} {rate:8.1f} logins/s  {rate / cores:8.1f} logins/s/core")
+
+        assert all(rate > 0 for rate in rates.values())
@@ -0,0 +1,97 @@
+"""
+Query-count regression tests for order listings.
+
+Order serialization follows user, status, details, product and attribute
+relations; the prefetch plan must keep the query count independent of the
+number of orders and lines on a page.
+"""
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from core.enums import KPIPages
+from core.models import OrderStatus
+
+
+# Authentication (1) + page count (1) + orders (1) + details prefetch (1)
+ORDER_LIST_QUERY_BUDGET = 4
+# Dashboard KPI budget with recent orders present (details prefetch included)
+DASHBOARD_QUERY_BUDGET = 7
+# Authentication (1) + status lookup (1) + per chunk: ids (1) + update (1) + events insert (1),
+# plus savepoint bookkeeping on databases that use it
+BULK_STATUS_QUERY_BUDGET = 8
+
+
+@pytest.mark.django_db
+class TestOrderQueryCounts:
+    """Cap the number of queries for order pages."""
+
+    def test_admin_order_list_query_count(self, admin_client, order_factory):
+        """Admin order listing does not grow with orders or lines."""
+        order_factory(count=10, lines=3)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = admin_client.get(reverse('order-list'))
+
+        print(f"Admin order list: {len(queries)} queries")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['count'] == 10
+        assert len(queries) <= ORDER_LIST_QUERY_BUDGET
+
+    def test_my_orders_query_count(self, authenticated_client, order_factory):
+        """Customer my-orders page does not grow with orders or lines."""
+        order_factory(count=10, lines=3)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = authenticated_client.get(reverse('order-my-orders'))
+
+        print(f"My orders: {len(queries)} queries")
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['results'][0]['order_details']) == 3
+        assert len(queries) <= ORDER_LIST_QUERY_BUDGET
+
+    def test_snapshot_order_list_reads_order_tables_only(self, admin_client, order_factory):
+        """Snapshot mode loads details with a single-table query."""
+        order_factory(count=10, lines=3)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = admin_client.get(reverse('order-list'), {'snapshot': 1})
+
+        print(f"Snapshot order list: {len(queries)} queries")
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['results'][0]['order_details']) == 3
+        assert len(queries) <= ORDER_LIST_QUERY_BUDGET
+        detail_queries = [q['sql'] for q in queries.captured_queries if 'orders_details' in q['sql']]
+        assert detail_queries and all('JOIN' not in sql for sql in detail_queries)
+
+    def test_dashboard_recent_orders_query_count(self, admin_client, order_factory):
+        """Dashboard recent orders are served by the same prefetch plan."""
+        order_factory(count=10, lines=3)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = admin_client.get(reverse('kpis'), {'page': KPIPages.DASHBOARD.value})
+
+        print(f"Dashboard with recent orders: {len(queries)} queries")
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['recent_orders']) == 10
+        assert len(queries) <= DASHBOARD_QUERY_BUDGET
+
+    def test_bulk_status_query_count(self, admin_client, order_factory):
+        """Bulk status updates issue a fixed number of statements per chunk."""
+        orders = order_factory(count=200, lines=1)
+        shipped = OrderStatus.objects.create(orders_status='Shipped')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = admin_client.post(
+                reverse('order-bulk-status'),
+                {'ids': [order.id for order in orders], 'order_status': shipped.id},
+                format='json',
+            )
+
+        print(f"Bulk status update of 200 orders: {len(queries)} queries")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['updated'] == 200
+        assert len(queries) <= BULK_STATUS_QUERY_BUDGET
@@ -0,0 +1,36 @@
+"""
+Query-count regression tests for bulk user provisioning.
+
+Each chunk looks up its existing emails once and inserts its users and
+customer profiles with one statement each, however many rows it holds.
+"""
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from accounts.provisioning import provision_users
+
+# Existing emails (1) + users insert (1) + customers insert (1) + savepoint and release (2)
+CHUNK_QUERY_BUDGET = 5
+CHUNK_SIZE = 50
+CHUNKS = 3
+
+
+@pytest.mark.django_db
+class TestProvisioningQueryCounts:
+    """Database cost of provisioning per chunk."""
+
+    def test_queries_are_constant_per_chunk(self, settings):
+        settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+        records = [
+            {'email': f'bulk{i}@example.com', 'password': 'pw', 'name': f'Bulk {i}'}
+            for i in range(CHUNK_SIZE * CHUNKS)
+        ]
+
+        with CaptureQueriesContext(connection) as queries:
+            stats = provision_users(records, chunk_size=CHUNK_SIZE)
+
+        assert stats['created'] == CHUNK_SIZE * CHUNKS
+        print(f"Provisioning queries for {CHUNKS} chunks of {CHUNK_SIZE}: {len(queries)}")
+        assert len(queries) <= CHUNK_QUERY_BUDGET * CHUNKS
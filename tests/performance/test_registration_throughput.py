@@ -0,0 +1,86 @@
+"""
+Throughput benchmark for customer registration.
+
+Compares the previous registration path with ``accounts.registration``. The
+old path ran two ``exists()`` checks and then two inserts outside a
+transaction. The new path runs both inserts in one transaction and relies
+on the unique constraints. The password hash is stubbed out with MD5 so the
+numbers show the database work, which is what changed.
+"""
+
+import os
+import time
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from customers.models import Customer
+from customers.serializers import CustomerRegistrationSerializer
+
+User = get_user_model()
+
+# Registrations per run (raise REGISTRATION_BENCHMARK_USERS for steadier numbers)
+REGISTRATIONS = int(os.environ.get('REGISTRATION_BENCHMARK_USERS', 200))
+# Users insert (1) + customers insert (1) + savepoint and release (2)
+REGISTRATION_QUERY_BUDGET = 4
+
+
+def register_legacy(data):
+    """The registration path before accounts.registration."""
+    if User.objects.filter(username=data['username']).exists():
+        raise ValueError("Username already exists")
+    if User.objects.filter(email=data['email']).exists():
+        raise ValueError("Email already exists")
+    user = User.objects.create_user(
+        username=data['username'], email=data['email'], password=data['password'], user_type='customer',
+    )
+    return Customer.objects.create(user=user, name=data['name'], mobile=data.get('mobile', ''))
+
+
+def register_atomic(data):
+    serializer = CustomerRegistrationSerializer(data=data)
+    serializer.is_valid(raise_exception=True)
+    return serializer.save()
+
+
+def registrations_per_second(register, prefix):
+    started = time.perf_counter()
+    for i in range(REGISTRATIONS):
+        register({
+            'username': f'{prefix}{i}', 'email': f'{prefix}{i}@example.com',
+            'password': 'bench-pass', 'confirm_password': 'bench-pass', 'name': f'Bench {i}',
+        })
+    return REGISTRATIONS / (time.perf_counter() - started)
+
+
+@pytest.mark.django_db
+class TestRegistrationThroughput:
+    """Registrations per second before and after, and queries per registration."""
+
+    @pytest.fixture(autouse=True)
+    def cheap_hashing(self, settings):
+        settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+    def test_registrations_per_second(self):
+        rates = {
+            'exists + inserts': registrations_per_second(register_legacy, 'legacy'),
+            'atomic insert': registrations_per_second(register_atomic, 'atomic'),
+        }
+
+        for name, rate in rates.items():
+            print(f"{name:17} {rate:8.1f} registrations/s")
+        assert Customer.objects.count() == 2 * REGISTRATIONS
+
+    def test_queries_per_registration(self):
+        data = {
+            'username': 'counted', 'email': 'counted@example.com',
+            'password': 'bench-pass', 'confirm_password': 'bench-pass', 'name': 'Counted',
+        }
+
+        with CaptureQueriesContext(connection) as queries:
+            register_atomic(data)
+
+        print(f"Registration queries: {len(queries)}")
+        assert len(queries) <= REGISTRATION_QUERY_BUDGET
@@ -0,0 +1,216 @@
+"""
+Unit tests for the cart storage backends.
+"""
+
+import io
+import json
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from orders.cart import CartBatchError, CartItemNotFound, CartMergeError, CartStockError, DatabaseCartBackend
+from orders.models import Cart
+from orders.sweeper import sweep_carts
+from products.models import ProductAttribute
+
+
+@pytest.mark.django_db
+class TestDatabaseCartBackend:
+    """Test the default table-backed cart."""
+
+    def test_add_and_set_qty(self, product_attribute):
+        """Adding twice sums quantities; setting zero removes the line."""
+        backend = DatabaseCartBackend()
+
+        backend.add('guest-1', product_attribute.product_id, product_attribute.id, 1)
+        line = backend.add('guest-1', product_attribute.product_id, product_attribute.id, 2)
+
+        assert line.qty == 3
+        assert [(cart.product_attr_id, cart.qty) for cart in backend.lines('guest-1')] == [(product_attribute.id, 3)]
+        assert backend.set_qty('guest-1', product_attribute.id, 0) is None
+        assert backend.lines('guest-1') == []
+
+    @pytest.mark.parametrize('method', ['_upsert', '_increment'])
+    def test_add_respects_stock(self, product_attribute, method):
+        """Both add paths refuse to grow a line past the attribute's stock."""
+        backend = DatabaseCartBackend()
+        add = getattr(backend, method)
+
+        assert add('guest-1', product_attribute.id, 6, 'Not-Reg') is not None
+        assert add('guest-1', product_attribute.id, 4, 'Not-Reg') is not None
+        assert add('guest-1', product_attribute.id, 1, 'Not-Reg') is None
+        assert list(Cart.objects.values_list('qty', flat=True)) == [product_attribute.qty]
+
+    def test_add_raises_stock_error(self, product_attribute):
+        """Out of stock and unknown attributes raise CartStockError."""
+        backend = DatabaseCartBackend()
+        with pytest.raises(CartStockError) as excinfo:
+            backend.add('guest-1', product_attribute.product_id, product_attribute.id, product_attribute.qty + 1)
+        assert excinfo.value.available == product_attribute.qty
+
+        with pytest.raises(CartStockError) as excinfo:
+            backend.add('guest-1', product_attribute.product_id, product_attribute.id + 999, 1)
+        assert excinfo.value.available is None
+
+    def test_set_qty_missing_line(self, product_attribute):
+        """Updating a line that is not in the cart raises CartItemNotFound."""
+        with pytest.raises(CartItemNotFound):
+            DatabaseCartBackend().set_qty('guest-1', product_attribute.id, 2)
+
+
+@pytest.mark.django_db
+class TestRedisCartBackend:
+    """Test the Redis cart with write-behind persistence."""
+
+    def test_writes_stay_in_redis_until_flushed(self, redis_cart, product_attribute):
+        """Lines are held in Redis and written to the cart table by flush()."""
+        redis_cart.add('guest-1', product_attribute.product_id, product_attribute.id, 2)
+        redis_cart.add('guest-1', product_attribute.product_id, product_attribute.id, 1)
+
+        assert not Cart.objects.exists()
+        assert [line.qty for line in redis_cart.lines('guest-1')] == [3]
+
+        assert redis_cart.flush() == 1
+        row = Cart.objects.get(user_id='guest-1')
+        assert (row.product_attr_id, row.qty, row.user_type) == (product_attribute.id, 3, 'Not-Reg')
+        assert redis_cart.flush() == 0
+
+    def test_flush_replaces_rows_and_persists_clear(self, redis_cart, product_attribute):
+        """Updates and clears are reflected in the table on the next flush."""
+        redis_cart.add('guest-1', product_attribute.product_id, product_attribute.id, 2)
+        redis_cart.flush()
+
+        redis_cart.set_qty('guest-1', product_attribute.id, 5)
+        redis_cart.flush()
+        assert Cart.objects.get(user_id='guest-1').qty == 5
+
+        redis_cart.clear('guest-1')
+        redis_cart.flush()
+        assert not Cart.objects.filter(user_id='guest-1').exists()
+
+    def test_cart_api_uses_backend(self, api_client, redis_cart, product_attribute):
+        """The cart endpoints read and write through the configured backend."""
+        data = {'user_id': 'guest-1', 'product': product_attribute.product_id, 'product_attr': product_attribute.id, 'qty': 2}
+
+        response = api_client.post(reverse('cart-add-item'), data, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['qty'] == 2
+
+        response = api_client.get(reverse('cart-total'), {'user_id': 'guest-1'})
+        assert response.data['total'] == product_attribute.price * 2
+        assert response.data['items'][0]['product_attr']['id'] == product_attribute.id
+
+        url = reverse('cart-remove-item', kwargs={'pk': product_attribute.id})
+        response = api_client.delete(f'{url}?user_id=guest-1')
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert redis_cart.lines('guest-1') == []
+        assert not Cart.objects.exists()
+
+    def test_summary(self, redis_cart, product_attribute):
+        """The Redis summary matches the database aggregate."""
+        redis_cart.add('guest-1', product_attribute.product_id, product_attribute.id, 3)
+
+        assert redis_cart.summary('guest-1') == {
+            'item_count': 1, 'quantity': 3, 'subtotal': product_attribute.price * 3,
+        }
+        redis_cart.flush()
+        assert DatabaseCartBackend().summary('guest-1') == redis_cart.summary('guest-1')
+
+    def test_apply_batch(self, redis_cart, product_attribute):
+        """A batch is written to the hash in one go, or not at all."""
+        redis_cart.add('guest-1', product_attribute.product_id, product_attribute.id, 2)
+
+        lines = redis_cart.apply('guest-1', [
+            {'op': 'add', 'product_attr': product_attribute.id, 'qty': 3},
+            {'op': 'set', 'product_attr': product_attribute.id, 'qty': 4},
+        ])
+        assert [line.qty for line in lines] == [4]
+
+        with pytest.raises(CartBatchError):
+            redis_cart.apply('guest-1', [
+                {'op': 'remove', 'product_attr': product_attribute.id},
+                {'op': 'set', 'product_attr': product_attribute.id, 'qty': product_attribute.qty + 1},
+            ])
+        assert [line.qty for line in redis_cart.lines('guest-1')] == [4]
+
+    def test_merge(self, redis_cart, product_attribute):
+        """The guest hash is folded into the user's hash, clamped to stock, and removed."""
+        redis_cart.add('7', product_attribute.product_id, product_attribute.id, 6, user_type='Reg')
+        redis_cart.add('guest-1', product_attribute.product_id, product_attribute.id, 7)
+
+        assert redis_cart.merge('guest-1', '7') == 1
+
+        assert redis_cart.lines('guest-1') == []
+        assert [(line.qty, line.user_type) for line in redis_cart.lines('7')] == [(product_attribute.qty, 'Reg')]
+        redis_cart.flush()
+        assert list(Cart.objects.values_list('user_id', 'qty')) == [('7', product_attribute.qty)]
+
+
+    def test_merge_rejects_registered_carts(self, redis_cart, product_attribute, user):
+        """A registered user's cart, by id or by user type, is never merged away."""
+        redis_cart.add(str(user.id), product_attribute.product_id, product_attribute.id, 2, user_type='Reg')
+        redis_cart.add('someone', product_attribute.product_id, product_attribute.id, 1, user_type='Reg')
+
+        with pytest.raises(CartMergeError):
+            redis_cart.merge(str(user.id), '7')
+        assert redis_cart.merge('someone', '7') == 0
+
+        assert [line.qty for line in redis_cart.lines(str(user.id))] == [2]
+        assert [line.qty for line in redis_cart.lines('someone')] == [1]
+        assert redis_cart.lines('7') == []
+
+
+@pytest.mark.django_db
+class TestCartSweeper:
+    """Test the stale cart sweeper."""
+
+    def add_line(self, user_id, user_type, attr, days_old):
+        line = Cart.objects.create(user_id=user_id, user_type=user_type, qty=1, product=attr.product, product_attr=attr)
+        Cart.objects.filter(pk=line.pk).update(added_on=timezone.now() - timedelta(days=days_old))
+
+    @pytest.fixture
+    def carts(self, product_attribute):
+        other = ProductAttribute.objects.create(
+            product=product_attribute.product, sku='SKU-2', mrp=product_attribute.mrp, price=product_attribute.price,
+            qty=10, size=product_attribute.size, color=product_attribute.color,
+        )
+        self.add_line('old-guest', 'Not-Reg', product_attribute, 40)
+        self.add_line('old-guest', 'Not-Reg', other, 35)
+        # One recent line keeps the whole cart
+        self.add_line('active-guest', 'Not-Reg', product_attribute, 40)
+        self.add_line('active-guest', 'Not-Reg', other, 1)
+        self.add_line('7', 'Reg', product_attribute, 40)
+        self.add_line('8', 'Reg', product_attribute, 200)
+
+    def test_sweep_removes_stale_carts_per_type(self, carts):
+        """Only carts whose newest line is past their type's retention are removed."""
+        stats = sweep_carts(retention={'Not-Reg': 30, 'Reg': 180}, chunk_size=2)
+
+        assert stats['removed'] == {'Not-Reg': 2, 'Reg': 1}
+        assert stats['rows_removed'] == 3
+        assert stats['chunks'] == 3
+        assert sorted(set(Cart.objects.values_list('user_id', flat=True))) == ['7', 'active-guest']
+
+    def test_zero_retention_keeps_carts(self, carts):
+        """A retention of 0 days disables sweeping for that type."""
+        stats = sweep_carts(retention={'Not-Reg': 0, 'Reg': 0})
+        assert stats['rows_removed'] == 0
+        assert Cart.objects.count() == 6
+
+    def test_command_dry_run_and_archive(self, carts, tmp_path):
+        """--dry-run only counts; --archive writes the removed lines first."""
+        out = io.StringIO()
+        call_command('sweep_carts', '--guest-days', '30', '--registered-days', '0', '--dry-run', stdout=out)
+        assert 'Would remove 2 guest and 0 registered' in out.getvalue()
+        assert Cart.objects.count() == 6
+
+        archive = tmp_path / 'carts.jsonl'
+        call_command('sweep_carts', '--guest-days', '30', '--registered-days', '0', '--archive', str(archive), stdout=io.StringIO())
+        archived = [json.loads(line) for line in archive.read_text().splitlines()]
+        assert {line['user_id'] for line in archived} == {'old-guest'}
+        assert len(archived) == 2
+        assert Cart.objects.count() == 4
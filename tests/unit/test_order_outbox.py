@@ -0,0 +1,126 @@
+"""
+Unit tests for the order outbox and its dispatcher.
+"""
+
+import io
+from datetime import timedelta
+
+import pytest
+from django.core import mail
+from django.core.management import call_command
+from django.utils import timezone
+
+from orders.models import Cart, DailySalesRollup, Order, OutboxMessage
+from orders.outbox import MAX_ATTEMPTS, claim, deliver, dispatch_pending, enqueue, handler, HANDLERS
+from orders.services import place_order
+from tests.api.test_payments_api import checkout_payload
+
+
+@pytest.fixture
+def flaky_topic():
+    """A topic whose handler fails while ``state['fail']`` is true."""
+    state = {'fail': True, 'delivered': []}
+
+    @handler('test.flaky')
+    def flaky(messages):
+        state['delivered'].extend(message.pk for message in messages)
+        if state['fail']:
+            return {message.pk: 'down' for message in messages}
+
+    yield state
+    HANDLERS.pop('test.flaky')
+
+
+@pytest.mark.django_db
+class TestOrderOutbox:
+    """Test atomic enqueueing and at-least-once delivery."""
+
+    def test_order_and_messages_are_written_together(self, customer_user, product_attribute):
+        """Placing an order writes one message per side effect, none when it fails."""
+        order_data = checkout_payload(product_attribute)['order_data']
+
+        order, quote, payment_message = place_order(customer_user, order_data)
+
+        assert payment_message.topic == 'payment_intent.create'
+        assert payment_message.payload['amount'] == quote.total_in_minor_units
+        assert sorted(OutboxMessage.objects.values_list('topic', flat=True)) == [
+            'cart.clear', 'email.order_placed', 'payment_intent.create', 'sales_rollup.refresh',
+        ]
+
+        order_data['cart_items'][0]['product_attr_id'] = 999999
+        with pytest.raises(Exception):
+            place_order(customer_user, order_data)
+        assert OutboxMessage.objects.count() == 4
+        assert Order.objects.count() == 1
+
+    def test_dispatch_delivers_side_effects(self, customer_user, product_attribute, fake_stripe):
+        """One dispatch creates the intent, clears the bought lines, rolls up sales and emails the buyer."""
+        Cart.objects.create(
+            user_id=str(customer_user.id), user_type='Reg', qty=1,
+            product=product_attribute.product, product_attr=product_attribute,
+        )
+        order, quote, payment_message = place_order(customer_user, checkout_payload(product_attribute)['order_data'])
+
+        assert dispatch_pending() == {'sent': 4, 'failed': 0}
+
+        order.refresh_from_db()
+        assert order.payment_id and len(fake_stripe) == 1
+        assert not Cart.objects.filter(user_id=str(customer_user.id)).exists()
+        rollup = DailySalesRollup.objects.get(date=timezone.localdate(order.added_on))
+        assert (rollup.orders, rollup.items, rollup.revenue) == (1, 1, order.total_amt)
+        assert [message.to for message in mail.outbox] == [[order.email]]
+        assert not OutboxMessage.objects.exclude(status=OutboxMessage.SENT).exists()
+
+    def test_redelivered_payment_message_creates_one_intent(self, customer_user, product_attribute, fake_stripe_server):
+        """A message delivered twice reuses its idempotency key and the stored payment id."""
+        order, quote, payment_message = place_order(customer_user, checkout_payload(product_attribute)['order_data'])
+
+        deliver(claim(10))
+        # Simulate a dispatcher that crashed before recording the outcome
+        OutboxMessage.objects.filter(pk=payment_message.pk).update(status=OutboxMessage.PENDING)
+        OutboxMessage.objects.update(available_at=timezone.now())
+        deliver(claim(10))
+
+        assert len(fake_stripe_server.intents) == 1
+        assert Order.objects.get(pk=order.pk).payment_id in fake_stripe_server.intents
+
+    def test_lease_expiry_redelivers(self, flaky_topic):
+        """A claimed message that is never marked sent is delivered again after its lease."""
+        message = enqueue('test.flaky', {})
+        claim(10)
+
+        assert claim(10) == []
+        flaky_topic['fail'] = False
+        assert [m.pk for m in claim(10, now=timezone.now() + timedelta(minutes=6))] == [message.pk]
+
+    def test_failures_back_off_then_die(self, flaky_topic):
+        """Failed messages are retried later and dead after MAX_ATTEMPTS."""
+        message = enqueue('test.flaky', {})
+
+        assert dispatch_pending() == {'sent': 0, 'failed': 1}
+        message.refresh_from_db()
+        assert message.status == OutboxMessage.PENDING and message.available_at > timezone.now()
+        assert message.last_error == 'down'
+
+        OutboxMessage.objects.filter(pk=message.pk).update(attempts=MAX_ATTEMPTS - 1, available_at=timezone.now())
+        dispatch_pending()
+        message.refresh_from_db()
+        assert message.status == OutboxMessage.DEAD
+
+    def test_unknown_topic_is_retried(self):
+        """A message without a handler is kept for a later deploy."""
+        enqueue('test.unknown', {})
+
+        assert dispatch_pending()['failed'] == 1
+
+    def test_command_drains_outbox(self, flaky_topic):
+        """dispatch_outbox delivers every due message in batches."""
+        flaky_topic['fail'] = False
+        for _ in range(5):
+            enqueue('test.flaky', {})
+        out = io.StringIO()
+
+        call_command('dispatch_outbox', '--batch-size', '2', stdout=out)
+
+        assert 'Sent 5 messages, 0 failed' in out.getvalue()
+        assert len(flaky_topic['delivered']) == 5
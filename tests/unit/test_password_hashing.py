@@ -0,0 +1,109 @@
+"""
+Unit tests for pooled password hashing and hash upgrades at login.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth.hashers import identify_hasher, make_password
+
+from accounts.hashing import HashingPool, get_hashing_pool, hash_password, verify_password
+
+User = get_user_model()
+
+
+@pytest.fixture
+def cheap_argon2(settings):
+    """Low Argon2 cost so the tests stay fast."""
+    settings.PASSWORD_ARGON2_TIME_COST = 1
+    settings.PASSWORD_ARGON2_MEMORY_COST = 8192
+    settings.PASSWORD_ARGON2_PARALLELISM = 1
+    return settings
+
+
+class TestHashingPool:
+    """Test hashing in worker processes."""
+
+    def test_pool_hashes_and_verifies(self, cheap_argon2):
+        cheap_argon2.PASSWORD_HASH_WORKERS = 2
+        assert get_hashing_pool() is not None
+
+        encoded = hash_password('s3cret-pass')
+
+        assert encoded.startswith('argon2$')
+        assert verify_password('s3cret-pass', encoded) == (True, False)
+        assert verify_password('wrong', encoded) == (False, False)
+
+    def test_inline_without_workers(self, cheap_argon2):
+        cheap_argon2.PASSWORD_HASH_WORKERS = 0
+
+        assert get_hashing_pool() is None
+        assert verify_password('pw', hash_password('pw'))[0]
+
+    def test_map_holds_one_slot_per_pending_item(self):
+        """A batch never has more items queued than the pool has slots."""
+        pool = HashingPool(1, queue=1)
+        pool._executor.shutdown()
+        pool._executor = ThreadPoolExecutor(max_workers=1)
+        pending, peak, lock = [0], [0], threading.Lock()
+
+        def submit(func, item):
+            with lock:
+                pending[0] += 1
+                peak[0] = max(peak[0], pending[0])
+            future = executor_submit(func, item)
+            future.add_done_callback(lambda done: finish())
+            return future
+
+        def finish():
+            with lock:
+                pending[0] -= 1
+
+        executor_submit = pool._executor.submit
+        pool._executor.submit = submit
+        try:
+            assert pool.map(lambda item: time.sleep(0.005) or item * 2, range(10)) == [item * 2 for item in range(10)]
+        finally:
+            pool.shutdown()
+
+        assert peak[0] <= 2
+
+    def test_unusable_passwords(self):
+        assert verify_password('x', make_password(None)) == (False, False)
+
+
+@pytest.mark.django_db
+class TestHashUpgrade:
+    """Test transparent re-hashing on login."""
+
+    def test_pbkdf2_hash_is_upgraded_to_argon2(self, cheap_argon2):
+        user = User.objects.create_user(email='old@example.com', password='unused')
+        User.objects.filter(pk=user.pk).update(password=make_password('legacy-pass', hasher='pbkdf2_sha256'))
+
+        assert authenticate(username='old@example.com', password='legacy-pass') is not None
+
+        user.refresh_from_db()
+        assert identify_hasher(user.password).algorithm == 'argon2'
+        assert user.check_password('legacy-pass')
+
+    def test_cost_change_rehashes_at_next_login(self, cheap_argon2):
+        user = User.objects.create_user(email='cost@example.com', password='the-pass')
+        old_hash = user.password
+        cheap_argon2.PASSWORD_ARGON2_TIME_COST = 2
+
+        assert authenticate(username='cost@example.com', password='the-pass') is not None
+
+        user.refresh_from_db()
+        assert user.password != old_hash and ',t=2,' in user.password
+
+    def test_failed_login_keeps_hash(self, cheap_argon2):
+        user = User.objects.create_user(email='keep@example.com', password='right-pass')
+        User.objects.filter(pk=user.pk).update(password=make_password('right-pass', hasher='pbkdf2_sha256'))
+
+        assert authenticate(username='keep@example.com', password='wrong-pass') is None
+
+        user.refresh_from_db()
+        assert user.password.startswith('pbkdf2_sha256$')
@@ -0,0 +1,112 @@
+"""
+Unit tests for constraint-driven atomic registration.
+"""
+
+from unittest import mock
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError
+from rest_framework import serializers
+
+from accounts.registration import register_user, unique_violation
+from accounts.serializers import UserRegistrationSerializer
+from customers.models import Customer
+from customers.serializers import CustomerRegistrationSerializer
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def cheap_hashing(settings):
+    settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+def customer_data(**overrides):
+    data = {
+        'username': 'shopper',
+        'email': 'shopper@example.com',
+        'password': 'shop-pass',
+        'confirm_password': 'shop-pass',
+        'name': 'Shopper',
+    }
+    data.update(overrides)
+    return data
+
+
+@pytest.mark.django_db
+class TestRegisterUser:
+    """Test the single-transaction insert."""
+
+    def test_creates_user_and_customer(self):
+        user = register_user('pw-123456', email='New@EXAMPLE.com', username='new', customer={'name': 'New'})
+
+        assert user.email == 'New@example.com'
+        assert user.check_password('pw-123456')
+        assert Customer.objects.get(user=user).name == 'New'
+
+    @pytest.mark.parametrize('field, value', [('email', 'taken@example.com'), ('username', 'taken')])
+    def test_duplicate_is_a_field_error(self, field, value):
+        register_user('pw', email='taken@example.com', username='taken')
+        fields = {'email': 'other@example.com', 'username': 'other', field: value}
+
+        with pytest.raises(serializers.ValidationError) as error:
+            register_user('pw', **fields)
+
+        assert field in error.value.detail
+        assert User.objects.count() == 1
+
+    def test_blank_usernames_may_repeat(self):
+        register_user('pw', email='a@example.com', username='')
+        register_user('pw', email='b@example.com', username='')
+        register_user('pw', email='c@example.com')
+
+        assert User.objects.count() == 3
+
+    def test_failed_profile_insert_rolls_back_user(self):
+        with mock.patch.object(Customer.objects, 'create', side_effect=IntegrityError('boom')):
+            with pytest.raises(IntegrityError):
+                register_user('pw', email='half@example.com', customer={'name': 'Half'})
+
+        assert not User.objects.filter(email='half@example.com').exists()
+
+    def test_unique_violation_names(self):
+        assert unique_violation(IntegrityError('UNIQUE constraint failed: accounts_user.email')) == 'email'
+        assert unique_violation(IntegrityError(
+            'duplicate key value violates unique constraint "accounts_user_username_uniq"'
+        )) == 'username'
+        assert unique_violation(IntegrityError('NOT NULL constraint failed: accounts_user.password')) is None
+
+
+@pytest.mark.django_db
+class TestRegistrationSerializers:
+    """Test registration serializers against taken emails and usernames."""
+
+    def test_customer_registration(self):
+        serializer = CustomerRegistrationSerializer(data=customer_data())
+        assert serializer.is_valid(), serializer.errors
+
+        customer = serializer.save()
+
+        assert customer.user.username == 'shopper'
+        assert customer.user.user_type == 'customer'
+
+    def test_customer_registration_taken_email(self, customer_user):
+        serializer = CustomerRegistrationSerializer(data=customer_data(email=customer_user.email))
+        assert serializer.is_valid()
+
+        with pytest.raises(serializers.ValidationError) as error:
+            serializer.save()
+
+        assert error.value.detail == {'email': ['Email already exists']}
+
+    def test_user_registration_taken_email(self, customer_user):
+        serializer = UserRegistrationSerializer(data={
+            'email': customer_user.email, 'password': 'newpass123', 'confirm_password': 'newpass123',
+        })
+        assert serializer.is_valid(), serializer.errors
+
+        with pytest.raises(serializers.ValidationError) as error:
+            serializer.save()
+
+        assert 'email' in error.value.detail
@@ -0,0 +1,202 @@
+"""
+Unit tests for the Stripe HTTP client, run against the offline fake Stripe.
+"""
+
+import io
+import socket
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+
+from integrations.stripe.client import LatencyHistogram, StripeClient, StripeError, get_stripe_client, latency
+from integrations.stripe.reconcile import RateLimiter, reconcile_payments
+from orders.models import Order, OrderEvent
+
+
+def make_client(server, **kwargs):
+    kwargs.setdefault('max_retries', 2)
+    return StripeClient(api_key='sk_test_x', api_base=server.url, backoff_base=0.001, backoff_cap=0.01, **kwargs)
+
+
+class TestStripeClient:
+    """Test retries, idempotency and timeouts of the Stripe client."""
+
+    def test_create_and_retrieve(self, fake_stripe_server):
+        """Params are form-encoded and responses come back as attribute objects."""
+        client = make_client(fake_stripe_server)
+
+        intent = client.create_payment_intent(amount=94400, currency='pkr', metadata={'order_id': 7})
+        fetched = client.retrieve_payment_intent(intent.id)
+
+        assert (intent.amount, intent.currency, intent.metadata.order_id) == (94400, 'pkr', '7')
+        assert fetched.client_secret == intent.client_secret
+
+    def test_transient_errors_retry_with_same_idempotency_key(self, fake_stripe_server):
+        """5xx responses are retried with the original key, so one intent is created."""
+        fake_stripe_server.fail_next(2, status=503)
+        client = make_client(fake_stripe_server)
+
+        client.create_payment_intent(amount=100, metadata={'order_id': 1})
+
+        keys = [key for method, path, key in fake_stripe_server.requests]
+        assert len(keys) == 3
+        assert len(set(keys)) == 1 and keys[0]
+        assert len(fake_stripe_server.intents) == 1
+
+    @pytest.mark.parametrize('status, should_retry', [(402, None), (500, False)])
+    def test_permanent_errors_are_not_retried(self, fake_stripe_server, status, should_retry):
+        """Client errors, and errors Stripe marks as not retryable, fail at once."""
+        fake_stripe_server.fail_next(status=status, should_retry=should_retry)
+        client = make_client(fake_stripe_server)
+
+        with pytest.raises(StripeError) as excinfo:
+            client.create_payment_intent(amount=100)
+
+        assert excinfo.value.status == status
+        assert len(fake_stripe_server.requests) == 1
+
+    def test_retries_give_up(self, fake_stripe_server):
+        """After max_retries the last error is raised."""
+        fake_stripe_server.fail_next(5, status=429)
+        client = make_client(fake_stripe_server, max_retries=1)
+
+        with pytest.raises(StripeError) as excinfo:
+            client.retrieve_payment_intent('pi_missing')
+
+        assert excinfo.value.retryable
+        assert len(fake_stripe_server.requests) == 2
+
+    def test_connection_errors_are_retryable(self):
+        """A refused connection is retried and then raised as a StripeError."""
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        client = StripeClient(
+            api_key='sk_test_x', api_base=f'http://127.0.0.1:{port}', max_retries=1,
+            backoff_base=0.001, connect_timeout=0.5, read_timeout=0.5,
+        )
+
+        with pytest.raises(StripeError) as excinfo:
+            client.retrieve_payment_intent('pi_1')
+        assert excinfo.value.retryable and excinfo.value.status is None
+
+    def test_latency_is_recorded(self, fake_stripe_server):
+        """Each attempt is observed per operation and outcome."""
+        latency.reset()
+        fake_stripe_server.fail_next(status=503)
+        make_client(fake_stripe_server).create_payment_intent(amount=100)
+
+        snapshot = latency.snapshot()
+        assert snapshot[('payment_intent.create', 'ok')]['count'] == 1
+        assert snapshot[('payment_intent.create', 'error')]['count'] == 1
+
+    def test_shared_client(self, fake_stripe_server):
+        """One client (and HTTP session) per process, rebuilt when settings change."""
+        client = get_stripe_client()
+        assert get_stripe_client() is client
+        assert client.api_base == fake_stripe_server.url
+
+
+class TestLatencyHistogram:
+    """Test histogram bucketing."""
+
+    def test_buckets(self):
+        histogram = LatencyHistogram()
+        for seconds in (0.004, 0.005, 0.02, 20):
+            histogram.observe('op', 'ok', seconds)
+
+        series = histogram.snapshot()[('op', 'ok')]
+        assert series['count'] == 4
+        assert series['buckets'][5] == 2
+        assert series['buckets'][25] == 1
+        assert series['buckets']['+Inf'] == 1
+
+
+@pytest.mark.django_db
+class TestPaymentReconciliation:
+    """Test settling pending gateway orders from the fake Stripe."""
+
+    @pytest.fixture
+    def gateway_orders(self, order_factory, fake_stripe_server):
+        """Pending Gateway orders, each with a matching intent on the fake Stripe."""
+        def create(count):
+            client = make_client(fake_stripe_server)
+            orders = order_factory(count=count, payment_type='Gateway')
+            for order in orders:
+                intent = client.create_payment_intent(amount=int(order.total_amt * 100))
+                Order.objects.filter(pk=order.pk).update(payment_id=intent.id)
+                order.payment_id = intent.id
+            return orders
+        return create
+
+    def test_settled_intents_update_orders(self, gateway_orders, fake_stripe_server):
+        """Succeeded and failed intents settle their orders; in-progress ones stay pending."""
+        paid, declined, waiting = gateway_orders(3)
+        fake_stripe_server.set_status(paid.payment_id, 'succeeded')
+        fake_stripe_server.set_status(declined.payment_id, 'requires_payment_method', {'code': 'card_declined'})
+
+        stats = reconcile_payments(chunk_size=2, workers=2, min_age=timedelta(0))
+
+        assert stats['checked'] == 3
+        assert stats['updated'] == {'Success': 1, 'Failed': 1}
+        statuses = dict(Order.objects.values_list('pk', 'payment_status'))
+        assert (statuses[paid.pk], statuses[declined.pk], statuses[waiting.pk]) == ('Success', 'Failed', 'Pending')
+        assert OrderEvent.objects.filter(source='reconcile').count() == 2
+
+    def test_mismatches_are_reported_not_applied(self, gateway_orders, fake_stripe_server):
+        """A wrong amount or an unknown intent is reported and the order is left alone."""
+        wrong_amount, missing = gateway_orders(2)
+        fake_stripe_server.intents[wrong_amount.payment_id]['amount'] = 1
+        fake_stripe_server.set_status(wrong_amount.payment_id, 'succeeded')
+        Order.objects.filter(pk=missing.pk).update(payment_id='pi_unknown')
+
+        stats = reconcile_payments(min_age=timedelta(0))
+
+        assert {(m['order_id'], m['reason']) for m in stats['mismatches']} == {
+            (wrong_amount.pk, 'amount'), (missing.pk, 'missing'),
+        }
+        assert set(Order.objects.values_list('payment_status', flat=True)) == {'Pending'}
+
+    def test_rate_limited_requests_slow_down_and_retry(self, gateway_orders, fake_stripe_server, settings):
+        """A 429 that outlasts the client's retries halves the rate and the order is fetched again."""
+        settings.STRIPE_MAX_RETRIES = 0
+        order, = gateway_orders(1)
+        fake_stripe_server.set_status(order.payment_id, 'succeeded')
+        fake_stripe_server.fail_next(status=429)
+
+        stats = reconcile_payments(rate=1000, min_age=timedelta(0))
+
+        assert stats['updated'] == {'Success': 1} and stats['errors'] == 0
+
+    def test_recent_orders_are_left_to_the_webhook(self, gateway_orders, fake_stripe_server):
+        """Orders younger than min_age are not checked."""
+        gateway_orders(1)
+        fake_stripe_server.requests.clear()
+
+        assert reconcile_payments()['checked'] == 0
+        assert fake_stripe_server.requests == []
+
+    def test_command_dry_run(self, gateway_orders, fake_stripe_server, tmp_path):
+        """--dry-run reports without updating; --report writes mismatches as JSON lines."""
+        paid, missing = gateway_orders(2)
+        fake_stripe_server.set_status(paid.payment_id, 'succeeded')
+        Order.objects.filter(pk=missing.pk).update(payment_id='pi_unknown')
+        out = io.StringIO()
+        report = tmp_path / 'mismatches.jsonl'
+
+        call_command('reconcile_payments', '--dry-run', '--min-age', '0', '--report', str(report), stdout=out)
+
+        assert 'Would update 1 Success of 2 orders checked' in out.getvalue()
+        assert '"reason": "missing"' in report.read_text()
+        assert Order.objects.get(pk=paid.pk).payment_status == 'Pending'
+
+
+class TestRateLimiter:
+    """Test request pacing."""
+
+    def test_slow_down_halves_rate(self):
+        limiter = RateLimiter(rate=8, minimum=1)
+        for _ in range(4):
+            limiter.slow_down()
+        assert limiter.rate == 1
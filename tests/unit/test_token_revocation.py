@@ -0,0 +1,109 @@
+"""
+Unit tests for the refresh-token revocation store.
+"""
+
+import time
+
+import pytest
+
+from accounts.revocation import BloomFilter, RevocationStore, revoke_all_sessions
+from accounts.tokens import AccountRefreshToken
+
+
+class TestBloomFilter:
+    """Test membership answers of the Bloom filter."""
+
+    def test_no_false_negatives_and_few_false_positives(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f'jti-{i}')
+
+        assert all(f'jti-{i}' in bloom for i in range(1000))
+        false_positives = sum(f'other-{i}' in bloom for i in range(10000))
+        assert false_positives < 300
+
+
+class TestRevocationStore:
+    """Test revocation in process and through Redis."""
+
+    @pytest.fixture
+    def redis_server(self):
+        fakeredis = pytest.importorskip('fakeredis')
+        return fakeredis.FakeServer()
+
+    def redis_store(self, server, **kwargs):
+        import fakeredis
+
+        return RevocationStore(redis_client=fakeredis.FakeRedis(server=server), **kwargs)
+
+    def test_local_revoke_once(self):
+        """A JTI can be revoked once; expired tokens need no entry."""
+        store = RevocationStore()
+        exp = time.time() + 60
+
+        assert store.revoke('a', exp) is True
+        assert store.revoke('a', exp) is False
+        assert store.is_revoked('a') and not store.is_revoked('b')
+        assert store.revoke('old', time.time() - 1) is True
+        assert not store.is_revoked('old')
+
+    def test_redis_ttl_matches_token_lifetime(self, redis_server):
+        store = self.redis_store(redis_server)
+
+        store.revoke('a', time.time() + 120)
+
+        assert 110 <= store.redis.ttl(store.key('a')) <= 120
+
+    def test_revocations_reach_other_processes(self, redis_server):
+        """Another worker's Bloom filter learns revoked JTIs and user versions on sync."""
+        first = self.redis_store(redis_server)
+        second = self.redis_store(redis_server, sync_interval=60)
+        assert not second.is_revoked('a')
+
+        first.revoke('a', time.time() + 60)
+        first.revoke_user(7, 2)
+
+        # Within the sync interval the second worker still uses its filter
+        assert not second.is_revoked('a')
+        second.sync(force=True)
+        assert second.is_revoked('a')
+        assert second.token_version(7) == 2
+
+    def test_negative_checks_skip_redis(self, redis_server):
+        """Tokens missing from the Bloom filter are answered without a Redis lookup."""
+        store = self.redis_store(redis_server, sync_interval=60)
+        store.sync()
+        calls = []
+        store.redis.exists = lambda *keys: calls.append(keys) or 0
+
+        assert not store.is_revoked('never-revoked')
+        assert calls == []
+
+    def test_rebuild_past_capacity_keeps_revocations(self, redis_server):
+        """Rebuilding an overfull filter never forgets a JTI that is still revoked in Redis."""
+        first = self.redis_store(redis_server, capacity=4)
+        second = self.redis_store(redis_server, capacity=4)
+        jtis = [f'jti-{i}' for i in range(20)]
+        for jti in jtis:
+            first.revoke(jti, time.time() + 60)
+
+        second.sync(force=True)
+        second.sync(force=True)
+
+        assert second.redis.xlen(second.stream) == len(jtis)
+        assert second.bloom.capacity >= len(jtis)
+        assert all(second.is_revoked(jti) for jti in jtis)
+
+
+@pytest.mark.django_db
+class TestRefreshTokenRevocation:
+    """Test the refresh-token checks against the store and the user row."""
+
+    def test_logout_all_outlives_the_store(self, customer_user, monkeypatch):
+        """Tokens issued before "log out everywhere" stay revoked when the store forgot the bump."""
+        refresh = AccountRefreshToken.for_user(customer_user)
+        revoke_all_sessions(customer_user)
+        monkeypatch.setattr('accounts.revocation._store', RevocationStore())
+
+        assert refresh.is_revoked()
+        assert not AccountRefreshToken.for_user(customer_user).is_revoked()
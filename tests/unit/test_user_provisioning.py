@@ -0,0 +1,143 @@
+"""
+Unit tests for bulk user provisioning.
+"""
+
+import io
+import json
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from accounts.provisioning import ProvisioningError, provision_users, read_records
+from customers.models import Customer
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def cheap_hashing(settings):
+    """Fast hashes; the hashing itself is covered by test_password_hashing."""
+    settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+class TestReadRecords:
+    """Test parsing of the input formats."""
+
+    def test_csv(self):
+        stream = io.StringIO("email,password,name\na@example.com,pw,Alice\n")
+
+        assert list(read_records(stream, name='users.csv')) == [
+            {'email': 'a@example.com', 'password': 'pw', 'name': 'Alice'},
+        ]
+
+    def test_jsonl_skips_blank_lines(self):
+        stream = io.StringIO('{"email": "a@example.com"}\n\n{"email": "b@example.com"}\n')
+
+        assert [record['email'] for record in read_records(stream, 'jsonl')] == ['a@example.com', 'b@example.com']
+
+    def test_bad_jsonl_line(self):
+        with pytest.raises(ProvisioningError, match='Line 2'):
+            list(read_records(io.StringIO('{"email": "a@example.com"}\nnot json\n'), 'jsonl'))
+
+
+@pytest.mark.django_db
+class TestProvisionUsers:
+    """Test chunked creation of users and customer profiles."""
+
+    def test_creates_users_and_customer_profiles(self):
+        stats = provision_users([
+            {'email': 'buyer@example.com', 'password': 'buyer-pass', 'name': 'Buyer', 'city': 'Pune'},
+            {'email': 'staff@example.com', 'password': 'staff-pass', 'user_type': 'admin'},
+        ])
+
+        assert (stats['created'], stats['skipped'], stats['invalid']) == (2, 0, 0)
+        buyer = User.objects.get(email='buyer@example.com')
+        assert buyer.check_password('buyer-pass')
+        assert buyer.customer_profile.name == 'Buyer'
+        assert buyer.customer_profile.city == 'Pune'
+        assert not Customer.objects.filter(user__email='staff@example.com').exists()
+
+    def test_skips_existing_and_repeated_emails(self, customer_user):
+        stats = provision_users([
+            {'email': customer_user.email},
+            {'email': 'new@example.com'},
+            {'email': 'new@example.com'},
+        ], chunk_size=2)
+
+        assert (stats['created'], stats['skipped']) == (1, 2)
+        assert User.objects.filter(email='new@example.com').count() == 1
+
+    def test_skips_existing_and_repeated_usernames(self, customer_user):
+        stats = provision_users([
+            {'email': 'taken-name@example.com', 'username': customer_user.username},
+            {'email': 'first@example.com', 'username': 'dup'},
+            {'email': 'second@example.com', 'username': 'dup'},
+        ])
+
+        assert (stats['created'], stats['skipped']) == (1, 2)
+        assert not User.objects.filter(email__in=['taken-name@example.com', 'second@example.com']).exists()
+
+    def test_reimport_next_to_user_without_username(self):
+        User.objects.create_user(email='old@example.com', password='pw')
+
+        stats = provision_users([{'email': 'old@example.com'}, {'email': 'new@example.com'}])
+
+        assert (stats['created'], stats['skipped']) == (1, 1)
+        assert User.objects.filter(email='new@example.com').exists()
+
+    def test_conflict_after_lookup_is_retried_once_then_reported(self, customer_user, monkeypatch):
+        """A conflict the lookup cannot see ends with the row reported, not endless retries."""
+        monkeypatch.setattr('accounts.provisioning.without_conflicts', lambda records: records)
+
+        stats = provision_users([
+            {'email': 'ok@example.com', 'username': 'fresh'},
+            {'email': 'clash@example.com', 'username': customer_user.username},
+        ])
+
+        assert (stats['created'], stats['invalid']) == (1, 1)
+        assert stats['errors'] == [{'row': 2, 'email': 'clash@example.com', 'error': 'Username already exists'}]
+        assert User.objects.filter(email='ok@example.com').exists()
+
+    def test_reports_invalid_rows(self):
+        stats = provision_users([{'email': 'not-an-email'}, {'email': 'ok@example.com', 'user_type': 'root'}])
+
+        assert stats['invalid'] == 2
+        assert [error['row'] for error in stats['errors']] == [1, 2]
+        assert not User.objects.exists()
+
+    def test_missing_password_is_unusable(self):
+        provision_users([{'email': 'nopass@example.com'}])
+
+        user = User.objects.get(email='nopass@example.com')
+        assert not user.has_usable_password()
+        assert user.customer_profile.name == 'nopass'
+
+    def test_hashes_in_worker_processes(self):
+        stats = provision_users(
+            [{'email': f'pooled{i}@example.com', 'password': f'pw{i}'} for i in range(4)], workers=2,
+        )
+
+        assert stats['created'] == 4
+        assert User.objects.get(email='pooled3@example.com').check_password('pw3')
+
+    def test_dry_run_writes_nothing(self):
+        stats = provision_users([{'email': 'dry@example.com', 'password': 'pw'}], dry_run=True)
+
+        assert stats['created'] == 1
+        assert not User.objects.exists()
+
+    def test_command(self, tmp_path):
+        path = tmp_path / 'users.jsonl'
+        path.write_text(''.join(json.dumps({'email': f'user{i}@example.com', 'password': 'pw'}) + '\n' for i in range(5)))
+        out = io.StringIO()
+
+        call_command('provision_users', str(path), '--chunk-size', '2', '--workers', '1', stdout=out)
+
+        assert 'Created 5 users' in out.getvalue()
+        assert User.objects.count() == 5
+
+    def test_command_missing_file(self, tmp_path):
+        with pytest.raises(CommandError):
+            call_command('provision_users', str(tmp_path / 'missing.csv'))